@@ -0,0 +1,148 @@
+"""
+Benchmarks the hot read/write filters on Metric and Project with and without the
+composite indexes and uniqueness constraints added in migration 0009.
+
+Runs against a throwaway database (a temporary SQLite file unless --database-url
+is given), never against the configured one:
+
+    python -m benchmarks.metric_indexes --rows 2000000
+    python -m benchmarks.metric_indexes --rows 2000000 --database-url postgres://...
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+
+def setup_django(database_url=None, sqlite_path=None):
+    if database_url:
+        os.environ["DATABASE_URL"] = database_url
+    else:
+        os.environ.pop("DATABASE_URL", None)
+        os.environ["DB_ENGINE"] = "django.db.backends.sqlite3"
+        os.environ["DB_NAME"] = sqlite_path
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "dora.settings")
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.setdefault("GITHUB_USERNAME", "benchmark")
+    os.environ.setdefault("GITHUB_PASSWORD", "benchmark")
+    os.environ.setdefault("DEBUG", "False")
+    import django
+    django.setup()
+
+
+def populate(rows, projects, batch_size=20000):
+    from metrics.models import Metric, Project
+
+    Project.objects.bulk_create(
+        [Project(name=f"org{i}/repo{i}", owner=f"org{i}", repository=f"repo{i}") for i in range(projects)]
+    )
+    project_ids = list(Project.objects.values_list("id", flat=True))
+    metric_types = [t for t, _ in Metric.METRIC_TYPES]
+    windows_per_project = max(rows // (projects * len(metric_types)), 1)
+    base = datetime(2015, 1, 1, tzinfo=timezone.utc)
+
+    batch = []
+    written = 0
+    for project_id in project_ids:
+        for w in range(windows_per_project):
+            since = base + timedelta(days=w)
+            for metric_type in metric_types:
+                batch.append(Metric(
+                    project_id=project_id, metric_type=metric_type, value=random.random(),
+                    since=since, until=since + timedelta(days=30),
+                ))
+            if len(batch) >= batch_size:
+                Metric.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+                print(f"\r  inserted {written} metric rows", end="", flush=True)
+    Metric.objects.bulk_create(batch)
+    written += len(batch)
+    print(f"\r  inserted {written} metric rows")
+    return project_ids, windows_per_project, base
+
+
+def workload(project_ids, windows, base, repeat):
+    from metrics.models import Metric, Project
+
+    rng = random.Random(42)
+    cases = {
+        "Project.get(owner, repository)": lambda: Project.objects.filter(
+            owner=f"org{rng.randrange(len(project_ids))}", repository=f"repo{rng.randrange(len(project_ids))}"
+        ).first(),
+        "Metric project+type+range": lambda: list(Metric.objects.filter(
+            project_id=rng.choice(project_ids), metric_type="lead_time_for_released_changes",
+            since__gte=base + timedelta(days=rng.randrange(windows)),
+            until__lte=base + timedelta(days=windows + 30),
+        ).values_list("id", flat=True)[:50]),
+        "Metric project+range order -since": lambda: list(Metric.objects.filter(
+            project_id=rng.choice(project_ids), since__gte=base + timedelta(days=rng.randrange(windows)),
+        ).order_by("-since").values_list("id", flat=True)[:50]),
+        "Metric window exact lookup": lambda: Metric.objects.filter(
+            project_id=rng.choice(project_ids), metric_type="bug_issues_rate",
+            since=base + timedelta(days=rng.randrange(windows)),
+            until=base + timedelta(days=rng.randrange(windows) + 30),
+        ).exists(),
+    }
+    results = {}
+    for name, fn in cases.items():
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn()
+        results[name] = (time.perf_counter() - start) / repeat * 1000
+    return results
+
+
+def drop_indexes():
+    from django.db import connection
+    from metrics.models import Metric, Project
+
+    with connection.schema_editor() as editor:
+        for constraint in Metric._meta.constraints:
+            editor.remove_constraint(Metric, constraint)
+        for index in Metric._meta.indexes:
+            editor.remove_index(Metric, index)
+        for constraint in Project._meta.constraints:
+            editor.remove_constraint(Project, constraint)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000, help="Metric rows to insert.")
+    parser.add_argument("--projects", type=int, default=500, help="Projects to spread them over.")
+    parser.add_argument("--repeat", type=int, default=200, help="Runs per query.")
+    parser.add_argument("--database-url", help="Empty database to use (default: temporary SQLite file).")
+    args = parser.parse_args()
+
+    tmpdir = sqlite_path = None
+    if not args.database_url:
+        tmpdir = tempfile.mkdtemp(prefix="dora-bench-")
+        sqlite_path = os.path.join(tmpdir, "bench.sqlite3")
+    setup_django(args.database_url, sqlite_path)
+
+    from django.core.management import call_command
+    from django.db import connection
+
+    call_command("migrate", verbosity=0)
+    print(f"Populating {args.rows} metric rows over {args.projects} projects ({connection.vendor})")
+    project_ids, windows, base = populate(args.rows, args.projects)
+
+    with_indexes = workload(project_ids, windows, base, args.repeat)
+    drop_indexes()
+    without_indexes = workload(project_ids, windows, base, args.repeat)
+
+    print(f"\n{'query':40} {'indexed ms':>12} {'FK only ms':>12} {'speed-up':>10}")
+    for name, indexed in with_indexes.items():
+        plain = without_indexes[name]
+        print(f"{name:40} {indexed:12.3f} {plain:12.3f} {plain / indexed if indexed else 0:9.1f}x")
+
+    if tmpdir:
+        connection.close()
+        os.remove(sqlite_path)
+        os.rmdir(tmpdir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+End-to-end benchmark of the store endpoint (POST /metrics/) against the offline
+fake GitHub API (metrics/fake_github.py), serving a synthetic repository from a
+separate process. Reports wall time, GitHub API calls per endpoint and peak Python
+memory for every run:
+
+    python -m benchmarks.store_metrics
+    python -m benchmarks.store_metrics --releases 2000 --issues 50000 --latency 0.05 --repeat 3
+    python -m benchmarks.store_metrics --backend graphql --json baseline.json
+
+Runs against a throwaway SQLite database, never the configured one.
+"""
+import argparse
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+from datetime import datetime, timedelta, timezone
+
+HISTORY_START = datetime(2022, 1, 1, tzinfo=timezone.utc)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def start_fake_server(args):
+    command = [
+        sys.executable, "-m", "metrics.fake_github",
+        "--releases", str(args.releases), "--issues", str(args.issues), "--days", str(args.days),
+        "--seed", str(args.seed), "--latency", str(args.latency),
+        "--core-limit", str(args.core_limit), "--search-limit", str(args.search_limit),
+        "--rate-window", str(args.rate_window),
+    ]
+    process = subprocess.Popen(command, cwd=BASE_DIR, stdout=subprocess.PIPE, text=True)
+    line = process.stdout.readline()
+    if not line.startswith("Serving"):
+        process.kill()
+        raise SystemExit("The fake GitHub server did not start.")
+    return process, line.rsplit(" ", 1)[1].strip()
+
+
+def fetch_calls(url):
+    with urllib.request.urlopen(f"{url}_fake/calls") as response:
+        return json.load(response)
+
+
+def setup_django(args, api_url, sqlite_path):
+    os.environ.update({
+        "DJANGO_SETTINGS_MODULE": "dora.settings",
+        "DB_ENGINE": "django.db.backends.sqlite3",
+        "DB_NAME": sqlite_path,
+        "GITHUB_API_URL": api_url,
+        "GITHUB_GRAPHQL_URL": f"{api_url}graphql",
+        "GITHUB_BACKEND": args.backend,
+        "GITHUB_DATA_SOURCE": args.data_source,
+        "GITHUB_CACHE_BACKEND": args.cache,
+        "GITHUB_CACHE_DIR": os.path.join(os.path.dirname(sqlite_path), "github_cache"),
+        "GITHUB_MAX_WORKERS": str(args.workers),
+        "ALLOWED_HOSTS": "testserver",
+        "METRICS_READ_CACHE_TIMEOUT": "0",
+        # the fake server has no secondary limits; pacing would measure the throttle
+        "GITHUB_RATE_LIMIT_FILE": os.path.join(os.path.dirname(sqlite_path), "github_rate_limit.json"),
+    })
+    if not args.rate_limits:
+        for resource in ("CORE", "SEARCH", "GRAPHQL"):
+            os.environ[f"GITHUB_{resource}_RATE_LIMIT"] = "0"
+    os.environ.pop("DATABASE_URL", None)
+    for name in ("SECRET_KEY", "GITHUB_USERNAME", "GITHUB_PASSWORD"):
+        os.environ.setdefault(name, "benchmark")
+    os.environ.setdefault("DEBUG", "False")
+
+    import django
+    django.setup()
+
+    from django.core.management import call_command
+    call_command("migrate", verbosity=0)
+
+
+def run_once(client, url, payload):
+    from django.urls import reverse
+
+    calls_before = fetch_calls(url)
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = client.post(reverse("metrics‐store"), payload, content_type="application/json", secure=True)
+    wall = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    calls_after = fetch_calls(url)
+    calls = {k: v - calls_before.get(k, 0) for k, v in calls_after.items() if v - calls_before.get(k, 0)}
+    return {
+        "status": response.status_code,
+        "wall_seconds": round(wall, 3),
+        "api_calls": calls,
+        "api_calls_total": sum(v for k, v in calls.items() if k != "rate_limited"),
+        "peak_memory_mb": round(peak / 2 ** 20, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--releases", type=int, default=2000)
+    parser.add_argument("--issues", type=int, default=50000)
+    parser.add_argument("--days", type=int, default=730, help="Days of synthetic history.")
+    parser.add_argument("--window-days", type=int, default=90,
+                        help="Length of the computed window, ending where the history ends.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every API request.")
+    parser.add_argument("--core-limit", type=int, default=0, help="Core requests per rate window (0: unlimited).")
+    parser.add_argument("--search-limit", type=int, default=0, help="Search requests per rate window.")
+    parser.add_argument("--rate-window", type=float, default=60.0)
+    parser.add_argument("--rate-limits", action="store_true",
+                        help="Keep the client-side GITHUB_*_RATE_LIMIT pacing (off by default).")
+    parser.add_argument("--backend", choices=["rest", "graphql"], default="rest")
+    parser.add_argument("--data-source", choices=["api", "store"], default="api")
+    parser.add_argument("--cache", choices=["none", "filesystem"], default="none",
+                        help="GitHub response cache; with 'filesystem' repeats revalidate.")
+    parser.add_argument("--workers", type=int, default=8, help="GITHUB_MAX_WORKERS.")
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--json", help="Also write the results to this file.")
+    args = parser.parse_args()
+
+    server, url = start_fake_server(args)
+    tmpdir = tempfile.mkdtemp(prefix="dora-bench-")
+    try:
+        setup_django(args, url, os.path.join(tmpdir, "bench.sqlite3"))
+        from django.test import Client
+
+        until = HISTORY_START + timedelta(days=args.days)
+        payload = {
+            "owner": "bench",
+            "repository": "synthetic",
+            "since_day": (until - timedelta(days=args.window_days)).isoformat(),
+            "until_day": until.isoformat(),
+            "bug_label": "bug",
+        }
+        client = Client()
+
+        print(f"{args.releases} releases, {args.issues} issues over {args.days} days; "
+              f"{args.window_days}-day window; backend={args.backend} source={args.data_source} "
+              f"latency={args.latency}s")
+        print(f"{'run':>4} {'status':>6} {'wall s':>9} {'calls':>7} {'peak MB':>8}  calls by endpoint")
+        runs = []
+        for n in range(1, args.repeat + 1):
+            result = run_once(client, url, payload)
+            runs.append(result)
+            print(f"{n:>4} {result['status']:>6} {result['wall_seconds']:>9.3f} "
+                  f"{result['api_calls_total']:>7} {result['peak_memory_mb']:>8.1f}  {result['api_calls']}")
+        max_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"max RSS of the benchmark process: {max_rss_mb:.0f} MB")
+
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as fh:
+                json.dump({"config": vars(args), "runs": runs, "max_rss_mb": round(max_rss_mb)}, fh, indent=2)
+    finally:
+        server.terminate()
+        server.wait()
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
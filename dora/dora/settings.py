@@ -110,6 +110,11 @@ else:
             'PORT': env('DB_PORT', default='5432'),
         }
     }
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # tests run on a file rather than SQLite's in-memory default, on which concurrent
+    # writers (batch and refresh_metrics workers) fail with "database table is locked"
+    # instead of waiting for each other
+    DATABASES['default']['TEST'] = {'NAME': str(BASE_DIR / 'test_db.sqlite3')}
 
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
@@ -142,6 +147,77 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 GITHUB_USERNAME = env('GITHUB_USERNAME')
 GITHUB_PASSWORD = env('GITHUB_PASSWORD')
 
+# GitHub API endpoints and client backend: "rest" or "graphql" (batched issue timelines)
+GITHUB_API_URL = env('GITHUB_API_URL', default='https://api.github.com/')
+GITHUB_GRAPHQL_URL = env('GITHUB_GRAPHQL_URL', default='https://api.github.com/graphql')
+GITHUB_BACKEND = env('GITHUB_BACKEND', default='rest')
+
+# GitHub HTTP client: keep-alive pool size and retry/backoff for 5xx and rate limits
+GITHUB_POOL_SIZE = env.int('GITHUB_POOL_SIZE', default=10)
+GITHUB_MAX_RETRIES = env.int('GITHUB_MAX_RETRIES', default=5)
+GITHUB_BACKOFF_FACTOR = env.float('GITHUB_BACKOFF_FACTOR', default=0.5)
+# Concurrent requests used to fan out per-issue event fetches (keep <= GITHUB_POOL_SIZE)
+GITHUB_MAX_WORKERS = env.int('GITHUB_MAX_WORKERS', default=8)
+
+# Credentials used in rotation, as comma-separated username:token pairs (defaults to
+# GITHUB_USERNAME / GITHUB_PASSWORD); requests go out with the least-used one
+GITHUB_CREDENTIALS = env.list('GITHUB_CREDENTIALS', default=[])
+# Requests per minute and credential, paced by token buckets to stay below GitHub's
+# secondary limits (0: rely on the rate-limit headers only). The buckets and the
+# reported quotas are shared by every process through GITHUB_RATE_LIMIT_FILE
+# (empty: per process).
+GITHUB_RATE_LIMITS = {
+    'core': (env.int('GITHUB_CORE_RATE_LIMIT', default=900), 60),
+    'search': (env.int('GITHUB_SEARCH_RATE_LIMIT', default=30), 60),
+    'graphql': (env.int('GITHUB_GRAPHQL_RATE_LIMIT', default=200), 60),
+}
+GITHUB_RATE_LIMIT_FILE = env('GITHUB_RATE_LIMIT_FILE', default=str(BASE_DIR / '.github_rate_limit.json'))
+
+# Django cache, used by the GitHub "django" cache backend and the read-response cache.
+# The default local-memory cache is per process; use a shared backend (e.g.
+# django.core.cache.backends.filebased.FileBasedCache) with several workers.
+CACHES = {
+    'default': {
+        'BACKEND': env('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': env('CACHE_LOCATION', default='dora'),
+    }
+}
+
+# Cached responses of the metric read endpoints, invalidated whenever metrics are
+# stored or deleted; 0 disables the cache
+METRICS_READ_CACHE_ALIAS = env('METRICS_READ_CACHE_ALIAS', default='default')
+METRICS_READ_CACHE_TIMEOUT = env.int('METRICS_READ_CACHE_TIMEOUT', default=300)
+
+# Cached total_count of GitHub issue searches, in seconds, shared by the metrics and
+# requests computing the same window; 0 disables it
+GITHUB_SEARCH_COUNT_TTL = env.int('GITHUB_SEARCH_COUNT_TTL', default=600)
+GITHUB_SEARCH_COUNT_CACHE_ALIAS = env('GITHUB_SEARCH_COUNT_CACHE_ALIAS', default='default')
+
+# Conditional-request (ETag) cache for GitHub responses: "filesystem", "django" or "none"
+GITHUB_CACHE_BACKEND = env('GITHUB_CACHE_BACKEND', default='filesystem')
+GITHUB_CACHE_DIR = env('GITHUB_CACHE_DIR', default=str(BASE_DIR / '.github_cache'))
+GITHUB_CACHE_MAX_ENTRIES = env.int('GITHUB_CACHE_MAX_ENTRIES', default=10000)
+GITHUB_CACHE_ALIAS = env('GITHUB_CACHE_ALIAS', default='default')
+
+# Where metrics are computed from: "api" (live GitHub calls) or "store"
+# (local raw-event store, synced incrementally before each computation)
+GITHUB_DATA_SOURCE = env('GITHUB_DATA_SOURCE', default='api')
+
+# Background metric jobs (database-backed queue)
+METRICS_JOB_WORKERS = env.int('METRICS_JOB_WORKERS', default=2)
+METRICS_JOB_PROGRESS_INTERVAL = env.float('METRICS_JOB_PROGRESS_INTERVAL', default=1.0)
+# Running jobs refresh a heartbeat; one silent for METRICS_JOB_STALE_AFTER seconds was
+# left by a dead worker and is queued again, up to METRICS_JOB_MAX_ATTEMPTS runs
+METRICS_JOB_HEARTBEAT_INTERVAL = env.float('METRICS_JOB_HEARTBEAT_INTERVAL', default=30.0)
+METRICS_JOB_STALE_AFTER = env.int('METRICS_JOB_STALE_AFTER', default=300)
+METRICS_JOB_MAX_ATTEMPTS = env.int('METRICS_JOB_MAX_ATTEMPTS', default=3)
+# Batch jobs: projects computed at once, and GitHub requests in flight across all of
+# them (shared round-robin between the projects)
+METRICS_BATCH_WORKERS = env.int('METRICS_BATCH_WORKERS', default=4)
+METRICS_BATCH_CONCURRENCY = env.int('METRICS_BATCH_CONCURRENCY', default=GITHUB_POOL_SIZE)
+# Rows removed per DELETE statement (and transaction) by project and metric deletions
+METRICS_DELETE_BATCH_SIZE = env.int('METRICS_DELETE_BATCH_SIZE', default=5000)
+
 # Logging configuration
 LOGGING = {
     'version': 1,
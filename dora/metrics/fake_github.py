@@ -0,0 +1,434 @@
+"""
+A local stand-in for the GitHub API, used to exercise the GitHub clients offline.
+
+FakeGitHubServer serves an in-memory FakeRepository over HTTP on 127.0.0.1, through
+the REST endpoints the clients use (releases, issue search, issue events) and
+GraphQL, optionally with added latency and rate limits:
+
+    with FakeGitHubServer(repo) as server:
+        with override_settings(GITHUB_API_URL=server.url, GITHUB_GRAPHQL_URL=server.graphql_url):
+            ...
+
+Responses carry ETags and conditional GETs get 304 Not Modified, as on GitHub.
+FakeRepository.synthetic() generates repositories of any size. To serve one from a
+separate process (e.g. for benchmarks, so the server does not share the client's
+GIL and memory):
+
+    python -m metrics.fake_github --releases 2000 --issues 50000 --latency 0.05
+"""
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def _parse_date(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class FakeRepository:
+    """
+    Releases and issues of one repository, stored in GitHub's REST shape.
+    `issues` items carry their events under an "events" key and their labels
+    as [{"name": ...}] under "labels".
+    """
+
+    def __init__(self, owner, repo, releases=None, issues=None):
+        self.owner = owner
+        self.repo = repo
+        # GitHub lists releases newest first
+        self.releases = sorted(releases or [], key=lambda r: r["created_at"], reverse=True)
+        self.issues = {}
+        self.put_issues(issues or [])
+
+    def add_releases(self, releases):
+        self.releases = sorted([*self.releases, *releases], key=lambda r: r["created_at"], reverse=True)
+
+    def put_issues(self, issues):
+        """Adds issues or replaces those with the same number, e.g. between two syncs."""
+        for issue in issues:
+            issue.setdefault("updated_at", issue["created_at"])
+            self.issues[issue["number"]] = issue
+        # search index: issues by creation and by last update, oldest first
+        self._by_created = sorted(self.issues.values(), key=lambda i: (i["created_at"], i["number"]))
+        self._created_keys = [_parse_date(i["created_at"]) for i in self._by_created]
+        self._by_updated = sorted(self.issues.values(), key=lambda i: (i["updated_at"], i["number"]))
+
+    @classmethod
+    def synthetic(cls, owner="bench", repo="synthetic", releases=2000, issues=50000, days=730,
+                  bug_ratio=0.2, references=2, prerelease_ratio=0.05, seed=0,
+                  start=datetime(2022, 1, 1, tzinfo=timezone.utc)):
+        """
+        A reproducible (`seed`) repository with `releases` releases and `issues`
+        issues spread uniformly over `days` days. A `bug_ratio` share of the issues
+        is labelled "bug" and each issue has up to `references` commit references
+        in the ten days after it was opened.
+        """
+        rng = random.Random(seed)
+        span = days * 86400
+
+        release_list = []
+        for n, offset in enumerate(sorted(rng.uniform(0, span) for _ in range(releases)), start=1):
+            created = start + timedelta(seconds=offset)
+            release_list.append({
+                "id": n,
+                "tag_name": f"v{n}",
+                "created_at": created.strftime(DATE_FORMAT),
+                "published_at": (created + timedelta(seconds=rng.uniform(0, 6 * 3600))).strftime(DATE_FORMAT),
+                "prerelease": rng.random() < prerelease_ratio,
+                "draft": False,
+            })
+
+        issue_list = []
+        for n, offset in enumerate(sorted(rng.uniform(0, span) for _ in range(issues)), start=1):
+            created = start + timedelta(seconds=offset)
+            events = [{"event": "labeled", "created_at": (created + timedelta(minutes=5)).strftime(DATE_FORMAT)}]
+            for _ in range(rng.randint(0, references)):
+                at = created + timedelta(seconds=rng.uniform(600, 10 * 86400))
+                events.append({"event": "referenced", "created_at": at.strftime(DATE_FORMAT)})
+            events.sort(key=lambda e: e["created_at"])
+            issue_list.append({
+                "number": n,
+                "title": f"Issue {n}",
+                "created_at": created.strftime(DATE_FORMAT),
+                "updated_at": events[-1]["created_at"],
+                "labels": [{"name": "bug"}] if rng.random() < bug_ratio else [],
+                "events": events,
+            })
+        return cls(owner, repo, release_list, issue_list)
+
+    def search_issues(self, query):
+        """
+        The issues matching a search query built by GitHubService or GitHubSyncService
+        (repo:, is:issue, label:, created:A..B, updated:>=A, sort:), in sort order.
+        """
+        terms = dict(term.split(":", 1) for term in query.split() if ":" in term)
+        if terms.get("repo") != f"{self.owner}/{self.repo}":
+            return []
+
+        if "created" in terms:
+            since, until = (_parse_date(d) for d in terms["created"].split(".."))
+            candidates = self._by_created[
+                bisect_left(self._created_keys, since):bisect_right(self._created_keys, until)
+            ]
+        elif terms.get("sort", "").startswith("updated"):
+            candidates = self._by_updated
+        else:
+            candidates = self._by_created
+        if terms.get("updated", "").startswith(">="):
+            since = _parse_date(terms["updated"][2:])
+            candidates = [i for i in candidates if _parse_date(i["updated_at"]) >= since]
+
+        label = terms.get("label")
+        if label is not None:
+            candidates = [i for i in candidates if label in {lb["name"] for lb in i.get("labels", [])}]
+        return candidates
+
+
+SEARCH_RESULT_CAP = 1000
+RELEASES_PATH_RE = re.compile(r"^/repos/([^/]+)/([^/]+)/releases$")
+ISSUE_EVENTS_PATH_RE = re.compile(r"^/repos/([^/]+)/([^/]+)/issues/(\d+)/events$")
+
+
+ISSUE_TIMELINE_RE = re.compile(
+    r'issue_(\d+): issue\(number: (\d+)\)\s*\{\s*'
+    r'timelineItems\(itemTypes: \[REFERENCED_EVENT\], first: (\d+)(?:, after: "([^"]*)")?\)'
+)
+
+
+class FakeGitHubHandler(BaseHTTPRequestHandler):
+    server_version = "FakeGitHub/1.0"
+    protocol_version = "HTTP/1.1"
+    # headers and body are written separately; don't let Nagle delay the body
+    disable_nagle_algorithm = True
+
+    @property
+    def fake(self):
+        return self.server.fake
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, body, status=200, headers=None):
+        payload = json.dumps(body).encode()
+        if status == 200 and self.command == "GET":
+            # like GitHub: an ETag on every resource, and 304 for a matching If-None-Match
+            etag = f'"{hashlib.sha1(payload).hexdigest()}"'
+            headers = {**(headers or {}), "ETag": etag}
+            if self.headers.get("If-None-Match") == etag:
+                self.fake.count_call("not_modified")
+                status, payload = 304, b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _admit(self, endpoint, resource):
+        """
+        Counts the call, applies the configured latency and rate limit. Returns the
+        rate-limit headers to send, or None once a 403 has been sent instead.
+        """
+        self.fake.count_call(endpoint)
+        if self.fake.latency:
+            time.sleep(self.fake.latency)
+        status = self.fake.take_scripted_status(endpoint)
+        if status in (403, 429):
+            self._send_json({"message": "You have exceeded a secondary rate limit"}, status)
+            return None
+        if status != 200:
+            self._send_json({"message": f"Scripted {status}"}, status)
+            return None
+        headers = self.fake.take_rate_limit(resource)
+        if headers is not None and int(headers["X-RateLimit-Remaining"]) < 0:
+            headers["X-RateLimit-Remaining"] = 0
+            self.fake.count_call("rate_limited")
+            self._send_json({"message": "API rate limit exceeded"}, 403, headers)
+            return None
+        return headers or {}
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        repo = self.fake.repository
+        page = int(query.get("page", 1))
+        per_page = int(query.get("per_page", 30))
+
+        if url.path == "/_fake/calls":
+            return self._send_json(self.fake.calls)
+
+        if url.path == "/search/issues":
+            headers = self._admit("search", "search")
+            if headers is None:
+                return
+            matches = repo.search_issues(query.get("q", ""))
+            start = (page - 1) * per_page
+            items = matches[:SEARCH_RESULT_CAP][start:start + per_page]
+            return self._send_json({
+                "total_count": len(matches),
+                "incomplete_results": False,
+                "items": [{k: v for k, v in i.items() if k != "events"} for i in items],
+            }, headers=headers)
+
+        m = RELEASES_PATH_RE.match(url.path)
+        if m and m.groups() == (repo.owner, repo.repo):
+            headers = self._admit("releases", "core")
+            if headers is None:
+                return
+            start = (page - 1) * per_page
+            return self._send_json(repo.releases[start:start + per_page], headers=headers)
+
+        m = ISSUE_EVENTS_PATH_RE.match(url.path)
+        if m and m.groups()[:2] == (repo.owner, repo.repo) and int(m.group(3)) in repo.issues:
+            headers = self._admit("events", "core")
+            if headers is None:
+                return
+            return self._send_json(repo.issues[int(m.group(3))].get("events", []), headers=headers)
+
+        return self._send_json({"message": "Not Found"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length)
+        if self.path.rstrip("/") != "/graphql":
+            return self._send_json({"message": "Not Found"}, 404)
+        headers = self._admit("graphql", "graphql")
+        if headers is None:
+            return
+        request = json.loads(body or b"{}")
+        query = request.get("query", "")
+        variables = request.get("variables") or {}
+        repo = self.fake.repository
+        if (variables.get("owner"), variables.get("repo")) != (repo.owner, repo.repo):
+            return self._send_json({"data": {"repository": None},
+                                    "errors": [{"message": "Could not resolve to a Repository"}]}, headers=headers)
+
+        if "releases(" in query:
+            data = {"repository": {"releases": self._graphql_releases(variables)}}
+        else:
+            data = {"repository": self._graphql_timelines(query)}
+        self._send_json({"data": data}, headers=headers)
+
+    def _graphql_releases(self, variables):
+        start = int(variables.get("after") or 0)
+        first = int(variables["first"])
+        page = self.fake.repository.releases[start:start + first]
+        end = start + len(page)
+        return {
+            "nodes": [
+                {
+                    "databaseId": r["id"],
+                    "tagName": r.get("tag_name", ""),
+                    "createdAt": r["created_at"],
+                    "publishedAt": r.get("published_at"),
+                    "isPrerelease": r.get("prerelease", False),
+                    "isDraft": r.get("draft", False),
+                }
+                for r in page
+            ],
+            "pageInfo": {
+                "hasNextPage": end < len(self.fake.repository.releases),
+                "endCursor": str(end),
+            },
+        }
+
+    def _graphql_timelines(self, query):
+        result = {}
+        for alias, number, first, after in ISSUE_TIMELINE_RE.findall(query):
+            issue = self.fake.repository.issues.get(int(number))
+            if issue is None:
+                result[f"issue_{alias}"] = None
+                continue
+            referenced = [e for e in issue.get("events", []) if e.get("event") == "referenced"]
+            start = int(after or 0)
+            page = referenced[start:start + int(first)]
+            end = start + len(page)
+            result[f"issue_{alias}"] = {
+                "timelineItems": {
+                    "nodes": [{"createdAt": e["created_at"]} for e in page],
+                    "pageInfo": {"hasNextPage": end < len(referenced), "endCursor": str(end)},
+                }
+            }
+        return result
+
+
+class FakeGitHubServer:
+    """
+    Runs FakeGitHubHandler for `repository` on a background thread. Counts the calls
+    it receives per endpoint in `calls`.
+
+    Every request is delayed by `latency` seconds. `rate_limits` maps an API resource
+    ("core", "search", "graphql") to (requests, window seconds); requests past the
+    limit get GitHub's 403 with X-RateLimit-Remaining: 0 until the window resets.
+    respond_with() makes chosen calls fail, e.g. to test retries.
+    """
+
+    def __init__(self, repository, port=0, latency=0.0, rate_limits=None):
+        self.repository = repository
+        self.calls = {}
+        self.latency = latency
+        self.rate_limits = rate_limits or {}
+        self._windows = {}
+        self._scripts = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", port), FakeGitHubHandler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+
+    def count_call(self, endpoint):
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+    def respond_with(self, endpoint, statuses):
+        """
+        Answers the next calls to `endpoint` ("releases", "search", "events",
+        "graphql") with `statuses` in turn, 200 serving a call normally. 403 and
+        429 come as secondary rate limits, without rate-limit headers.
+        """
+        with self._lock:
+            self._scripts.setdefault(endpoint, []).extend(statuses)
+
+    def take_scripted_status(self, endpoint):
+        with self._lock:
+            script = self._scripts.get(endpoint)
+            return script.pop(0) if script else 200
+
+    def take_rate_limit(self, resource):
+        """
+        Spends one request of `resource` and returns its X-RateLimit-* headers
+        (Remaining < 0 once exhausted), or None if it is not limited.
+        """
+        if resource not in self.rate_limits:
+            return None
+        limit, window = self.rate_limits[resource]
+        now = time.time()
+        with self._lock:
+            reset, used = self._windows.get(resource, (0.0, 0))
+            if now >= reset:
+                reset, used = now + window, 0
+            used += 1
+            self._windows[resource] = (reset, used)
+        return {
+            "X-RateLimit-Limit": limit,
+            "X-RateLimit-Remaining": limit - used,
+            "X-RateLimit-Reset": int(reset),
+            "X-RateLimit-Resource": resource,
+        }
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def graphql_url(self):
+        return f"{self.url}graphql"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a synthetic repository through the fake GitHub API.")
+    parser.add_argument("--owner", default="bench")
+    parser.add_argument("--repo", default="synthetic")
+    parser.add_argument("--releases", type=int, default=2000)
+    parser.add_argument("--issues", type=int, default=50000)
+    parser.add_argument("--days", type=int, default=730, help="Days the history spans.")
+    parser.add_argument("--bug-ratio", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every request.")
+    parser.add_argument("--core-limit", type=int, default=0, help="Core requests per window (0: unlimited).")
+    parser.add_argument("--search-limit", type=int, default=0, help="Search requests per window (0: unlimited).")
+    parser.add_argument("--rate-window", type=float, default=60.0, help="Rate-limit window in seconds.")
+    args = parser.parse_args(argv)
+
+    repository = FakeRepository.synthetic(
+        args.owner, args.repo, releases=args.releases, issues=args.issues, days=args.days,
+        bug_ratio=args.bug_ratio, seed=args.seed,
+    )
+    rate_limits = {}
+    if args.core_limit:
+        rate_limits["core"] = (args.core_limit, args.rate_window)
+        rate_limits["graphql"] = (args.core_limit, args.rate_window)
+    if args.search_limit:
+        rate_limits["search"] = (args.search_limit, args.rate_window)
+
+    server = FakeGitHubServer(repository, port=args.port, latency=args.latency, rate_limits=rate_limits)
+    print(f"Serving {args.owner}/{args.repo} on {server.url}", flush=True)
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._httpd.server_close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
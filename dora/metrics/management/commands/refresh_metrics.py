@@ -0,0 +1,155 @@
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime, time, timedelta, timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from metrics.models import Metric, Project
+from metrics.services.batch_service import compute_and_store_batch
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the rolling windows (e.g. last 7/30/90 days, ending at midnight UTC) "
+        "of every project. Windows already stored are skipped and progress is "
+        "checkpointed, so an interrupted run resumes where it stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--windows", default="7,30,90",
+                            help="Comma-separated window lengths in days.")
+        parser.add_argument("--workers", type=int, default=settings.METRICS_BATCH_WORKERS,
+                            help="Projects computed concurrently.")
+        parser.add_argument("--bug-label", default="",
+                            help="Label marking incident issues (default: the label each project's "
+                                 "metrics were last computed with).")
+        parser.add_argument("--projects", default="",
+                            help="Comma-separated owner/repo identifiers (default: all projects).")
+        parser.add_argument("--until", default="",
+                            help="End of the windows, YYYY-MM-DD (default: today, UTC).")
+        parser.add_argument("--checkpoint",
+                            default=os.path.join(settings.BASE_DIR, ".refresh_metrics.json"),
+                            help="File recording the windows done by an unfinished run.")
+        parser.add_argument("--force", action="store_true",
+                            help="Recompute windows even if they are already stored.")
+
+    def handle(self, *args, **options):
+        try:
+            days = sorted({int(d) for d in options["windows"].split(",") if d.strip()})
+            until_day = (
+                datetime.strptime(options["until"], "%Y-%m-%d").date()
+                if options["until"] else datetime.now(timezone.utc).date()
+            )
+        except ValueError as exc:
+            raise CommandError(f"Invalid --windows or --until: {exc}")
+        if not days or days[0] <= 0:
+            raise CommandError("--windows needs positive numbers of days.")
+
+        until = datetime.combine(until_day, time.min, tzinfo=timezone.utc)
+        windows = [(until - timedelta(days=d), until) for d in days]
+
+        projects = Project.objects.order_by("id")
+        identifiers = [p.strip() for p in options["projects"].split(",") if p.strip()]
+        if identifiers:
+            projects = [p for p in projects if str(p) in identifiers]
+
+        unlabelled = [str(p) for p in projects if not (options["bug_label"] or p.bug_label)]
+        if unlabelled:
+            raise CommandError(
+                f"No bug label is known for {', '.join(unlabelled)}; pass --bug-label."
+            )
+
+        run_key = [until.isoformat(), days, options["bug_label"]]
+        done = self._load_checkpoint(options["checkpoint"], run_key)
+        stored = set() if options["force"] else self._stored_windows(projects, windows)
+
+        specs = []
+        for project in projects:
+            for since, w_until in windows:
+                key = self._spec_key(project.owner, project.repository, since, w_until)
+                if key in done or (project.id, since, w_until) in stored:
+                    continue
+                specs.append({
+                    "owner": project.owner,
+                    "repository": project.repository,
+                    "since_day": since.isoformat(),
+                    "until_day": w_until.isoformat(),
+                    "bug_label": options["bug_label"] or project.bug_label,
+                })
+
+        skipped = len(projects) * len(windows) - len(specs)
+        self.stdout.write(f"{len(specs)} window(s) to compute, {skipped} already up to date.")
+        if not specs:
+            self._remove_checkpoint(options["checkpoint"])
+            return
+
+        lock = threading.Lock()
+
+        def on_result(spec, item):
+            with lock:
+                if item["status"] == "succeeded":
+                    done.add(self._spec_key(spec["owner"], spec["repository"],
+                                            spec["since_day"], spec["until_day"]))
+                    self._save_checkpoint(options["checkpoint"], run_key, done)
+                    self.stdout.write(f"  {spec['owner']}/{spec['repository']} "
+                                      f"{spec['since_day'][:10]}..{spec['until_day'][:10]} done")
+                else:
+                    self.stderr.write(f"  {spec['owner']}/{spec['repository']} "
+                                      f"{spec['since_day'][:10]}..{spec['until_day'][:10]} "
+                                      f"failed: {item['error']}")
+
+        result = compute_and_store_batch(specs, workers=options["workers"], on_result=on_result)
+
+        if result["failed"]:
+            raise CommandError(
+                f"{result['failed']} of {len(specs)} window(s) failed; re-run to retry them."
+            )
+        self._remove_checkpoint(options["checkpoint"])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {result['succeeded']} window(s)."))
+
+    @staticmethod
+    def _spec_key(owner, repository, since, until):
+        since = since if isinstance(since, str) else since.isoformat()
+        until = until if isinstance(until, str) else until.isoformat()
+        return f"{owner}/{repository}|{since}|{until}"
+
+    @staticmethod
+    def _stored_windows(projects, windows):
+        """(project id, since, until) of the windows holding all of their metrics."""
+        complete = (
+            Metric.objects.filter(project__in=[p.id for p in projects])
+            .filter(since__in=[s for s, _ in windows], until=windows[0][1])
+            .values("project_id", "since", "until")
+            .annotate(types=Count("metric_type", distinct=True))
+            .filter(types=len(Metric.METRIC_TYPES))
+        )
+        return {(row["project_id"], row["since"], row["until"]) for row in complete}
+
+    @staticmethod
+    def _load_checkpoint(path, run_key):
+        """Windows done by an earlier, interrupted run of the same refresh."""
+        try:
+            with open(path, encoding="utf-8") as fh:
+                checkpoint = json.load(fh)
+        except (OSError, ValueError):
+            return set()
+        if checkpoint.get("run") != run_key:
+            return set()
+        return set(checkpoint.get("done", []))
+
+    @staticmethod
+    def _save_checkpoint(path, run_key, done):
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            json.dump({"run": run_key, "done": sorted(done)}, fh)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _remove_checkpoint(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
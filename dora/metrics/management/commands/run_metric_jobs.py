@@ -0,0 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from metrics.services.job_service import recover_stale_jobs, work_until_empty
+
+
+class Command(BaseCommand):
+    help = "Drains the queue of pending metric jobs in a dedicated process."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=1, help="Jobs run concurrently.")
+
+    def handle(self, *args, **options):
+        workers = max(options["workers"], 1)
+        recovered = recover_stale_jobs()
+        if recovered:
+            self.stdout.write(f"Recovered {recovered} job(s) left running by a dead worker.")
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for _ in range(workers):
+                executor.submit(work_until_empty)
+        self.stdout.write(self.style.SUCCESS("No pending metric jobs left."))
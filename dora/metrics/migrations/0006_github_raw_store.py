@@ -0,0 +1,174 @@
+# Generated by Django 4.2.20 on 2026-10-18 04:02
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metrics", "0005_metricjob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GitHubIssue",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("number", models.IntegerField()),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="issues",
+                        to="metrics.project",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="GitHubSyncState",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("issues_updated_at", models.DateTimeField(blank=True, null=True)),
+                ("last_synced_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "project",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="sync_state",
+                        to="metrics.project",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="GitHubIssueLabel",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("name", models.CharField(db_index=True, max_length=100)),
+                (
+                    "issue",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="labels",
+                        to="metrics.githubissue",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="GitHubIssueEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("event", models.CharField(max_length=50)),
+                ("created_at", models.DateTimeField()),
+                (
+                    "issue",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="events",
+                        to="metrics.githubissue",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="GitHubRelease",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("github_id", models.BigIntegerField()),
+                ("tag_name", models.CharField(blank=True, default="", max_length=255)),
+                ("created_at", models.DateTimeField()),
+                ("published_at", models.DateTimeField(null=True)),
+                ("prerelease", models.BooleanField(default=False)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="releases",
+                        to="metrics.project",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(
+                        fields=["project", "created_at"],
+                        name="metrics_git_project_b87ae5_idx",
+                    ),
+                    models.Index(
+                        fields=["project", "published_at"],
+                        name="metrics_git_project_da12ab_idx",
+                    ),
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="githubrelease",
+            constraint=models.UniqueConstraint(
+                fields=("project", "github_id"), name="unique_project_release"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="githubissueevent",
+            index=models.Index(
+                fields=["issue", "event", "created_at"],
+                name="metrics_git_issue_i_873f22_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="githubissue",
+            index=models.Index(
+                fields=["project", "created_at"], name="metrics_git_project_60540c_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="githubissue",
+            constraint=models.UniqueConstraint(
+                fields=("project", "number"), name="unique_project_issue"
+            ),
+        ),
+    ]
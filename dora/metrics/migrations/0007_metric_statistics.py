@@ -0,0 +1,58 @@
+# Generated by Django 4.2.20 on 2026-10-18 04:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metrics", "0006_github_raw_store"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="metric",
+            name="histogram",
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="metric",
+            name="max_value",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="metric",
+            name="min_value",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="metric",
+            name="p50",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="metric",
+            name="p75",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="metric",
+            name="p90",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="metric",
+            name="p95",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="metric",
+            name="p99",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="metric",
+            name="sample_count",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+    ]
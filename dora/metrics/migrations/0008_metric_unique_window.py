@@ -0,0 +1,43 @@
+# Generated by Django 4.2.20 on 2026-10-18 04:07
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicate_metrics(apps, schema_editor):
+    """
+    Keeps only the newest row (highest id) of every (project, metric_type, since, until)
+    group so the unique constraint can be created.
+    """
+    Metric = apps.get_model("metrics", "Metric")
+    duplicates = (
+        Metric.objects.filter(since__isnull=False, until__isnull=False)
+        .values("project_id", "metric_type", "since", "until")
+        .annotate(keep_id=Max("id"), rows=models.Count("id"))
+        .filter(rows__gt=1)
+    )
+    for group in duplicates.iterator():
+        Metric.objects.filter(
+            project_id=group["project_id"],
+            metric_type=group["metric_type"],
+            since=group["since"],
+            until=group["until"],
+        ).exclude(id=group["keep_id"]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metrics", "0007_metric_statistics"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_metrics, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="metric",
+            constraint=models.UniqueConstraint(
+                fields=("project", "metric_type", "since", "until"),
+                name="unique_metric_window",
+            ),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.20 on 2026-10-18 04:08
+
+from django.db import migrations
+from django.db.models import Count, Max, Min
+
+
+def merge_duplicate_projects(apps, schema_editor):
+    """
+    Folds every group of projects sharing (owner, repository) into its oldest row.
+    Metrics move to the kept project; where several hold the same window, the
+    newest metric (highest id) wins. Raw GitHub data of the duplicates is dropped
+    with them and is re-synced on demand.
+    """
+    Project = apps.get_model("metrics", "Project")
+    Metric = apps.get_model("metrics", "Metric")
+
+    groups = (
+        Project.objects.values("owner", "repository")
+        .annotate(keep_id=Min("id"), rows=Count("id"))
+        .filter(rows__gt=1)
+    )
+    for group in list(groups):
+        project_ids = list(
+            Project.objects.filter(
+                owner=group["owner"], repository=group["repository"]
+            ).values_list("id", flat=True)
+        )
+        metrics = Metric.objects.filter(project_id__in=project_ids)
+
+        windows = (
+            metrics.filter(since__isnull=False, until__isnull=False)
+            .values("metric_type", "since", "until")
+            .annotate(newest_id=Max("id"), rows=Count("id"))
+            .filter(rows__gt=1)
+        )
+        for window in list(windows):
+            metrics.filter(
+                metric_type=window["metric_type"],
+                since=window["since"],
+                until=window["until"],
+            ).exclude(id=window["newest_id"]).delete()
+
+        metrics.exclude(project_id=group["keep_id"]).update(project_id=group["keep_id"])
+        Project.objects.filter(id__in=project_ids).exclude(id=group["keep_id"]).delete()
+
+
+class Migration(migrations.Migration):
+    # the unique constraint and index are added by the next migration: PostgreSQL
+    # refuses to alter tables with deferred FK checks queued by these row changes
+
+    dependencies = [
+        ("metrics", "0008_metric_unique_window"),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_projects, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.20 on 2026-10-18 04:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metrics", "0009_merge_duplicate_projects"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="metric",
+            index=models.Index(
+                fields=["project", "since", "until"], name="metric_project_window_idx"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="project",
+            constraint=models.UniqueConstraint(
+                fields=("owner", "repository"), name="unique_project_repository"
+            ),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.20 on 2026-10-18 04:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metrics", "0010_project_unique_metric_index"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="metric",
+            index=models.Index(
+                fields=["since", "metric_type", "id"], name="metric_keyset_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.20 on 2026-10-18 04:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metrics", "0011_metric_keyset_index"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="metricjob",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("store_metrics", "Store Metrics"),
+                    ("store_metrics_batch", "Store Metrics Batch"),
+                ],
+                max_length=50,
+            ),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.20 on 2026-10-18 04:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metrics", "0012_metricjob_batch_kind"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="metricjob",
+            name="kind",
+            field=models.CharField(
+                choices=[
+                    ("store_metrics", "Store Metrics"),
+                    ("store_metrics_batch", "Store Metrics Batch"),
+                    ("delete_project", "Delete Project"),
+                    ("delete_metrics", "Delete Metrics"),
+                ],
+                max_length=50,
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-18 04:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metrics", "0013_metricjob_delete_kinds"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="githubsyncstate",
+            name="releases_backfilled_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
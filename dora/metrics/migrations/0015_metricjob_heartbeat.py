@@ -0,0 +1,23 @@
+# Generated by Django 4.2.20 on 2026-10-18 04:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metrics", "0014_githubsyncstate_releases_backfilled_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="metricjob",
+            name="attempts",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="metricjob",
+            name="heartbeat_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-18 04:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("metrics", "0015_metricjob_heartbeat"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="project",
+            name="bug_label",
+            field=models.CharField(blank=True, default="", max_length=100),
+        ),
+    ]
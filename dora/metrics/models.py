@@ -5,6 +5,13 @@ class Project(models.Model):
     name = models.CharField(max_length=100)
     owner = models.CharField(max_length=100)
     repository = models.CharField(max_length=100)
+    # label of the incident issues, as last used to compute the project's metrics
+    bug_label = models.CharField(max_length=100, blank=True, default='')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'repository'], name='unique_project_repository'),
+        ]
 
     def __str__(self):
         return f"{self.owner}/{self.repository}"
@@ -23,7 +30,156 @@ class Metric(models.Model):
     variance = models.FloatField(null=True, blank=True)
     since = models.DateTimeField(null=True)
     until = models.DateTimeField(null=True)
+    # distribution of the samples behind `value` (days); see metric_service.calculate_statistics
+    sample_count = models.IntegerField(null=True, blank=True)
+    min_value = models.FloatField(null=True, blank=True)
+    max_value = models.FloatField(null=True, blank=True)
+    p50 = models.FloatField(null=True, blank=True)
+    p75 = models.FloatField(null=True, blank=True)
+    p90 = models.FloatField(null=True, blank=True)
+    p95 = models.FloatField(null=True, blank=True)
+    p99 = models.FloatField(null=True, blank=True)
+    histogram = models.JSONField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            # one row per metric and window; re-running a window updates it in place
+            models.UniqueConstraint(
+                fields=['project', 'metric_type', 'since', 'until'],
+                name='unique_metric_window',
+            ),
+        ]
+        indexes = [
+            # unique_metric_window already indexes (project, metric_type, since, until);
+            # this one serves project + date-range filters without a metric_type
+            models.Index(fields=['project', 'since', 'until'], name='metric_project_window_idx'),
+            # keyset order of the paginated /metrics/all/ listing
+            models.Index(fields=['since', 'metric_type', 'id'], name='metric_keyset_idx'),
+        ]
 
     def __str__(self):
         return (f"{self.project} – {self.metric_type} "
                 f"from {self.since.isoformat()} to {self.until.isoformat()}")
+
+
+class MetricJob(models.Model):
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUSES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+    ACTIVE_STATUSES = [STATUS_PENDING, STATUS_RUNNING]
+
+    KINDS = [
+        ('store_metrics', 'Store Metrics'),
+        ('store_metrics_batch', 'Store Metrics Batch'),
+        ('delete_project', 'Delete Project'),
+        ('delete_metrics', 'Delete Metrics'),
+    ]
+    kind = models.CharField(max_length=50, choices=KINDS)
+    params = models.JSONField(default=dict)
+    dedup_key = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUSES, default=STATUS_PENDING)
+    progress = models.JSONField(default=dict)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # refreshed while a worker runs the job; a stale one means the worker died
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # at most one pending/running job per identical request
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='unique_active_metric_job',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} job {self.pk} ({self.status})"
+
+
+class GitHubRelease(models.Model):
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='releases')
+    github_id = models.BigIntegerField()
+    tag_name = models.CharField(max_length=255, blank=True, default='')
+    created_at = models.DateTimeField()
+    published_at = models.DateTimeField(null=True)
+    prerelease = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'github_id'], name='unique_project_release'),
+        ]
+        indexes = [
+            models.Index(fields=['project', 'created_at']),
+            models.Index(fields=['project', 'published_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.project} {self.tag_name}"
+
+
+class GitHubIssue(models.Model):
+    project = models.ForeignKey(Project, on_delete=models.CASCADE, related_name='issues')
+    number = models.IntegerField()
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['project', 'number'], name='unique_project_issue'),
+        ]
+        indexes = [
+            models.Index(fields=['project', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.project}#{self.number}"
+
+
+class GitHubIssueLabel(models.Model):
+    issue = models.ForeignKey(GitHubIssue, on_delete=models.CASCADE, related_name='labels')
+    name = models.CharField(max_length=100, db_index=True)
+
+    def __str__(self):
+        return self.name
+
+
+class GitHubIssueEvent(models.Model):
+    issue = models.ForeignKey(GitHubIssue, on_delete=models.CASCADE, related_name='events')
+    event = models.CharField(max_length=50)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['issue', 'event', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.issue} {self.event} at {self.created_at.isoformat()}"
+
+
+class GitHubSyncState(models.Model):
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name='sync_state')
+    # newest issue `updated_at` seen; the next sync only asks for issues updated since
+    issues_updated_at = models.DateTimeField(null=True, blank=True)
+    # set once every page of /releases has been stored; until then syncs page to the end
+    releases_backfilled_at = models.DateTimeField(null=True, blank=True)
+    last_synced_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.project} synced at {self.last_synced_at}"
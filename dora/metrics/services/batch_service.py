@@ -0,0 +1,62 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import connection
+from .fair_scheduler import FairScheduler
+from .progress import Progress
+from .store_service import compute_and_store_metrics
+
+logger = logging.getLogger(__name__)
+
+SPEC_FIELDS = ("owner", "repository", "since_day", "until_day", "bug_label")
+
+
+def compute_and_store_batch(specs, progress=None, workers=None, on_result=None):
+    """
+    Computes and stores the metrics of every {owner, repository, since_day,
+    until_day, bug_label} spec, `workers` (METRICS_BATCH_WORKERS) at a time. All their
+    GitHub requests share METRICS_BATCH_CONCURRENCY slots, granted round-robin per
+    project by a FairScheduler, and the shared GitHub rate-limit budget. A failing project
+    does not stop the others; each gets its own result or error, in spec order.
+    `on_result(spec, item)` is called from the worker thread as each one finishes.
+    """
+    progress = progress or Progress()
+    scheduler = FairScheduler(settings.METRICS_BATCH_CONCURRENCY)
+    progress.set_phase("batch")
+
+    def run(spec):
+        key = f"{spec['owner']}/{spec['repository']}"
+        item = {"owner": spec["owner"], "repository": spec["repository"]}
+        try:
+            item["result"] = compute_and_store_metrics(
+                spec["owner"],
+                spec["repository"],
+                spec["since_day"],
+                spec["until_day"],
+                spec["bug_label"],
+                progress=progress,
+                scheduler=scheduler.queue(key),
+            )
+            item["status"] = "succeeded"
+            progress.incr("projects_succeeded")
+        except Exception as exc:
+            logger.exception("Batch computation of %s failed", key)
+            item["status"] = "failed"
+            item["error"] = f"{type(exc).__name__}: {exc}"
+            progress.incr("projects_failed")
+        finally:
+            # worker threads open their own connections
+            connection.close()
+        if on_result is not None:
+            on_result(spec, item)
+        return item
+
+    workers = max(min(workers or settings.METRICS_BATCH_WORKERS, len(specs)), 1)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="metric-batch") as executor:
+        results = list(executor.map(run, specs))
+
+    return {
+        "succeeded": sum(1 for r in results if r["status"] == "succeeded"),
+        "failed": sum(1 for r in results if r["status"] == "failed"),
+        "projects": results,
+    }
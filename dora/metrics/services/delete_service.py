@@ -0,0 +1,126 @@
+import logging
+from collections import Counter
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Q, signals
+from . import read_cache
+from .progress import Progress
+from ..models import Metric
+
+logger = logging.getLogger(__name__)
+
+
+def _fast_path_applies(model):
+    """
+    Whether rows of `model` and everything cascading from them can be deleted with
+    plain DELETE statements: no delete signal receivers on any of these models and
+    only CASCADE / DO_NOTHING relations, so Django's collector has nothing to do.
+    """
+    if signals.pre_delete.has_listeners(model) or signals.post_delete.has_listeners(model):
+        return False
+    for rel in model._meta.related_objects:
+        if rel.many_to_many:
+            return False
+        if rel.on_delete is models.DO_NOTHING:
+            continue
+        if rel.on_delete is not models.CASCADE or not _fast_path_applies(rel.related_model):
+            return False
+    return True
+
+
+def _delete_batches(qs, batch_size, progress):
+    """
+    Deletes the rows of `qs` (which must have no dependent rows) by primary key,
+    `batch_size` at a time, each batch in its own short transaction so other
+    writers are never blocked for long. Returns the number of rows deleted.
+    """
+    model = qs.model
+    pks_qs = qs.order_by().values_list("pk", flat=True)
+    total = 0
+    while True:
+        with transaction.atomic(using=qs.db):
+            pks = list(pks_qs[:batch_size])
+            if not pks:
+                return total
+            # the DELETE Django's collector issues for fast-deletable rows
+            deleted = model._base_manager.using(qs.db).filter(pk__in=pks)._raw_delete(qs.db)
+        total += deleted
+        progress.incr("rows_deleted", deleted)
+
+
+def _delete_dependents(qs, batch_size, progress):
+    """Deletes every row cascading from `qs`, deepest first. Returns {label: count}."""
+    counts = Counter()
+    for rel in qs.model._meta.related_objects:
+        if rel.on_delete is models.DO_NOTHING:
+            continue
+        child_qs = rel.related_model._base_manager.using(qs.db).filter(**{f"{rel.field.name}__in": qs})
+        counts.update(_delete_dependents(child_qs, batch_size, progress))
+        progress.set_phase(f"deleting {rel.related_model._meta.label}")
+        deleted = _delete_batches(child_qs, batch_size, progress)
+        if deleted:
+            counts[rel.related_model._meta.label] += deleted
+    return counts
+
+
+def bulk_delete(qs, progress=None, batch_size=None):
+    """
+    QuerySet.delete() for large deletions: dependent rows are removed deepest first
+    with set-based DELETEs of `batch_size` (METRICS_DELETE_BATCH_SIZE) rows, never
+    loading model instances. Falls back to QuerySet.delete() when delete signals
+    are registered or a relation needs the collector (PROTECT, SET_NULL, ...).
+    Returns (total, {model label: count}) like QuerySet.delete().
+    """
+    progress = progress or Progress()
+    batch_size = batch_size or settings.METRICS_DELETE_BATCH_SIZE
+    if not _fast_path_applies(qs.model):
+        logger.info("Deleting %s through the ORM collector", qs.model._meta.label)
+        return qs.delete()
+
+    counts = _delete_dependents(qs, batch_size, progress)
+    progress.set_phase(f"deleting {qs.model._meta.label}")
+    if qs.model._meta.related_objects:
+        # rows added meanwhile are still cascaded by the collector; none are left to load
+        _, root_counts = qs.delete()
+        counts.update(root_counts)
+    else:
+        deleted = _delete_batches(qs, batch_size, progress)
+        if deleted:
+            counts[qs.model._meta.label] += deleted
+    return sum(counts.values()), dict(counts)
+
+
+def delete_project(project, progress=None):
+    """Deletes `project` with its metrics and raw GitHub data. Returns bulk_delete()'s result."""
+    result = bulk_delete(type(project)._base_manager.filter(pk=project.pk), progress=progress)
+    read_cache.invalidate_projects([str(project)])
+    return result
+
+
+def metrics_to_delete(identifiers, since_dt=None, until_dt=None):
+    """
+    The metrics of the owner/repo `identifiers` (all projects if empty) with
+    since >= since_dt and until <= until_dt.
+    """
+    qs = Metric.objects.all()
+    if identifiers:
+        queries = Q()
+        for ident in identifiers:
+            owner, repo = ident.split("/", 1)
+            queries |= Q(project__owner=owner, project__repository=repo)
+        qs = qs.filter(queries)
+    if since_dt:
+        qs = qs.filter(since__gte=since_dt)
+    if until_dt:
+        qs = qs.filter(until__lte=until_dt)
+    return qs
+
+
+def delete_metrics(identifiers, since_dt=None, until_dt=None, progress=None):
+    """Deletes the metrics_to_delete(). Returns the number of rows deleted."""
+    deleted, _ = bulk_delete(metrics_to_delete(identifiers, since_dt, until_dt), progress=progress)
+    if identifiers:
+        read_cache.invalidate_projects(identifiers)
+    else:
+        read_cache.invalidate_all()
+    return deleted
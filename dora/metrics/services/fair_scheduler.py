@@ -0,0 +1,84 @@
+import threading
+from collections import Counter, deque
+from contextlib import contextmanager
+
+
+class _Ticket:
+    __slots__ = ("granted",)
+
+    def __init__(self):
+        self.granted = False
+
+
+class FairScheduler:
+    """
+    Shares `capacity` concurrent GitHub request slots between the projects of a
+    batch. Every project has its own queue of waiting requests and freed slots are
+    granted round-robin over the projects with requests waiting, so a project that
+    fans out thousands of issue-event fetches cannot starve the others.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = max(capacity, 1)
+        self.granted = Counter()
+        self._cond = threading.Condition()
+        self._in_flight = 0
+        self._queues = {}
+        # projects with waiting requests, in turn order
+        self._turns = deque()
+
+    def queue(self, key):
+        """Returns the ProjectQueue through which the requests of project `key` go."""
+        return ProjectQueue(self, key)
+
+    def acquire(self, key):
+        ticket = _Ticket()
+        with self._cond:
+            waiting = self._queues.get(key)
+            if waiting is None:
+                waiting = self._queues[key] = deque()
+                self._turns.append(key)
+            waiting.append(ticket)
+            self._dispatch()
+            while not ticket.granted:
+                self._cond.wait()
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._dispatch()
+
+    def _dispatch(self):
+        granted = False
+        while self._in_flight < self.capacity and self._turns:
+            key = self._turns.popleft()
+            waiting = self._queues[key]
+            waiting.popleft().granted = True
+            self._in_flight += 1
+            self.granted[key] += 1
+            granted = True
+            if waiting:
+                self._turns.append(key)
+            else:
+                del self._queues[key]
+        if granted:
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, key):
+        self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release()
+
+
+class ProjectQueue:
+    """A project's handle on a FairScheduler, passed to its GitHub client."""
+
+    def __init__(self, scheduler, key):
+        self.scheduler = scheduler
+        self.key = key
+
+    def slot(self):
+        return self.scheduler.slot(self.key)
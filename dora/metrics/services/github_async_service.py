@@ -0,0 +1,245 @@
+import asyncio
+import logging
+import time
+from datetime import timedelta
+import httpx
+from django.conf import settings
+from . import instrumentation, search_counts
+from .github_rate_limit import is_rate_limited
+from .github_rest_service import GitHubRestService
+from .github_service import GitHubService
+from .release_timeline import AsyncReleaseTimeline
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+def new_async_client():
+    """
+    Returns an httpx.AsyncClient pooling up to GITHUB_POOL_SIZE keep-alive
+    connections. Connections cannot move between event loops, and under WSGI every
+    async view runs on a loop of its own, so each computation opens a client and
+    closes it when it is done (AsyncGitHubService is an async context manager).
+    """
+    limits = httpx.Limits(
+        max_connections=settings.GITHUB_POOL_SIZE,
+        max_keepalive_connections=settings.GITHUB_POOL_SIZE,
+    )
+    transport = httpx.AsyncHTTPTransport(retries=settings.GITHUB_MAX_RETRIES, limits=limits)
+    return httpx.AsyncClient(transport=transport, timeout=httpx.Timeout(60.0))
+
+
+async def gather_bounded(coros, limit=None):
+    """
+    Awaits the coroutines with at most `limit` (GITHUB_MAX_WORKERS) in flight and
+    returns their results in order.
+    """
+    semaphore = asyncio.Semaphore(max(limit or settings.GITHUB_MAX_WORKERS, 1))
+
+    async def run(coro):
+        async with semaphore:
+            return await coro
+
+    return await asyncio.gather(*(run(c) for c in coros))
+
+
+class AsyncGitHubRestService(GitHubRestService):
+    """
+    GitHubRestService on httpx.AsyncClient: the same endpoints, rate limiting,
+    retries and conditional-request cache, with every call a coroutine.
+    """
+
+    def __init__(self, progress=None):
+        super().__init__(progress=progress)
+        self.client = new_async_client()
+
+    async def aclose(self):
+        await self.client.aclose()
+
+    async def _send(self, method, url, headers, params=None, json_body=None):
+        resource = self._resource_for(url)
+        endpoint = self._endpoint_for(url)
+        attempt = 0
+        while True:
+            # the coordinator locks and rewrites its state file: keep it off the event loop
+            credential, delay = await asyncio.to_thread(self.rate_limits.acquire, resource)
+            if credential is None:
+                logger.info("GitHub %s rate limit reached, sleeping %.1fs", resource, delay)
+                instrumentation.record_rate_limit_wait(resource, delay)
+                await asyncio.sleep(delay)
+                continue
+            request_headers = {**headers, "Authorization": credential.authorization}
+            started = time.perf_counter()
+            response = await self.client.request(
+                method, url, headers=request_headers, params=params, json=json_body
+            )
+            self._record_response(resource, endpoint, response, time.perf_counter() - started)
+            paced = await asyncio.to_thread(self.rate_limits.update, credential, resource, response)
+
+            if attempt < settings.GITHUB_MAX_RETRIES:
+                if is_rate_limited(response):
+                    instrumentation.record_retry(resource, "rate_limited")
+                    if not paced:
+                        await asyncio.sleep(settings.GITHUB_BACKOFF_FACTOR * (2 ** attempt))
+                    attempt += 1
+                    continue
+                if response.status_code in RETRY_STATUSES:
+                    instrumentation.record_retry(resource, "server_error")
+                    await asyncio.sleep(settings.GITHUB_BACKOFF_FACTOR * (2 ** attempt))
+                    attempt += 1
+                    continue
+
+            self.progress.incr("pages_fetched")
+            return response
+
+    async def _get(self, url, params=None):
+        # cache files are read and written off the event loop
+        cached = await asyncio.to_thread(self.cache.get, url, params) if self.cache else None
+        headers = dict(self.headers)
+        if cached:
+            headers.update(self.cache.conditional_headers(cached))
+
+        response = await self._send("GET", url, headers, params=params)
+        if self.cache:
+            self._record_cache(response, cached)
+        if response.status_code == 304 and cached:
+            return cached["body"]
+
+        response.raise_for_status()
+        body = response.json()
+        if self.cache:
+            await asyncio.to_thread(self.cache.set, url, params, response, body)
+        return body
+
+    async def get_github_issues_events(self, owner, repo, issue_numbers):
+        return await gather_bounded(
+            self.get_github_issue_events(owner, repo, n) for n in issue_numbers
+        )
+
+
+class AsyncGitHubService(GitHubService):
+    """
+    GitHubService whose metric methods are coroutines, over AsyncGitHubRestService.
+    Independent requests (search windows, result pages, issue events, the two
+    change-failure counts) run concurrently; the computations are shared with
+    GitHubService. Use it as `async with AsyncGitHubService() as svc:` so its
+    connections are closed afterwards.
+    """
+
+    def __init__(self, progress=None):
+        super().__init__(progress=progress)
+        self.github_rest = AsyncGitHubRestService(progress=self.progress)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.github_rest.aclose()
+
+    def get_release_timeline(self, owner, repo):
+        key = (owner, repo)
+        if key not in self._timelines:
+            self._timelines[key] = AsyncReleaseTimeline(self.github_rest, owner, repo)
+        return self._timelines[key]
+
+    async def _count_issues(self, owner, repo, since_day, until_day, label=None):
+        query = self._issue_search_query(owner, repo, since_day, until_day, label)
+        count = search_counts.get(query)
+        if count is None:
+            count = search_counts.remember(query, await self.github_rest.get_github_issues(query, 1, 1))
+        return count
+
+    async def _split_search_window(self, owner, repo, since_dt, until_dt, label=None, count=None):
+        if count is None:
+            count = await self._count_issues(owner, repo, since_dt, until_dt, label)
+        mid = self._split_midpoint(owner, repo, since_dt, until_dt, count)
+        if mid is None:
+            return [(since_dt, until_dt, count)]
+
+        left_count = await self._count_issues(owner, repo, since_dt, mid, label)
+        left, right = await asyncio.gather(
+            self._split_search_window(owner, repo, since_dt, mid, label, left_count),
+            self._split_search_window(owner, repo, mid + timedelta(seconds=1), until_dt, label,
+                                      count - left_count),
+        )
+        return left + right
+
+    async def _search_issues(self, owner, repo, since_day, until_day, label=None):
+        since_dt = self._parse_date(since_day).replace(microsecond=0)
+        until_dt = self._parse_date(until_day).replace(microsecond=0)
+
+        windows = await self._split_search_window(owner, repo, since_dt, until_dt, label)
+        pages = self._search_pages(owner, repo, windows, label)
+        results = []
+        while pages:
+            responses = await gather_bounded(self.github_rest.get_github_issues(*qp) for qp in pages)
+            results.extend(zip(pages, [r.get("items", []) for r in responses]))
+            pages = self._next_search_pages(owner, repo, results)
+        return self._merge_search_results([items for _, items in results])
+
+    async def get_github_releases(self, owner, repo, since_day, until_day):
+        timeline = self.get_release_timeline(owner, repo)
+        return [r.as_dict() for r in await timeline.published_between(since_day, until_day)]
+
+    async def get_github_releases_created(self, owner, repo, since_release, until_release):
+        timeline = self.get_release_timeline(owner, repo)
+        return [r.as_dict() for r in await timeline.created_between(since_release, until_release)]
+
+    async def _get_anchor_releases(self, owner, repo, since_day, until_day):
+        timeline = self.get_release_timeline(owner, repo)
+        releases = await timeline.published_between(since_day, until_day)
+        if not releases:
+            return []
+
+        first_created = releases[0].created_at
+        last_created = releases[-1].created_at
+        created_rels = await timeline.created_between(first_created, last_created)
+
+        pre = await timeline.latest_created_before(first_created)
+        if pre:
+            created_rels.insert(0, pre)
+        return created_rels
+
+    async def get_github_deployment_frequency(self, owner, repo, since_day, until_day):
+        timeline = self.get_release_timeline(owner, repo)
+        return self._deployment_intervals(await timeline.published_between(since_day, until_day))
+
+    async def _get_issues_with_commits(self, owner, repo, since_release, until_release, label=None):
+        items = await self._search_issues(owner, repo, since_release, until_release, label)
+        events_per_issue = await self.github_rest.get_github_issues_events(
+            owner, repo, [issue.number for issue in items]
+        )
+        self.progress.incr("issues_processed", len(items))
+        return self._issues_committed_between(items, events_per_issue, since_release, until_release)
+
+    async def get_github_issues_committed_in_period(self, owner, repo, since_release, until_release, bug_label):
+        return await self._get_issues_with_commits(owner, repo, since_release, until_release)
+
+    async def get_github_incidents_committed_in_period(self, owner, repo, since_release, until_release, bug_label):
+        return await self._get_issues_with_commits(owner, repo, since_release, until_release, bug_label)
+
+    async def get_github_lead_time_for_changes(self, owner, repo, since_day, until_day, bug_label):
+        created_rels = await self._get_anchor_releases(owner, repo, since_day, until_day)
+        if len(created_rels) < 2:
+            return []
+        issues = await self.get_github_issues_committed_in_period(
+            owner, repo, created_rels[0].created_at, created_rels[-1].created_at, bug_label
+        )
+        return self._lead_times(created_rels, issues)
+
+    async def get_github_time_to_restore_service(self, owner, repo, since_day, until_day, bug_label):
+        created_rels = await self._get_anchor_releases(owner, repo, since_day, until_day)
+        if len(created_rels) < 2:
+            return []
+        incidents = await self.get_github_incidents_committed_in_period(
+            owner, repo, created_rels[0].created_at, created_rels[-1].created_at, bug_label
+        )
+        return self._recovery_times(created_rels, incidents)
+
+    async def get_github_change_failure_rate(self, owner, repo, since_day, until_day, bug_label):
+        num_inc, num_all = await asyncio.gather(
+            self._count_issues(owner, repo, since_day, until_day, bug_label),
+            self._count_issues(owner, repo, since_day, until_day),
+        )
+        return self._failure_ratio(num_inc, num_all)
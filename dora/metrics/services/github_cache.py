@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from django.conf import settings
+from django.core.cache import caches
+
+
+class FileSystemCacheBackend:
+    """
+    Stores one JSON file per cached response. The file mtime doubles as the
+    last-access time, so eviction drops the least recently used entries once
+    the directory holds more than max_entries files.
+    """
+
+    def __init__(self, directory, max_entries):
+        self.directory = str(directory)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._count = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as fh:
+                entry = json.load(fh)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return entry
+
+    def set(self, key, entry):
+        path = self._path(key)
+        is_new = not os.path.exists(path)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(entry, fh)
+            os.replace(tmp_path, path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+
+        with self._lock:
+            if self._count is None:
+                self._count = self._scan_count()
+            elif is_new:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict()
+
+    def _scan_count(self):
+        return sum(1 for e in os.scandir(self.directory) if e.name.endswith(".json"))
+
+    def _evict(self):
+        entries = [e for e in os.scandir(self.directory) if e.name.endswith(".json")]
+        entries.sort(key=lambda e: e.stat().st_mtime)
+        # prune to 90% so eviction does not run on every subsequent write
+        keep = int(self.max_entries * 0.9)
+        for entry in entries[:max(len(entries) - keep, 0)]:
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+        self._count = min(len(entries), keep)
+
+
+class DjangoCacheBackend:
+    """
+    Delegates to a configured Django cache. Size bounds and eviction are those
+    of the cache itself (MAX_ENTRIES / CULL_FREQUENCY; locmem evicts LRU).
+    """
+
+    def __init__(self, alias, timeout=None):
+        self.cache = caches[alias]
+        self.timeout = timeout
+
+    def get(self, key):
+        return self.cache.get(f"github:{key}")
+
+    def set(self, key, entry):
+        self.cache.set(f"github:{key}", entry, self.timeout)
+
+
+class ResponseCache:
+    """
+    Conditional-request cache for GitHub API responses, keyed by URL + params.
+    Entries keep the ETag / Last-Modified validators alongside the decoded body.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    @staticmethod
+    def make_key(url, params=None):
+        normalized = json.dumps([url, sorted((params or {}).items())], default=str)
+        return hashlib.sha256(normalized.encode()).hexdigest()
+
+    def get(self, url, params=None):
+        return self.backend.get(self.make_key(url, params))
+
+    def set(self, url, params, response, body):
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if not etag and not last_modified:
+            return
+        self.backend.set(self.make_key(url, params), {
+            "etag": etag,
+            "last_modified": last_modified,
+            "body": body,
+        })
+
+    @staticmethod
+    def conditional_headers(entry):
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+
+_response_cache = None
+_response_cache_config = None
+_response_cache_lock = threading.Lock()
+
+
+def _build_response_cache():
+    backend_name = settings.GITHUB_CACHE_BACKEND
+    if backend_name == "filesystem":
+        backend = FileSystemCacheBackend(settings.GITHUB_CACHE_DIR, settings.GITHUB_CACHE_MAX_ENTRIES)
+    elif backend_name == "django":
+        backend = DjangoCacheBackend(settings.GITHUB_CACHE_ALIAS)
+    else:
+        return None
+    return ResponseCache(backend)
+
+
+def get_response_cache():
+    """
+    Returns the process-wide ResponseCache selected by GITHUB_CACHE_BACKEND
+    ("filesystem", "django" or "none"), or None when caching is disabled. It is
+    rebuilt when the cache settings change.
+    """
+    global _response_cache, _response_cache_config
+    config = (
+        settings.GITHUB_CACHE_BACKEND, settings.GITHUB_CACHE_DIR,
+        settings.GITHUB_CACHE_MAX_ENTRIES, settings.GITHUB_CACHE_ALIAS,
+    )
+    with _response_cache_lock:
+        if config != _response_cache_config:
+            _response_cache = _build_response_cache()
+            _response_cache_config = config
+    return _response_cache
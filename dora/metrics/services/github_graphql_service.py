@@ -0,0 +1,151 @@
+import threading
+from django.conf import settings
+from .github_rest_service import GitHubRestService
+
+RELEASES_QUERY = """
+query($owner: String!, $repo: String!, $first: Int!, $after: String) {
+  repository(owner: $owner, name: $repo) {
+    releases(first: $first, after: $after, orderBy: {field: CREATED_AT, direction: DESC}) {
+      nodes { databaseId tagName createdAt publishedAt isPrerelease isDraft }
+      pageInfo { hasNextPage endCursor }
+    }
+  }
+}
+"""
+
+ISSUE_TIMELINE_FIELDS = """
+    timelineItems(itemTypes: [REFERENCED_EVENT], first: 100%s) {
+      nodes { ... on ReferencedEvent { createdAt } }
+      pageInfo { hasNextPage endCursor }
+    }
+"""
+
+
+class GitHubGraphQLError(Exception):
+    pass
+
+
+class GitHubGraphQLService(GitHubRestService):
+    """
+    Drop-in replacement for GitHubRestService that reads releases and issue timelines
+    through the GraphQL API: the 'referenced' events of up to ISSUES_PER_QUERY issues
+    come back from a single query instead of one REST call per issue. Search still
+    goes through the REST endpoint. Responses are shaped like the REST ones.
+    """
+    ISSUES_PER_QUERY = 100
+
+    def __init__(self, progress=None, scheduler=None):
+        super().__init__(progress=progress, scheduler=scheduler)
+        self.graphql_url = settings.GITHUB_GRAPHQL_URL
+        self._release_cursors = {}
+        self._release_last_page = {}
+        self._cursor_lock = threading.Lock()
+
+    def _graphql(self, query, variables=None):
+        response = self._send(
+            "POST", self.graphql_url, self.headers,
+            json_body={"query": query, "variables": variables or {}},
+        )
+        response.raise_for_status()
+        body = response.json()
+        if body.get("errors"):
+            raise GitHubGraphQLError("; ".join(e.get("message", "") for e in body["errors"]))
+        return body["data"]
+
+    def _releases_page(self, owner, repo, per_page, after):
+        data = self._graphql(RELEASES_QUERY, {
+            "owner": owner, "repo": repo, "first": per_page, "after": after,
+        })
+        conn = data["repository"]["releases"]
+        releases = [
+            {
+                "id": n["databaseId"],
+                "tag_name": n["tagName"],
+                "created_at": n["createdAt"],
+                "published_at": n["publishedAt"],
+                "prerelease": n["isPrerelease"],
+                "draft": n["isDraft"],
+            }
+            for n in conn["nodes"]
+        ]
+        page_info = conn["pageInfo"]
+        return releases, page_info["endCursor"] if page_info["hasNextPage"] else None
+
+    def get_github_releases(self, owner, repo, page=1, per_page=100):
+        """
+        Page-numbered access on top of GraphQL cursors. The end cursor of every page
+        is remembered, so sequential paging costs one query per page.
+        """
+        key = (owner, repo, per_page)
+        with self._cursor_lock:
+            if page > self._release_last_page.get(key, page):
+                return []
+            cursors = self._release_cursors.setdefault(key, {1: None})
+            start = max(p for p in cursors if p <= page)
+            after = cursors[start]
+
+        current = start
+        while True:
+            releases, end_cursor = self._releases_page(owner, repo, per_page, after)
+            with self._cursor_lock:
+                if end_cursor is not None:
+                    cursors[current + 1] = end_cursor
+                else:
+                    self._release_last_page[key] = current
+            if current == page:
+                return releases
+            if end_cursor is None:
+                return []
+            after = end_cursor
+            current += 1
+
+    def _timeline_query(self, owner, repo, numbers, after_by_number):
+        fields = []
+        for n in numbers:
+            after = after_by_number.get(n)
+            after_arg = f', after: "{after}"' if after else ""
+            fields.append(f"  issue_{n}: issue(number: {n}) {{{ISSUE_TIMELINE_FIELDS % after_arg}  }}")
+        return (
+            "query($owner: String!, $repo: String!) {\n"
+            "  repository(owner: $owner, name: $repo) {\n"
+            + "\n".join(fields)
+            + "\n  }\n}\n"
+        )
+
+    def get_github_issues_events(self, owner, repo, issue_numbers):
+        """
+        Returns the 'referenced' events of each issue, in the order of issue_numbers,
+        batching ISSUES_PER_QUERY issues per GraphQL query. Issues with more than 100
+        such events are paged in follow-up queries.
+        """
+        issue_numbers = list(issue_numbers)
+        events = {n: [] for n in issue_numbers}
+
+        for i in range(0, len(issue_numbers), self.ISSUES_PER_QUERY):
+            pending = list(dict.fromkeys(issue_numbers[i:i + self.ISSUES_PER_QUERY]))
+            after_by_number = {}
+            while pending:
+                data = self._graphql(
+                    self._timeline_query(owner, repo, pending, after_by_number),
+                    {"owner": owner, "repo": repo},
+                )
+                repository = data["repository"]
+                next_pending = []
+                for n in pending:
+                    issue = repository.get(f"issue_{n}")
+                    if not issue:
+                        continue
+                    timeline = issue["timelineItems"]
+                    events[n].extend(
+                        {"event": "referenced", "created_at": node["createdAt"]}
+                        for node in timeline["nodes"] if node
+                    )
+                    if timeline["pageInfo"]["hasNextPage"]:
+                        after_by_number[n] = timeline["pageInfo"]["endCursor"]
+                        next_pending.append(n)
+                pending = next_pending
+
+        return [events[n] for n in issue_numbers]
+
+    def get_github_issue_events(self, owner, repo, issue_number):
+        return self.get_github_issues_events(owner, repo, [issue_number])[0]
@@ -0,0 +1,224 @@
+"""
+Coordinates the GitHub request budget of every process sharing a set of credentials.
+
+Each (credential, API resource) pair has a token bucket that smooths requests below
+GitHub's per-minute secondary limits (GITHUB_RATE_LIMITS), plus the primary quota
+GitHub reports in its X-RateLimit-Remaining / X-RateLimit-Reset headers. The state
+is a small JSON file (GITHUB_RATE_LIMIT_FILE) read and written under an exclusive
+file lock before and after every request, so gunicorn workers and job runners on
+one host draw from the same budget instead of racing into 403s. Requests go out
+with whichever credential of GITHUB_CREDENTIALS has the most budget left.
+"""
+import base64
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from django.conf import settings
+from . import instrumentation
+
+try:
+    import fcntl
+except ImportError:  # Windows: the budget is only shared by the threads of one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# shorter waits are the token buckets' normal pacing, logged at DEBUG only
+LOG_WAITS_FROM_SECONDS = 1.0
+
+Credential = namedtuple("Credential", ["username", "authorization"])
+
+
+def load_credentials():
+    """
+    The credentials to rotate through: GITHUB_CREDENTIALS ("username:token"
+    entries), or GITHUB_USERNAME / GITHUB_PASSWORD.
+    """
+    pairs = [entry.split(":", 1) for entry in settings.GITHUB_CREDENTIALS if ":" in entry]
+    if not pairs:
+        pairs = [(settings.GITHUB_USERNAME, settings.GITHUB_PASSWORD)]
+    return [
+        Credential(username, "Basic " + base64.b64encode(f"{username}:{password}".encode()).decode())
+        for username, password in pairs
+    ]
+
+
+def is_rate_limited(response):
+    if response.status_code == 429:
+        return True
+    if response.status_code != 403:
+        return False
+    return (
+        "Retry-After" in response.headers
+        or response.headers.get("X-RateLimit-Remaining") == "0"
+        or "rate limit" in response.text.lower()
+    )
+
+
+def _int_header(headers, name):
+    value = headers.get(name)
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateLimitCoordinator:
+    """
+    Request budget of `credentials`, with `limits` mapping an API resource ("core",
+    "search", "graphql") to a token bucket of (requests, window seconds). Without a
+    `path` the state is kept in memory for this process only.
+
+    Budgets are keyed by username: GitHub counts the limits per account, so two
+    tokens of one account share one budget.
+    """
+
+    def __init__(self, credentials, limits, path=None):
+        self.credentials = list(credentials)
+        self.limits = {resource: limit for resource, limit in limits.items() if limit and limit[0] > 0}
+        self.path = path or None
+        self._lock = threading.Lock()
+        self._state = {}
+
+    @contextmanager
+    def _locked_state(self):
+        with self._lock:
+            if self.path is None or fcntl is None:
+                yield self._state
+                return
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            with os.fdopen(fd, "r+", encoding="utf-8") as fh:
+                fcntl.flock(fh, fcntl.LOCK_EX)
+                try:
+                    try:
+                        state = json.loads(fh.read() or "{}")
+                    except ValueError:
+                        state = {}
+                    yield state
+                    fh.seek(0)
+                    fh.truncate()
+                    json.dump(state, fh)
+                finally:
+                    fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def _bucket(self, state, credential, resource, now):
+        limit = self.limits.get(resource)
+        bucket = state.setdefault(f"{credential.username}:{resource}", {
+            "tokens": float(limit[0]) if limit else 0.0, "updated": now,
+            "remaining": None, "reset": 0.0, "resume_at": 0.0, "used": 0,
+        })
+        if limit:
+            requests, window = limit
+            refill = (now - bucket["updated"]) * requests / window
+            bucket["tokens"] = min(float(requests), bucket["tokens"] + max(refill, 0.0))
+        bucket["updated"] = now
+        if bucket["reset"] <= now:
+            # GitHub's window is over: the quota is unknown until the next response
+            bucket["remaining"] = None
+        return bucket
+
+    def _delay(self, bucket, resource, now):
+        """Seconds until `bucket` may send a request (0 if it may now)."""
+        delay = max(bucket["resume_at"] - now, 0.0)
+        if bucket["remaining"] is not None and bucket["remaining"] <= 0:
+            delay = max(delay, bucket["reset"] + 1 - now)
+        limit = self.limits.get(resource)
+        if limit and bucket["tokens"] < 1:
+            delay = max(delay, (1 - bucket["tokens"]) * limit[1] / limit[0])
+        return delay
+
+    def acquire(self, resource):
+        """
+        Spends one request of `resource` from the credential with the most budget
+        left. Returns (credential, 0.0), or (None, seconds until one is available).
+        """
+        now = time.time()
+        with self._locked_state() as state:
+            best, best_key, wait = None, None, math.inf
+            for credential in self.credentials:
+                bucket = self._bucket(state, credential, resource, now)
+                delay = self._delay(bucket, resource, now)
+                if delay > 0:
+                    wait = min(wait, delay)
+                    continue
+                remaining = bucket["remaining"] if bucket["remaining"] is not None else math.inf
+                key = (remaining, bucket["tokens"], -bucket["used"])
+                if best is None or key > best_key:
+                    best, best_key = (credential, bucket), key
+            if best is None:
+                return None, wait
+
+            credential, bucket = best
+            if resource in self.limits:
+                bucket["tokens"] -= 1
+            if bucket["remaining"] is not None:
+                bucket["remaining"] -= 1
+            bucket["used"] += 1
+            return credential, 0.0
+
+    def take(self, resource):
+        """acquire(), sleeping until a credential has budget left."""
+        while True:
+            credential, delay = self.acquire(resource)
+            if credential is not None:
+                return credential
+            level = logging.INFO if delay >= LOG_WAITS_FROM_SECONDS else logging.DEBUG
+            logger.log(level, "GitHub %s rate limit reached, sleeping %.1fs", resource, delay)
+            instrumentation.record_rate_limit_wait(resource, delay)
+            time.sleep(delay)
+
+    def update(self, credential, resource, response):
+        """
+        Records the rate-limit headers of `response`, sent with `credential`.
+        Returns True if they ask to pause this credential (quota exhausted or
+        Retry-After), i.e. a retry is already paced.
+        """
+        headers = response.headers
+        now = time.time()
+        remaining = _int_header(headers, "X-RateLimit-Remaining")
+        reset = _int_header(headers, "X-RateLimit-Reset")
+        retry_after = _int_header(headers, "Retry-After")
+        if remaining is None and retry_after is None:
+            return False
+
+        if remaining is not None:
+            instrumentation.record_rate_limit_remaining(resource, remaining)
+        with self._locked_state() as state:
+            bucket = self._bucket(state, credential, resource, now)
+            if retry_after is not None:
+                bucket["resume_at"] = max(bucket["resume_at"], now + retry_after)
+            if remaining is not None and reset is not None:
+                if reset != bucket["reset"] or bucket["remaining"] is None:
+                    bucket["reset"], bucket["remaining"] = float(reset), remaining
+                else:
+                    # requests sent since this response left GitHub are already deducted
+                    bucket["remaining"] = min(bucket["remaining"], remaining)
+        return retry_after is not None or (remaining is not None and reset is not None and remaining <= 0)
+
+
+_coordinator = None
+_coordinator_lock = threading.Lock()
+
+
+def get_coordinator():
+    """
+    The process-wide RateLimitCoordinator for the current settings, rebuilt when
+    the credentials, limits or state file change.
+    """
+    global _coordinator
+    config = (
+        tuple(settings.GITHUB_CREDENTIALS), settings.GITHUB_USERNAME, settings.GITHUB_PASSWORD,
+        tuple(sorted(settings.GITHUB_RATE_LIMITS.items())), settings.GITHUB_RATE_LIMIT_FILE,
+    )
+    with _coordinator_lock:
+        if _coordinator is None or _coordinator.config != config:
+            _coordinator = RateLimitCoordinator(
+                load_credentials(), settings.GITHUB_RATE_LIMITS, settings.GITHUB_RATE_LIMIT_FILE
+            )
+            _coordinator.config = config
+    return _coordinator
@@ -0,0 +1,93 @@
+from datetime import datetime, timezone
+from dateutil import parser
+
+DATE_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+def parse_timestamp(date_val):
+    """
+    An aware UTC datetime from a datetime or an ISO 8601 string. GitHub's
+    timestamps take the fast datetime.fromisoformat path; anything it rejects
+    falls back to dateutil.
+    """
+    if isinstance(date_val, datetime):
+        dt = date_val
+    else:
+        try:
+            dt = datetime.fromisoformat(date_val)
+        except ValueError:
+            dt = parser.isoparse(date_val)
+    return dt.astimezone(timezone.utc)
+
+
+class ReleaseRecord:
+    """The fields of a GitHub release the metrics use, with parsed timestamps."""
+
+    __slots__ = ("id", "tag_name", "created_at", "published_at", "prerelease")
+
+    def __init__(self, id, tag_name, created_at, published_at, prerelease):
+        self.id = id
+        self.tag_name = tag_name
+        self.created_at = created_at
+        self.published_at = published_at
+        self.prerelease = prerelease
+
+    @classmethod
+    def from_api(cls, data):
+        published = data.get("published_at")
+        return cls(
+            data.get("id"),
+            data.get("tag_name"),
+            parse_timestamp(data["created_at"]),
+            # drafts have no published_at and never count as deployments
+            parse_timestamp(published) if published else None,
+            bool(data.get("prerelease", False)),
+        )
+
+    def as_dict(self):
+        return {
+            "id": self.id,
+            "tag_name": self.tag_name,
+            "created_at": self.created_at.strftime(DATE_FORMAT),
+            "published_at": self.published_at.strftime(DATE_FORMAT) if self.published_at else None,
+            "prerelease": self.prerelease,
+        }
+
+    def __repr__(self):
+        return f"<ReleaseRecord {self.tag_name or self.id} {self.created_at:%Y-%m-%d}>"
+
+
+class IssueRecord:
+    """
+    An issue reduced to its number and parsed timestamps. `last_commit_at` is the
+    latest commit reference inside the window it was searched for, once known.
+    """
+
+    __slots__ = ("number", "created_at", "last_commit_at")
+
+    def __init__(self, number, created_at, last_commit_at=None):
+        self.number = number
+        self.created_at = created_at
+        self.last_commit_at = last_commit_at
+
+    @classmethod
+    def from_api(cls, data):
+        return cls(data["number"], parse_timestamp(data["created_at"]))
+
+    def __repr__(self):
+        return f"<IssueRecord #{self.number}>"
+
+
+def last_reference_at(events, since_dt, until_dt):
+    """
+    The latest 'referenced' (commit) event of `events` strictly between since_dt
+    and until_dt, or None. Each event timestamp is parsed once.
+    """
+    latest = None
+    for e in events:
+        if e.get("event") != "referenced":
+            continue
+        at = parse_timestamp(e["created_at"])
+        if since_dt < at < until_dt and (latest is None or at > latest):
+            latest = at
+    return latest
@@ -1,35 +1,201 @@
-import base64
+import contextvars
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from django.conf import settings
+from django.db import connection
+from . import instrumentation
+from .github_cache import get_response_cache
+from .github_rate_limit import get_coordinator, is_rate_limited
+from .progress import Progress
 
+_session = None
+_session_config = None
+_session_lock = threading.Lock()
 
-class GitHubRestService:
-    BASE_URL = "https://api.github.com/"
 
-    def __init__(self):
-        auth_str = f"{settings.GITHUB_USERNAME}:{settings.GITHUB_PASSWORD}"
-        token = base64.b64encode(auth_str.encode()).decode()
+def get_session():
+    """
+    Returns the process-wide keep-alive session shared by every GitHubRestService,
+    so consecutive calls reuse pooled TLS connections instead of opening new ones.
+    5xx responses are retried with exponential backoff by the transport adapter.
+    The session is rebuilt when the pool or retry settings change.
+    """
+    global _session, _session_config
+    config = (settings.GITHUB_MAX_RETRIES, settings.GITHUB_BACKOFF_FACTOR, settings.GITHUB_POOL_SIZE)
+    with _session_lock:
+        if _session is None or _session_config != config:
+            retry = Retry(
+                total=settings.GITHUB_MAX_RETRIES,
+                backoff_factor=settings.GITHUB_BACKOFF_FACTOR,
+                status_forcelist=[500, 502, 503, 504],
+                allowed_methods=["GET", "POST"],
+                respect_retry_after_header=True,
+                raise_on_status=False,
+            )
+            adapter = HTTPAdapter(
+                pool_connections=settings.GITHUB_POOL_SIZE,
+                pool_maxsize=settings.GITHUB_POOL_SIZE,
+                max_retries=retry,
+            )
+            session = requests.Session()
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _session, _session_config = session, config
+    return _session
+
+
+def parallel_map(fn, items):
+    """
+    Applies fn to every item on a bounded thread pool (GITHUB_MAX_WORKERS) and
+    returns the results in the order of items. Each call runs in a copy of the
+    caller's context, so per-request instrumentation follows it.
+    """
+    def run(item):
+        try:
+            return fn(item)
+        finally:
+            # progress flushes from worker threads open their own connections
+            connection.close()
+
+    items = list(items)
+    if len(items) <= 1 or settings.GITHUB_MAX_WORKERS <= 1:
+        return [fn(item) for item in items]
+
+    workers = min(settings.GITHUB_MAX_WORKERS, len(items))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, run, item) for item in items]
+        return [f.result() for f in futures]
+
+
+class GitHubRestService:
+    def __init__(self, progress=None, scheduler=None):
+        self.base_url = settings.GITHUB_API_URL
+        # Authorization is added per request, from the credential the coordinator picks
         self.headers = {
-            "Authorization": f"Basic {token}",
             "Accept": "application/json"
         }
+        self.rate_limits = get_coordinator()
+        self.session = get_session()
+        self.cache = get_response_cache()
+        self.progress = progress or Progress()
+        # ProjectQueue of a FairScheduler when this client is part of a batch
+        self.scheduler = scheduler
+
+    @staticmethod
+    def _resource_for(url):
+        if "/search/" in url:
+            return "search"
+        if url.rstrip("/").endswith("/graphql"):
+            return "graphql"
+        return "core"
+
+    @staticmethod
+    def _endpoint_for(url):
+        """The endpoint label of `url` in the instrumentation."""
+        path = url.rstrip("/")
+        for suffix, endpoint in (("/search/issues", "search_issues"), ("/graphql", "graphql"),
+                                 ("/releases", "releases"), ("/events", "issue_events")):
+            if path.endswith(suffix):
+                return endpoint
+        return "other"
+
+    @staticmethod
+    def _record_response(resource, endpoint, response, seconds):
+        instrumentation.record_github_response(
+            resource, endpoint, response.status_code, seconds, len(response.content)
+        )
+
+    def _send(self, method, url, headers, params=None, json_body=None):
+        """
+        Sends a request through the shared session with a credential that has budget
+        left, waiting out primary and secondary rate limits before retrying. Returns
+        the final response.
+        """
+        resource = self._resource_for(url)
+        endpoint = self._endpoint_for(url)
+        attempt = 0
+        while True:
+            credential = self.rate_limits.take(resource)
+            request_headers = {**headers, "Authorization": credential.authorization}
+            started = time.perf_counter()
+            slot = self.scheduler.slot() if self.scheduler is not None else nullcontext()
+            with slot:
+                response = self.session.request(
+                    method, url, headers=request_headers, params=params, json=json_body
+                )
+            self._record_response(resource, endpoint, response, time.perf_counter() - started)
+            # 5xx responses retried inside the transport adapter
+            retries = getattr(response.raw, "retries", None)
+            if retries is not None and retries.history:
+                instrumentation.record_retry(resource, "server_error", len(retries.history))
+            paced = self.rate_limits.update(credential, resource, response)
+
+            if is_rate_limited(response) and attempt < settings.GITHUB_MAX_RETRIES:
+                instrumentation.record_retry(resource, "rate_limited")
+                if not paced:
+                    # secondary limit without headers: back off exponentially
+                    time.sleep(settings.GITHUB_BACKOFF_FACTOR * (2 ** attempt))
+                attempt += 1
+                continue
+
+            self.progress.incr("pages_fetched")
+            return response
+
+    def _get(self, url, params=None):
+        """
+        GETs a JSON resource. Raises for any error status.
+        Cached responses are revalidated with If-None-Match / If-Modified-Since;
+        a 304 is served from the cache and does not count against the rate limit.
+        """
+        cached = self.cache.get(url, params) if self.cache else None
+        headers = dict(self.headers)
+        if cached:
+            headers.update(self.cache.conditional_headers(cached))
+
+        response = self._send("GET", url, headers, params=params)
+        if self.cache:
+            self._record_cache(response, cached)
+        if response.status_code == 304 and cached:
+            return cached["body"]
+
+        response.raise_for_status()
+        body = response.json()
+        if self.cache:
+            self.cache.set(url, params, response, body)
+        return body
+
+    @staticmethod
+    def _record_cache(response, cached):
+        if not cached:
+            instrumentation.record_cache("miss")
+        elif response.status_code == 304:
+            instrumentation.record_cache("not_modified")
+        else:
+            instrumentation.record_cache("modified")
 
     def get_github_releases(self, owner, repo, page=1, per_page=100):
-        url = f"{self.BASE_URL}repos/{owner}/{repo}/releases"
+        url = f"{self.base_url}repos/{owner}/{repo}/releases"
         params = {"page": page, "per_page": per_page}
-        response = requests.get(url, headers=self.headers, params=params)
-        response.raise_for_status()
-        return response.json()
+        return self._get(url, params)
 
     def get_github_issues(self, query, page=1, per_page=100):
-        url = f"{self.BASE_URL}search/issues"
+        url = f"{self.base_url}search/issues"
         params = {"q": query, "page": page, "per_page": per_page}
-        response = requests.get(url, headers=self.headers, params=params)
-        response.raise_for_status()
-        return response.json()
+        return self._get(url, params)
 
     def get_github_issue_events(self, owner, repo, issue_number):
-        url = f"{self.BASE_URL}repos/{owner}/{repo}/issues/{issue_number}/events"
-        response = requests.get(url, headers=self.headers)
-        response.raise_for_status()
-        return response.json()
+        url = f"{self.base_url}repos/{owner}/{repo}/issues/{issue_number}/events"
+        return self._get(url)
+
+    def get_github_issues_events(self, owner, repo, issue_numbers):
+        """
+        Fetches the events of several issues concurrently on a bounded worker pool
+        (GITHUB_MAX_WORKERS). Results are returned in the order of issue_numbers.
+        Every call still goes through the shared rate limiter.
+        """
+        return parallel_map(lambda n: self.get_github_issue_events(owner, repo, n), issue_numbers)
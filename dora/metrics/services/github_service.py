@@ -1,241 +1,288 @@
-import time
-from datetime import datetime, timezone
-from dateutil import parser
-from .github_rest_service import GitHubRestService
+import logging
+import math
+from datetime import timedelta
+from django.conf import settings
+from . import search_counts
+from .github_graphql_service import GitHubGraphQLService
+from .github_records import IssueRecord, last_reference_at, parse_timestamp
+from .github_rest_service import GitHubRestService, parallel_map
+from .progress import Progress
+from .release_timeline import ReleaseTimeline
+
+logger = logging.getLogger(__name__)
+
+
+def create_github_client(progress=None, scheduler=None):
+    """
+    Returns the GitHub API client selected by GITHUB_BACKEND ("rest" or "graphql").
+    """
+    if settings.GITHUB_BACKEND == "graphql":
+        return GitHubGraphQLService(progress=progress, scheduler=scheduler)
+    return GitHubRestService(progress=progress, scheduler=scheduler)
 
 
 class GitHubService:
     DATE_FORMAT = "%Y-%m-%dT%H:%M:%S+00:00"
+    SEARCH_RESULT_CAP = 1000
 
-    def __init__(self):
-        self.github_rest = GitHubRestService()
+    def __init__(self, progress=None, scheduler=None):
+        self.progress = progress or Progress()
+        self.github_rest = create_github_client(progress=self.progress, scheduler=scheduler)
+        self._timelines = {}
 
     def _parse_date(self, date_val):
-        if isinstance(date_val, datetime):
-            dt = date_val
-        else:
-            dt = parser.isoparse(date_val)
-        return dt.astimezone(timezone.utc)
+        return parse_timestamp(date_val)
 
     def _format_date(self, date_obj):
         return date_obj.strftime(self.DATE_FORMAT)
 
-    def _get_divider(self, owner, repo, since_day, until_day, bug_label):
+    def _issue_search_query(self, owner, repo, since_day, until_day, label=None):
         since_str = self._format_date(self._parse_date(since_day))
         until_str = self._format_date(self._parse_date(until_day))
-
-        page, per_page = 1, 100
-
-        # count incidents (bug-label issues)
-        q_inc = (
-            f"label:{bug_label} repo:{owner}/{repo} is:issue "
+        label_q = f"label:{label} " if label else ""
+        return (
+            f"{label_q}repo:{owner}/{repo} is:issue "
             f"created:{since_str}..{until_str} sort:created-asc"
         )
-        inc_res = self.github_rest.get_github_issues(q_inc, page, per_page)
-        num_inc = inc_res.get("total_count", 0)
 
-        # count all issues
-        q_all = (
-            f"repo:{owner}/{repo} is:issue "
-            f"created:{since_str}..{until_str} sort:created-asc"
+    def _count_issues(self, owner, repo, since_day, until_day, label=None):
+        """
+        Returns the number of issues created in [since_day, until_day], optionally
+        restricted to those carrying `label`, from the search API total_count.
+        Counts are cached for GITHUB_SEARCH_COUNT_TTL seconds, so the metrics and
+        requests sharing a window share one search call.
+        """
+        query = self._issue_search_query(owner, repo, since_day, until_day, label)
+        count = search_counts.get(query)
+        if count is None:
+            count = search_counts.remember(query, self.github_rest.get_github_issues(query, 1, 1))
+        return count
+
+    def _split_midpoint(self, owner, repo, since_dt, until_dt, count):
+        """
+        Where to split a window matching `count` issues, or None if it is kept whole:
+        below SEARCH_RESULT_CAP, or too short (< 2s) to split any further.
+        """
+        if count < self.SEARCH_RESULT_CAP:
+            return None
+        if until_dt - since_dt < timedelta(seconds=2):
+            logger.warning(
+                "%s issues of %s/%s created within %s..%s; only the first %s are searchable",
+                count, owner, repo, since_dt, until_dt, self.SEARCH_RESULT_CAP,
+            )
+            return None
+        return (since_dt + (until_dt - since_dt) / 2).replace(microsecond=0)
+
+    def _split_search_window(self, owner, repo, since_dt, until_dt, label=None, count=None):
+        """
+        Splits the `created:` range [since_dt, until_dt] (whole seconds, inclusive) in
+        halves until every sub-window matches fewer than SEARCH_RESULT_CAP issues.
+        Returns [(since_dt, until_dt, count)] in chronological order. Only the left
+        half of each split is counted; the right half is the remainder.
+        """
+        if count is None:
+            count = self._count_issues(owner, repo, since_dt, until_dt, label)
+        mid = self._split_midpoint(owner, repo, since_dt, until_dt, count)
+        if mid is None:
+            return [(since_dt, until_dt, count)]
+
+        left_count = self._count_issues(owner, repo, since_dt, mid, label)
+        return (
+            self._split_search_window(owner, repo, since_dt, mid, label, left_count)
+            + self._split_search_window(owner, repo, mid + timedelta(seconds=1), until_dt, label,
+                                        count - left_count)
         )
-        all_res = self.github_rest.get_github_issues(q_all, page, per_page)
-        num_all = all_res.get("total_count", 0)
 
-        total = int(num_inc) + int(num_all)
-        approx = total + (total // 100)
-        if approx > 5000:
-            approx = approx // 5000
-            return int(approx) + 1
-        return 1
+    def _search_issues(self, owner, repo, since_day, until_day, label=None):
+        """
+        Returns an IssueRecord for every issue created in [since_day, until_day]
+        (optionally with `label`), oldest first. The range is split into sub-windows below the 1000-result search
+        cap and all their result pages are fetched in parallel.
+        """
+        since_dt = self._parse_date(since_day).replace(microsecond=0)
+        until_dt = self._parse_date(until_day).replace(microsecond=0)
+
+        windows = self._split_search_window(owner, repo, since_dt, until_dt, label)
+        pages = self._search_pages(owner, repo, windows, label)
+        results = []
+        while pages:
+            results.extend(zip(pages, parallel_map(
+                lambda qp: self.github_rest.get_github_issues(*qp).get("items", []), pages
+            )))
+            pages = self._next_search_pages(owner, repo, results)
+        return self._merge_search_results([items for _, items in results])
+
+    def _search_pages(self, owner, repo, windows, label=None, per_page=100):
+        """
+        The (query, page, per_page) search requests expected to cover every result of
+        `windows`, at least one per window.
+        """
+        pages = []
+        for w_since, w_until, count in windows:
+            query = self._issue_search_query(owner, repo, w_since, w_until, label)
+            last_page = min(max(math.ceil(count / per_page), 1), self.SEARCH_RESULT_CAP // per_page)
+            pages.extend((query, page, per_page) for page in range(1, last_page + 1))
+        return pages
+
+    def _next_search_pages(self, owner, repo, results):
+        """
+        The next page of every query whose last page in `results` ([((query, page,
+        per_page), items)], pages of a query in ascending order) came back full. The
+        counts the pages were planned from may be cached, and issues created or
+        labelled since then would otherwise be missed.
+        """
+        last = {}
+        for (query, page, per_page), items in results:
+            last[query] = (page, per_page, len(items))
+        pages = []
+        for query, (page, per_page, size) in last.items():
+            if size < per_page:
+                continue
+            if page >= self.SEARCH_RESULT_CAP // per_page:
+                logger.warning("Search %r of %s/%s reached the %s-result cap; later issues may be missed",
+                               query, owner, repo, self.SEARCH_RESULT_CAP)
+                continue
+            pages.append((query, page + 1, per_page))
+        return pages
+
+    @staticmethod
+    def _merge_search_results(results):
+        issues = []
+        seen = set()
+        for items in results:
+            for issue in items:
+                # an issue can move across page boundaries between requests
+                if issue["number"] not in seen:
+                    seen.add(issue["number"])
+                    issues.append(IssueRecord.from_api(issue))
+        return issues
+
+    def get_release_timeline(self, owner, repo):
+        """
+        Returns the ReleaseTimeline for owner/repo, created on first use so every
+        metric computed through this service shares a single fetch of /releases.
+        """
+        key = (owner, repo)
+        if key not in self._timelines:
+            self._timelines[key] = ReleaseTimeline(self.github_rest, owner, repo)
+        return self._timelines[key]
 
     def get_github_releases(self, owner, repo, since_day, until_day):
         """
         Returns a list of releases published within the specified [since_day, until_day] window
-        for the given owner/repo, excluding prereleases.
+        for the given owner/repo, excluding prereleases, ordered by published_at.
         """
-        per_page = 100
-        releases_in_period = []
-        since = self._parse_date(since_day)
-        until = self._parse_date(until_day)
-
-        page = 1
-        while True:
-            releases = self.github_rest.get_github_releases(owner, repo, page, per_page)
-            if not releases:
-                break
-
-            filtered = [
-                r for r in releases
-                if (dt := self._parse_date(r["published_at"])) > since
-                   and dt < until
-                   and not r.get("prerelease", False)
-            ]
-            releases_in_period.extend(filtered)
-
-            # if the API-returned batch has at least one item older than `since`, we can stop
-            if any(self._parse_date(r["published_at"]) < since for r in releases):
-                break
-
-            page += 1
-            time.sleep(0.1)
-
-        return releases_in_period
+        timeline = self.get_release_timeline(owner, repo)
+        return [r.as_dict() for r in timeline.published_between(since_day, until_day)]
 
     def get_github_releases_created(self, owner, repo, since_release, until_release):
         """
         Returns all releases whose `created_at` timestamp lies between since_release and until_release.
         """
-        per_page = 100
-        releases_created = []
-        since = self._parse_date(since_release)
-        until = self._parse_date(until_release)
-
-        page = 1
-        while True:
-            releases = self.github_rest.get_github_releases(owner, repo, page, per_page)
-            if not releases:
-                break
-
-            filtered = [
-                r for r in releases
-                if (dt := self._parse_date(r["created_at"])) > since
-                   and dt < until
-                   and not r.get("prerelease", False)
-            ]
-            releases_created.extend(filtered)
+        timeline = self.get_release_timeline(owner, repo)
+        return [r.as_dict() for r in timeline.created_between(since_release, until_release)]
 
-            # if the batch has any item older than `since`, we can stop
-            if any(self._parse_date(r["created_at"]) < since for r in releases):
-                break
+    def _get_anchor_releases(self, owner, repo, since_day, until_day):
+        """
+        Returns the releases created between the first and last release published in
+        [since_day, until_day], preceded by the latest release created before them,
+        ordered by created_at. Used to map commits/incidents to the release that shipped them.
+        """
+        timeline = self.get_release_timeline(owner, repo)
+        releases = timeline.published_between(since_day, until_day)
+        if not releases:
+            return []
 
-            page += 1
-            time.sleep(0.1)
+        first_created = releases[0].created_at
+        last_created = releases[-1].created_at
+        created_rels = timeline.created_between(first_created, last_created)
 
-        return releases_created
+        pre = timeline.latest_created_before(first_created)
+        if pre:
+            created_rels.insert(0, pre)
+        return created_rels
 
     def get_github_deployment_frequency(self, owner, repo, since_day, until_day):
         """
         Returns a list of time differences (in milliseconds) between consecutive releases'
         published_at timestamps within the given window.
         """
-        releases = self.get_github_releases(owner, repo, since_day, until_day)
-        releases_sorted = sorted(releases, key=lambda r: self._parse_date(r["published_at"]))
+        releases = self.get_release_timeline(owner, repo).published_between(since_day, until_day)
+        return self._deployment_intervals(releases)
 
+    @staticmethod
+    def _deployment_intervals(releases):
         diffs = []
-        for i in range(1, len(releases_sorted)):
-            t1 = self._parse_date(releases_sorted[i - 1]["published_at"])
-            t2 = self._parse_date(releases_sorted[i]["published_at"])
+        for i in range(1, len(releases)):
+            t1 = releases[i - 1].published_at
+            t2 = releases[i].published_at
             diffs.append((t2 - t1).total_seconds() * 1000)
-
         return diffs
 
-    def get_github_issues_committed_in_period(self, owner, repo, since_release, until_release, bug_label):
+    def _get_issues_with_commits(self, owner, repo, since_release, until_release, label=None):
         """
-        Retrieves GitHub issues that have commit events (filtered by a 'referenced' event)
-        between since_release and until_release for the given owner/repo and bug_label.
-        Caps at page=10 to avoid exceeding 1 000 results.
+        Returns the issues created in [since_release, until_release] (optionally with
+        `label`) that have a 'referenced' (commit) event strictly inside that range,
+        as IssueRecords with `last_commit_at` set. Events are fetched concurrently.
         """
+        items = self._search_issues(owner, repo, since_release, until_release, label)
+        events_per_issue = self.github_rest.get_github_issues_events(
+            owner, repo, [issue.number for issue in items]
+        )
+        self.progress.incr("issues_processed", len(items))
+        return self._issues_committed_between(items, events_per_issue, since_release, until_release)
+
+    def _issues_committed_between(self, items, events_per_issue, since_release, until_release):
         since_dt = self._parse_date(since_release)
         until_dt = self._parse_date(until_release)
-        since_str = self._format_date(since_dt)
-        until_str = self._format_date(until_dt)
-
-        divider = self._get_divider(owner, repo, since_release, until_release, bug_label)
-        per_page = 100
         issues = []
-
-        page = 1
-        query = f"repo:{owner}/{repo} is:issue created:{since_str}..{until_str} sort:created-asc"
-        while True:
-            if page > 10:
-                break
-
-            result = self.github_rest.get_github_issues(query, page, per_page)
-            items = result.get("items", [])
-            if not items:
-                break
-
-            if divider > 1:
-                items = [it for idx, it in enumerate(items) if idx % divider == 0]
-
-            for issue in items:
-                events = self.github_rest.get_github_issue_events(owner, repo, issue["number"])
-                valid = [
-                    e for e in events
-                    if e.get("event") == "referenced"
-                       and since_dt < self._parse_date(e["created_at"]) < until_dt
-                ]
-                if valid:
-                    valid.sort(key=lambda e: self._parse_date(e["created_at"]))
-                    issue["last_commit_date"] = valid[-1]["created_at"]
-                    issues.append(issue)
-
-            page += 1
-            time.sleep(0.1)
+        for issue, events in zip(items, events_per_issue):
+            issue.last_commit_at = last_reference_at(events, since_dt, until_dt)
+            if issue.last_commit_at is not None:
+                issues.append(issue)
 
         return issues
 
+    def get_github_issues_committed_in_period(self, owner, repo, since_release, until_release, bug_label):
+        """
+        Retrieves GitHub issues that have commit events (filtered by a 'referenced' event)
+        between since_release and until_release for the given owner/repo.
+        """
+        return self._get_issues_with_commits(owner, repo, since_release, until_release)
+
     def get_github_lead_time_for_changes(self, owner, repo, since_day, until_day, bug_label):
         """
         Returns a list of “lead times” (in milliseconds) for all issues with commits
         between the first and last release created in the window [since_day, until_day].
-        Requires bug_label only for the divider logic (inside get_github_issues_committed_in_period).
         """
-        # 1) Get all releases in the window, sorted by published_at ascending
-        releases = self.get_github_releases(owner, repo, since_day, until_day)
-        if not releases:
-            return []
-
-        releases_sorted = sorted(releases, key=lambda r: self._parse_date(r["published_at"]))
-
-        # 2) Get all releases created in [first_release.created_at, last_release.created_at]
-        first_created = releases_sorted[0]["created_at"]
-        last_created = releases_sorted[-1]["created_at"]
-
-        created_rels = sorted(
-            self.get_github_releases_created(owner, repo, first_created, last_created),
-            key=lambda r: self._parse_date(r["created_at"])
-        )
-
-        # 3) Find a “pre‐period” release for anchoring
-        all_rels = self.github_rest.get_github_releases(owner, repo, 1, 100)
-        pre = next(
-            (
-                r for r in all_rels
-                if self._parse_date(r["created_at"]) < self._parse_date(first_created)
-                   and not r.get("prerelease", False)
-            ),
-            None
-        )
-        if pre:
-            created_rels.insert(0, pre)
-
+        # 1) Get the releases anchoring the window, sorted by created_at
+        created_rels = self._get_anchor_releases(owner, repo, since_day, until_day)
         if len(created_rels) < 2:
             return []
 
-        # 4) Get all issues with “referenced” commits in that created_rels window
-        issues = sorted(
-            self.get_github_issues_committed_in_period(
-                owner, repo,
-                created_rels[0]["created_at"],
-                created_rels[-1]["created_at"],
-                bug_label
-            ),
-            key=lambda i: self._parse_date(i.get("last_commit_date", datetime.min))
+        # 2) Get all issues with “referenced” commits in that created_rels window
+        issues = self.get_github_issues_committed_in_period(
+            owner, repo,
+            created_rels[0].created_at,
+            created_rels[-1].created_at,
+            bug_label
         )
+        return self._lead_times(created_rels, issues)
+
+    def _lead_times(self, created_rels, issues):
+        issues = sorted(issues, key=lambda i: i.last_commit_at)
 
-        # 5) For each issue, calculate (publish_time_of_next_release − commit_time)
+        # 3) For each issue, calculate (publish_time_of_next_release − commit_time)
         lead_times = []
         idx = 1
         for issue in issues:
-            commit_dt = self._parse_date(issue["last_commit_date"])
+            commit_dt = issue.last_commit_at
             while (
                 idx < len(created_rels)
-                and commit_dt > self._parse_date(created_rels[idx]["created_at"])
+                and commit_dt > created_rels[idx].created_at
             ):
                 idx += 1
-            pub_dt = self._parse_date(created_rels[idx]["published_at"])
+            pub_dt = created_rels[idx].published_at
             lead_times.append((pub_dt - commit_dt).total_seconds() * 1000)
 
         return lead_times
@@ -244,104 +291,41 @@ class GitHubService:
         """
         Similar to get_github_issues_committed_in_period but filters issues by bug_label.
         """
-        since_dt = self._parse_date(since_release)
-        until_dt = self._parse_date(until_release)
-        since_str = self._format_date(since_dt)
-        until_str = self._format_date(until_dt)
-
-        divider = self._get_divider(owner, repo, since_release, until_release, bug_label)
-        per_page = 100
-        incidents = []
-
-        page = 1
-        query = f"label:{bug_label} repo:{owner}/{repo} is:issue created:{since_str}..{until_str} sort:created-asc"
-        while True:
-            if page > 10:
-                break
-
-            result = self.github_rest.get_github_issues(query, page, per_page)
-            items = result.get("items", [])
-            if not items:
-                break
-
-            if divider > 1:
-                items = [it for idx, it in enumerate(items) if idx % divider == 0]
-
-            for issue in items:
-                events = self.github_rest.get_github_issue_events(owner, repo, issue["number"])
-                valid = [
-                    e for e in events
-                    if e.get("event") == "referenced"
-                       and since_dt < self._parse_date(e["created_at"]) < until_dt
-                ]
-                if valid:
-                    valid.sort(key=lambda e: self._parse_date(e["created_at"]))
-                    issue["last_commit_date"] = valid[-1]["created_at"]
-                    incidents.append(issue)
-
-            page += 1
-            time.sleep(0.1)
-
-        return incidents
+        return self._get_issues_with_commits(owner, repo, since_release, until_release, bug_label)
 
     def get_github_time_to_restore_service(self, owner, repo, since_day, until_day, bug_label):
         """
         Returns a list of “recovery times” (in milliseconds) for all incidents
         (issues labeled bug_label) in the window [since_day, until_day].
         """
-        # 1) Get releases in the window, sorted by published_at
-        releases = self.get_github_releases(owner, repo, since_day, until_day)
-        if not releases:
-            return []
-
-        releases_sorted = sorted(releases, key=lambda r: self._parse_date(r["published_at"]))
-
-        # 2) Get releases created between first and last
-        first_created = releases_sorted[0]["created_at"]
-        last_created = releases_sorted[-1]["created_at"]
-        created_rels = sorted(
-            self.get_github_releases_created(owner, repo, first_created, last_created),
-            key=lambda r: self._parse_date(r["created_at"])
-        )
-
-        # 3) Find “pre‐period” release
-        all_rels = self.github_rest.get_github_releases(owner, repo, 1, 100)
-        pre = next(
-            (
-                r for r in all_rels
-                if self._parse_date(r["created_at"]) < self._parse_date(first_created)
-                   and not r.get("prerelease", False)
-            ),
-            None
-        )
-        if pre:
-            created_rels.insert(0, pre)
-
+        # 1) Get the releases anchoring the window, sorted by created_at
+        created_rels = self._get_anchor_releases(owner, repo, since_day, until_day)
         if len(created_rels) < 2:
             return []
 
-        # 4) Get incidents committed in that window
-        incidents = sorted(
-            self.get_github_incidents_committed_in_period(
-                owner, repo,
-                created_rels[0]["created_at"],
-                created_rels[-1]["created_at"],
-                bug_label
-            ),
-            key=lambda i: self._parse_date(i.get("last_commit_date", datetime.min))
+        # 2) Get incidents committed in that window
+        incidents = self.get_github_incidents_committed_in_period(
+            owner, repo,
+            created_rels[0].created_at,
+            created_rels[-1].created_at,
+            bug_label
         )
+        return self._recovery_times(created_rels, incidents)
+
+    def _recovery_times(self, created_rels, incidents):
+        incidents = sorted(incidents, key=lambda i: i.last_commit_at)
 
-        # 5) For each incident, compute (publish_of_next_release − incident_created_time)
+        # 3) For each incident, compute (publish_of_next_release − incident_created_time)
         recovery_times = []
         idx = 1
         for inc in incidents:
-            incident_dt = self._parse_date(inc.get("created_at"))
+            incident_dt = inc.created_at
             while (
                 idx < len(created_rels)
-                and incident_dt > self._parse_date(created_rels[idx]["created_at"])
+                and incident_dt > created_rels[idx].created_at
             ):
                 idx += 1
-            pub_dt = self._parse_date(created_rels[idx]["published_at"])
+            pub_dt = created_rels[idx].published_at
             recovery_times.append((pub_dt - incident_dt).total_seconds() * 1000)
 
         return recovery_times
@@ -351,27 +335,12 @@ class GitHubService:
         Computes ratio (incidents/all) for issues in [since_day, until_day].
         Returns a float in [0.0, 1.0].
         """
-        since = self._parse_date(since_day)
-        until = self._parse_date(until_day)
-        since_str = self._format_date(since)
-        until_str = self._format_date(until)
-
-        # count incidents
-        q_inc = (
-            f"label:{bug_label} repo:{owner}/{repo} is:issue "
-            f"created:{since_str}..{until_str} sort:created-asc"
-        )
-        inc_res = self.github_rest.get_github_issues(q_inc, 1, 1)
-        num_inc = inc_res.get("total_count", 0)
-
-        # count all issues
-        q_all = (
-            f"repo:{owner}/{repo} is:issue "
-            f"created:{since_str}..{until_str} sort:created-asc"
-        )
-        all_res = self.github_rest.get_github_issues(q_all, 1, 1)
-        num_all = all_res.get("total_count", 0)
+        num_inc = self._count_issues(owner, repo, since_day, until_day, bug_label)
+        num_all = self._count_issues(owner, repo, since_day, until_day)
+        return self._failure_ratio(num_inc, num_all)
 
+    @staticmethod
+    def _failure_ratio(num_inc, num_all):
         if num_all == 0:
             return 0.0
         return num_inc / num_all
@@ -0,0 +1,161 @@
+import logging
+from django.db import transaction
+from django.utils import timezone as dj_timezone
+from .github_records import parse_timestamp
+from .github_service import create_github_client
+from .progress import Progress
+from ..models import GitHubIssue, GitHubIssueEvent, GitHubIssueLabel, GitHubRelease, GitHubSyncState
+
+logger = logging.getLogger(__name__)
+
+
+class GitHubSyncService:
+    """
+    Keeps the local raw-event store (releases, issues, labels and issue events of a
+    Project) in step with GitHub, downloading only what changed since the last sync.
+    """
+    DATE_FORMAT = "%Y-%m-%dT%H:%M:%S+00:00"
+    SEARCH_PAGE_LIMIT = 10
+
+    def __init__(self, github_rest=None, progress=None, scheduler=None):
+        self.progress = progress or Progress()
+        self.github_rest = github_rest or create_github_client(progress=self.progress, scheduler=scheduler)
+
+    def _parse_date(self, date_val):
+        return parse_timestamp(date_val)
+
+    def sync(self, project):
+        state, _ = GitHubSyncState.objects.get_or_create(project=project)
+        self.progress.set_phase("sync_releases")
+        self.sync_releases(project, state)
+        self.progress.set_phase("sync_issues")
+        self.sync_issues(project, state)
+        state.last_synced_at = dj_timezone.now()
+        state.save(update_fields=["last_synced_at"])
+
+    def sync_releases(self, project, state):
+        """
+        Pages through /releases (newest first). Once an earlier sync has stored every
+        page (state.releases_backfilled_at), it stops at the first page reaching a
+        release that is already stored; until then, e.g. after a sync that failed
+        part way, it pages to the end so older releases are not missed.
+        """
+        known_ids = set(GitHubRelease.objects.filter(project=project).values_list("github_id", flat=True))
+        per_page = 100
+        page = 1
+        while True:
+            releases = self.github_rest.get_github_releases(project.owner, project.repository, page, per_page)
+            if not releases:
+                break
+
+            GitHubRelease.objects.bulk_create(
+                [
+                    GitHubRelease(
+                        project=project,
+                        github_id=r["id"],
+                        tag_name=r.get("tag_name") or "",
+                        created_at=self._parse_date(r["created_at"]),
+                        published_at=self._parse_date(r["published_at"]) if r.get("published_at") else None,
+                        prerelease=r.get("prerelease", False),
+                    )
+                    for r in releases
+                ],
+                update_conflicts=True,
+                unique_fields=["project", "github_id"],
+                update_fields=["tag_name", "created_at", "published_at", "prerelease"],
+            )
+
+            if len(releases) < per_page:
+                break
+            if state.releases_backfilled_at and any(r["id"] in known_ids for r in releases):
+                return
+            page += 1
+
+        if state.releases_backfilled_at is None:
+            state.releases_backfilled_at = dj_timezone.now()
+            state.save(update_fields=["releases_backfilled_at"])
+
+    def sync_issues(self, project, state):
+        """
+        Fetches issues updated since the stored watermark (search `updated:>=`, oldest
+        update first) and replaces their labels and events. The search API stops at
+        1000 results, so when a query is exhausted the watermark moves forward to the
+        last update seen and the query is issued again.
+        """
+        while True:
+            watermark = state.issues_updated_at
+            query = f"repo:{project.owner}/{project.repository} is:issue sort:updated-asc"
+            if watermark:
+                query += f" updated:>={watermark.strftime(self.DATE_FORMAT)}"
+
+            capped = False
+            page = 1
+            while page <= self.SEARCH_PAGE_LIMIT:
+                result = self.github_rest.get_github_issues(query, page, 100)
+                items = result.get("items", [])
+                if not items:
+                    break
+
+                self._store_issues(project, items)
+                newest = max(self._parse_date(it["updated_at"]) for it in items)
+                if state.issues_updated_at is None or newest > state.issues_updated_at:
+                    state.issues_updated_at = newest
+                    state.save(update_fields=["issues_updated_at"])
+
+                capped = page == self.SEARCH_PAGE_LIMIT and len(items) == 100
+                page += 1
+
+            if not capped:
+                break
+            if state.issues_updated_at == watermark:
+                logger.warning(
+                    "More than 1000 issues of %s share updated_at %s; some were skipped",
+                    project, watermark,
+                )
+                break
+
+    def _store_issues(self, project, items):
+        events_per_issue = self.github_rest.get_github_issues_events(
+            project.owner, project.repository, [it["number"] for it in items]
+        )
+        self.progress.incr("issues_processed", len(items))
+
+        with transaction.atomic():
+            GitHubIssue.objects.bulk_create(
+                [
+                    GitHubIssue(
+                        project=project,
+                        number=it["number"],
+                        created_at=self._parse_date(it["created_at"]),
+                        updated_at=self._parse_date(it["updated_at"]),
+                    )
+                    for it in items
+                ],
+                update_conflicts=True,
+                unique_fields=["project", "number"],
+                update_fields=["created_at", "updated_at"],
+            )
+            issue_ids = dict(
+                GitHubIssue.objects.filter(project=project, number__in=[it["number"] for it in items])
+                .values_list("number", "id")
+            )
+
+            GitHubIssueLabel.objects.filter(issue_id__in=issue_ids.values()).delete()
+            GitHubIssueEvent.objects.filter(issue_id__in=issue_ids.values()).delete()
+
+            labels = []
+            events = []
+            for it, issue_events in zip(items, events_per_issue):
+                issue_id = issue_ids[it["number"]]
+                for label in it.get("labels", []):
+                    name = label["name"] if isinstance(label, dict) else label
+                    labels.append(GitHubIssueLabel(issue_id=issue_id, name=name))
+                for e in issue_events:
+                    if e.get("event") and e.get("created_at"):
+                        events.append(GitHubIssueEvent(
+                            issue_id=issue_id,
+                            event=e["event"],
+                            created_at=self._parse_date(e["created_at"]),
+                        ))
+            GitHubIssueLabel.objects.bulk_create(labels)
+            GitHubIssueEvent.objects.bulk_create(events)
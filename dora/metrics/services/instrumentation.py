@@ -0,0 +1,308 @@
+"""
+Counters and histograms of the GitHub clients and the metric computation,
+exposed in the Prometheus text format by /metrics/prometheus/.
+
+Values live in the memory of each process: with several gunicorn workers every
+scrape reports the worker that answered it, so scrape each worker or run one
+per pod. Requests decorated with server_timing() also collect their own share
+of the measurements and return it in a Server-Timing header.
+"""
+import asyncio
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PHASE_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key, **extra):
+        return [*zip(self.labelnames, key), *extra.items()]
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._sample_lines(key, value) for key, value in items)
+        return "\n".join(lines)
+
+    def _sample_lines(self, key, value):
+        return f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}"
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(self._key(labels))
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[bisect_left(self.buckets, value)] += 1
+            self._values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        with self._lock:
+            entry = self._values.get(self._key(labels))
+        return sum(entry[0]) if entry else 0
+
+    def _sample_lines(self, key, value):
+        counts, total = value
+        lines = []
+        cumulative = 0
+        for bound, count in zip((*self.buckets, float("inf")), counts):
+            cumulative += count
+            labels = _format_labels(self._labels(key, le=_format_value(float(bound))))
+            lines.append(f"{self.name}_bucket{labels} {cumulative}")
+        labels = _format_labels(self._labels(key))
+        lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+        lines.append(f"{self.name}_count{labels} {cumulative}")
+        return "\n".join(lines)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        return "\n".join(m.render() for m in self._metrics) + "\n"
+
+    def clear(self):
+        for metric in self._metrics:
+            metric.clear()
+
+
+registry = Registry()
+
+GITHUB_REQUESTS = registry.register(Counter(
+    "dora_github_requests_total", "GitHub API responses received.", ("resource", "endpoint", "status")
+))
+GITHUB_REQUEST_SECONDS = registry.register(Histogram(
+    "dora_github_request_duration_seconds", "Latency of GitHub API requests.", ("resource", "endpoint")
+))
+GITHUB_RESPONSE_BYTES = registry.register(Counter(
+    "dora_github_response_bytes_total", "Body bytes of GitHub API responses.", ("resource", "endpoint")
+))
+GITHUB_RETRIES = registry.register(Counter(
+    "dora_github_retries_total", "GitHub API requests retried, by reason.", ("resource", "reason")
+))
+GITHUB_RATE_LIMIT_REMAINING = registry.register(Gauge(
+    "dora_github_rate_limit_remaining", "Last X-RateLimit-Remaining seen per API resource.", ("resource",)
+))
+GITHUB_RATE_LIMIT_WAIT = registry.register(Counter(
+    "dora_github_rate_limit_wait_seconds_total", "Time spent waiting for GitHub rate limits.", ("resource",)
+))
+GITHUB_CACHE = registry.register(Counter(
+    "dora_github_cache_requests_total",
+    "GitHub GETs by response cache outcome: miss, not_modified (served from the cache) or modified.",
+    ("result",),
+))
+METRIC_PHASE_SECONDS = registry.register(Histogram(
+    "dora_metric_phase_duration_seconds", "Time to compute each DORA metric.", ("phase",), PHASE_BUCKETS
+))
+
+
+class RequestStats:
+    """The measurements of one HTTP request, reported in its Server-Timing header."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.github_requests = 0
+        self.github_seconds = 0.0
+        self.github_bytes = 0
+        self.retries = 0
+        self.rate_limit_wait = 0.0
+        self.cache_not_modified = 0
+        self.phases = {}
+
+    def add(self, name, amount):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def add_phase(self, phase, seconds):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def server_timing(self, total_seconds):
+        with self._lock:
+            entries = [f"{phase};dur={seconds * 1000:.1f}" for phase, seconds in self.phases.items()]
+            entries.append(
+                f'github;dur={self.github_seconds * 1000:.1f};'
+                f'desc="{self.github_requests} requests, {self.github_bytes} bytes, {self.retries} retries"'
+            )
+            if self.rate_limit_wait:
+                entries.append(f"github-rate-limit;dur={self.rate_limit_wait * 1000:.1f}")
+            if self.cache_not_modified:
+                entries.append(f'github-cache;desc="{self.cache_not_modified} not modified"')
+        entries.append(f"total;dur={total_seconds * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_request_stats = contextvars.ContextVar("metrics_request_stats", default=None)
+
+
+def _stats_add(name, amount):
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.add(name, amount)
+
+
+def record_github_response(resource, endpoint, status, seconds, size):
+    GITHUB_REQUESTS.inc(resource=resource, endpoint=endpoint, status=status)
+    GITHUB_REQUEST_SECONDS.observe(seconds, resource=resource, endpoint=endpoint)
+    GITHUB_RESPONSE_BYTES.inc(size, resource=resource, endpoint=endpoint)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.add("github_requests", 1)
+        stats.add("github_seconds", seconds)
+        stats.add("github_bytes", size)
+
+
+def record_retry(resource, reason, count=1):
+    GITHUB_RETRIES.inc(count, resource=resource, reason=reason)
+    _stats_add("retries", count)
+
+
+def record_rate_limit_remaining(resource, remaining):
+    GITHUB_RATE_LIMIT_REMAINING.set(remaining, resource=resource)
+
+
+def record_rate_limit_wait(resource, seconds):
+    GITHUB_RATE_LIMIT_WAIT.inc(seconds, resource=resource)
+    _stats_add("rate_limit_wait", seconds)
+
+
+def record_cache(result):
+    GITHUB_CACHE.inc(result=result)
+    if result == "not_modified":
+        _stats_add("cache_not_modified", 1)
+
+
+def _record_phase(phase, seconds):
+    METRIC_PHASE_SECONDS.observe(seconds, phase=phase)
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.add_phase(phase, seconds)
+
+
+@contextmanager
+def phase(name):
+    """Times the block as metric phase `name`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record_phase(name, time.perf_counter() - started)
+
+
+async def timed_phase(name, coro):
+    """Awaits `coro`, timed as metric phase `name`."""
+    with phase(name):
+        return await coro
+
+
+def server_timing(view):
+    """
+    Collects the measurements made while the view runs (also in the worker
+    threads and tasks it starts) and returns them in a Server-Timing header.
+    """
+    if asyncio.iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            started = time.perf_counter()
+            stats = RequestStats()
+            token = _request_stats.set(stats)
+            try:
+                response = await view(request, *args, **kwargs)
+            finally:
+                _request_stats.reset(token)
+            response["Server-Timing"] = stats.server_timing(time.perf_counter() - started)
+            return response
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        started = time.perf_counter()
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        try:
+            response = view(request, *args, **kwargs)
+        finally:
+            _request_stats.reset(token)
+        response["Server-Timing"] = stats.server_timing(time.perf_counter() - started)
+        return response
+    return wrapper
+
+
+def render():
+    return registry.render()
@@ -0,0 +1,225 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from .batch_service import compute_and_store_batch
+from .delete_service import delete_metrics, delete_project
+from .progress import Progress
+from .store_service import compute_and_store_metrics
+from ..models import MetricJob, Project
+
+logger = logging.getLogger(__name__)
+
+
+class JobProgress(Progress):
+    """
+    Progress that is written to the job row, at most once per
+    METRICS_JOB_PROGRESS_INTERVAL seconds unless forced. Counters are also
+    incremented from parallel_map worker threads; their flushes are serialized so
+    an older snapshot never overwrites a newer one.
+    """
+
+    def __init__(self, job_id):
+        super().__init__()
+        self.job_id = job_id
+        self._last_flush = 0.0
+        self._flush_lock = threading.Lock()
+
+    def flush(self, force=True):
+        now = time.monotonic()
+        if not force and now - self._last_flush < settings.METRICS_JOB_PROGRESS_INTERVAL:
+            return
+        with self._flush_lock:
+            self._last_flush = now
+            MetricJob.objects.filter(pk=self.job_id).update(progress=self.snapshot(), heartbeat_at=timezone.now())
+
+
+def _run_store_metrics(params, progress):
+    return compute_and_store_metrics(
+        params["owner"],
+        params["repository"],
+        params["since_day"],
+        params["until_day"],
+        params["bug_label"],
+        progress=progress,
+    )
+
+
+def _run_store_metrics_batch(params, progress):
+    return compute_and_store_batch(params["projects"], progress=progress)
+
+
+def _run_delete_project(params, progress):
+    project = Project.objects.filter(pk=params["project_id"]).first()
+    if project is None:
+        return {"deleted": 0, "objects": {}}
+    deleted, counts = delete_project(project, progress=progress)
+    return {"deleted": deleted, "objects": counts}
+
+
+def _run_delete_metrics(params, progress):
+    since = parse_datetime(params["since"]) if params.get("since") else None
+    until = parse_datetime(params["until"]) if params.get("until") else None
+    return {"deleted": delete_metrics(params["projects"], since, until, progress=progress)}
+
+
+JOB_HANDLERS = {
+    "store_metrics": _run_store_metrics,
+    "store_metrics_batch": _run_store_metrics_batch,
+    "delete_project": _run_delete_project,
+    "delete_metrics": _run_delete_metrics,
+}
+
+
+def make_dedup_key(kind, params):
+    normalized = json.dumps([kind, params], sort_keys=True, default=str)
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def enqueue_job(kind, params):
+    """
+    Queues a job and wakes the worker pool. An identical pending or running job
+    is reused instead of queueing a duplicate. Returns (job, created).
+    """
+    dedup_key = make_dedup_key(kind, params)
+    active = MetricJob.objects.filter(dedup_key=dedup_key, status__in=MetricJob.ACTIVE_STATUSES)
+
+    job = active.first()
+    if job:
+        # the process meant to run it may have died: recover and drain the queue
+        transaction.on_commit(start_workers)
+        return job, False
+
+    try:
+        with transaction.atomic():
+            job = MetricJob.objects.create(kind=kind, params=params, dedup_key=dedup_key)
+    except IntegrityError:
+        # lost the race against an identical request
+        job = active.first()
+        if job:
+            return job, False
+        raise
+
+    transaction.on_commit(start_workers)
+    return job, True
+
+
+def recover_stale_jobs():
+    """
+    Queues again the running jobs whose heartbeat is older than
+    METRICS_JOB_STALE_AFTER seconds: the worker running them died, e.g. with a
+    restarted gunicorn worker. Jobs already run METRICS_JOB_MAX_ATTEMPTS times are
+    failed instead. Returns the number of jobs recovered.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=settings.METRICS_JOB_STALE_AFTER)
+    stale = MetricJob.objects.filter(status=MetricJob.STATUS_RUNNING).filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff)
+    )
+    failed = stale.filter(attempts__gte=settings.METRICS_JOB_MAX_ATTEMPTS).update(
+        status=MetricJob.STATUS_FAILED,
+        error=f"The worker stopped responding on each of {settings.METRICS_JOB_MAX_ATTEMPTS} attempts.",
+        finished_at=now,
+    )
+    requeued = stale.update(status=MetricJob.STATUS_PENDING, started_at=None, heartbeat_at=None)
+    if failed or requeued:
+        logger.warning("Recovered stale metric jobs: %d queued again, %d failed", requeued, failed)
+    return failed + requeued
+
+
+def claim_next_job():
+    """
+    Atomically moves the oldest pending job to running and returns it, or None
+    when the queue is empty. Safe to call from several threads and processes.
+    """
+    while True:
+        job = MetricJob.objects.filter(status=MetricJob.STATUS_PENDING).order_by("created_at", "pk").first()
+        if job is None:
+            return None
+        now = timezone.now()
+        claimed = MetricJob.objects.filter(pk=job.pk, status=MetricJob.STATUS_PENDING).update(
+            status=MetricJob.STATUS_RUNNING, started_at=now, heartbeat_at=now, attempts=F("attempts") + 1
+        )
+        if claimed:
+            job.refresh_from_db()
+            return job
+
+
+def _beat(job_id, stop):
+    """Refreshes the job's heartbeat every METRICS_JOB_HEARTBEAT_INTERVAL seconds until `stop` is set."""
+    try:
+        while not stop.wait(settings.METRICS_JOB_HEARTBEAT_INTERVAL):
+            MetricJob.objects.filter(pk=job_id, status=MetricJob.STATUS_RUNNING).update(heartbeat_at=timezone.now())
+    finally:
+        connection.close()
+
+
+def run_job(job):
+    progress = JobProgress(job.pk)
+    # a job waiting out a rate limit reports no progress, but is alive
+    stop = threading.Event()
+    threading.Thread(target=_beat, args=(job.pk, stop), name="metric-job-heartbeat", daemon=True).start()
+    try:
+        result = JOB_HANDLERS[job.kind](job.params, progress)
+    except Exception:
+        logger.exception("Metric job %s failed", job.pk)
+        progress.flush()
+        MetricJob.objects.filter(pk=job.pk).update(
+            status=MetricJob.STATUS_FAILED,
+            error=traceback.format_exc(),
+            finished_at=timezone.now(),
+        )
+        return
+    finally:
+        stop.set()
+
+    progress.flush()
+    MetricJob.objects.filter(pk=job.pk).update(
+        status=MetricJob.STATUS_SUCCEEDED,
+        result=result,
+        finished_at=timezone.now(),
+    )
+
+
+def work_until_empty():
+    """
+    Runs queued jobs one after another until none are pending.
+    """
+    try:
+        while True:
+            close_old_connections()
+            job = claim_next_job()
+            if job is None:
+                return
+            run_job(job)
+    finally:
+        connection.close()
+
+
+_workers = []
+_workers_lock = threading.Lock()
+
+
+def start_workers():
+    """
+    Makes sure up to METRICS_JOB_WORKERS background threads are draining the queue
+    in this process, including jobs recovered from dead workers. Threads exit once
+    the queue is empty.
+    """
+    recover_stale_jobs()
+    with _workers_lock:
+        _workers[:] = [t for t in _workers if t.is_alive()]
+        pending = MetricJob.objects.filter(status=MetricJob.STATUS_PENDING).count()
+        to_start = min(settings.METRICS_JOB_WORKERS - len(_workers), pending)
+        for _ in range(max(to_start, 0)):
+            thread = threading.Thread(target=work_until_empty, name="metric-job-worker", daemon=True)
+            thread.start()
+            _workers.append(thread)
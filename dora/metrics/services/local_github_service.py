@@ -0,0 +1,72 @@
+from django.db.models import Max, Q
+from .github_records import IssueRecord
+from .github_service import GitHubService
+from .release_timeline import ReleaseTimeline
+from ..models import GitHubIssue, GitHubRelease
+
+
+class LocalGitHubService(GitHubService):
+    """
+    GitHubService that computes the DORA metrics from the local raw-event store
+    of a Project (see GitHubSyncService) instead of calling the GitHub API.
+    Issues are never sampled: every stored issue in the window is used.
+    """
+
+    def __init__(self, project, progress=None):
+        super().__init__(progress=progress)
+        self.project = project
+
+    def get_release_timeline(self, owner, repo):
+        key = (owner, repo)
+        if key not in self._timelines:
+            releases = GitHubRelease.objects.filter(project=self.project).values(
+                "github_id", "tag_name", "created_at", "published_at", "prerelease"
+            )
+            self._timelines[key] = ReleaseTimeline.from_releases(
+                [{"id": r.pop("github_id"), **r} for r in releases]
+            )
+        return self._timelines[key]
+
+    def _window(self, since_day, until_day):
+        # the search API compares `created:` at second precision, inclusive on both ends
+        since_dt = self._parse_date(since_day).replace(microsecond=0)
+        until_dt = self._parse_date(until_day).replace(microsecond=0)
+        return since_dt, until_dt
+
+    def _issues(self, since_day, until_day, label=None):
+        since_dt, until_dt = self._window(since_day, until_day)
+        qs = GitHubIssue.objects.filter(
+            project=self.project, created_at__gte=since_dt, created_at__lte=until_dt
+        )
+        if label:
+            qs = qs.filter(labels__name__iexact=label).distinct()
+        return qs
+
+    def _count_issues(self, owner, repo, since_day, until_day, label=None):
+        return self._issues(since_day, until_day, label).count()
+
+    def _get_issues_with_commits_in_store(self, since_release, until_release, label=None):
+        since_dt = self._parse_date(since_release)
+        until_dt = self._parse_date(until_release)
+        rows = (
+            self._issues(since_release, until_release, label)
+            .annotate(last_commit=Max(
+                "events__created_at",
+                filter=Q(
+                    events__event="referenced",
+                    events__created_at__gt=since_dt,
+                    events__created_at__lt=until_dt,
+                ),
+            ))
+            .filter(last_commit__isnull=False)
+            .values("number", "created_at", "last_commit")
+        )
+        issues = [IssueRecord(r["number"], r["created_at"], r["last_commit"]) for r in rows]
+        self.progress.incr("issues_processed", len(issues))
+        return issues
+
+    def get_github_issues_committed_in_period(self, owner, repo, since_release, until_release, bug_label):
+        return self._get_issues_with_commits_in_store(since_release, until_release)
+
+    def get_github_incidents_committed_in_period(self, owner, repo, since_release, until_release, bug_label):
+        return self._get_issues_with_commits_in_store(since_release, until_release, bug_label)
@@ -1,13 +1,103 @@
 import math
+import numpy as np
 
 MILLISECONDS_IN_DAY = 86400000.0
+PERCENTILES = (50, 75, 90, 95, 99)
+HISTOGRAM_BINS = 10
 
 
-def calculate_mean_and_variance(values):
-    if not values:
-        return 0.0, 0.0
-    values_in_days = [v / MILLISECONDS_IN_DAY for v in values]
-    mean = sum(values_in_days) / len(values_in_days)
-    variance = sum((x - mean) ** 2 for x in values_in_days) / len(values_in_days)
-    std_dev = math.sqrt(variance)
-    return mean, std_dev
+def _empty_statistics():
+    stats = {"count": 0, "mean": 0.0, "std_dev": 0.0, "min": None, "max": None}
+    stats.update({f"p{p}": None for p in PERCENTILES})
+    stats["histogram"] = {"edges": [], "counts": []}
+    return stats
+
+
+def calculate_statistics(values, bins=HISTOGRAM_BINS):
+    """
+    Summary statistics, in days, of a list of millisecond durations: count, mean,
+    (population) std_dev, min, max, p50/p75/p90/p95/p99 and a histogram, all from
+    vectorized NumPy reductions over one float64 array. Percentiles and the
+    histogram need the whole sample, so only this array mode provides them; see
+    RunningStatistics for streamed inputs.
+    """
+    arr = np.asarray(values, dtype=np.float64)
+    if arr.size == 0:
+        return _empty_statistics()
+    arr = arr / MILLISECONDS_IN_DAY
+
+    percentiles = np.percentile(arr, PERCENTILES)
+    counts, edges = np.histogram(arr, bins=bins)
+    stats = {
+        "count": int(arr.size),
+        "mean": float(arr.mean()),
+        "std_dev": float(arr.std()),
+        "min": float(arr.min()),
+        "max": float(arr.max()),
+    }
+    stats.update({f"p{p}": float(v) for p, v in zip(PERCENTILES, percentiles)})
+    stats["histogram"] = {"edges": edges.tolist(), "counts": counts.tolist()}
+    return stats
+
+
+class RunningStatistics:
+    """
+    O(1)-memory statistics (Welford's algorithm) of millisecond durations that are
+    streamed rather than collected into a list: count, mean, std_dev, min and max
+    in days. Percentiles and the histogram need the whole sample and are only
+    available from calculate_statistics; as_dict() leaves them empty.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value_ms):
+        x = value_ms / MILLISECONDS_IN_DAY
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (x - self.mean)
+        self.min = x if self.min is None else min(self.min, x)
+        self.max = x if self.max is None else max(self.max, x)
+
+    def merge(self, other):
+        """
+        Folds the statistics of `other` (e.g. of another worker's partition) into
+        this accumulator, as if its values had been added here.
+        """
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return self
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def std_dev(self):
+        if self.count == 0:
+            return 0.0
+        return math.sqrt(self.m2 / self.count)
+
+    def as_dict(self):
+        stats = _empty_statistics()
+        stats.update({
+            "count": self.count,
+            "mean": self.mean,
+            "std_dev": self.std_dev,
+            "min": self.min,
+            "max": self.max,
+        })
+        return stats
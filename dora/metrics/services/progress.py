@@ -0,0 +1,31 @@
+import threading
+
+
+class Progress:
+    """
+    Collects the progress of a metric computation: the phase (metric) being
+    computed and counters such as pages fetched or issues processed.
+    The base class only keeps the state in memory; subclasses persist it in flush().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.phase = None
+        self.counters = {}
+
+    def set_phase(self, phase):
+        with self._lock:
+            self.phase = phase
+        self.flush()
+
+    def incr(self, counter, amount=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+        self.flush(force=False)
+
+    def snapshot(self):
+        with self._lock:
+            return {"phase": self.phase, **self.counters}
+
+    def flush(self, force=True):
+        pass
@@ -0,0 +1,123 @@
+import hashlib
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+VERSION_PREFIX = "metrics-read:version:"
+RESPONSE_PREFIX = "metrics-read:response:"
+# bumped by writes that may touch any project, read by every cached response
+GLOBAL_VERSION = "global"
+# bumped by every write, read by responses that are not filtered by project
+ALL_PROJECTS_VERSION = "*"
+# comma-separated parameters whose order does not change the response
+SET_PARAMS = ("projects", "metric_types")
+
+
+def _cache():
+    return caches[settings.METRICS_READ_CACHE_ALIAS]
+
+
+def is_enabled():
+    return settings.METRICS_READ_CACHE_TIMEOUT > 0
+
+
+def _split(value):
+    return sorted({v.strip() for v in value.split(",") if v.strip()})
+
+
+def normalize_query(request):
+    """
+    The request's query string with parameters sorted and the values of
+    SET_PARAMS deduplicated and sorted, so equivalent filters share one entry.
+    """
+    items = []
+    for name, values in sorted(request.GET.lists()):
+        if name in SET_PARAMS:
+            values = [",".join(_split(",".join(values)))]
+        items.append((name, values))
+    return repr(items)
+
+
+def _versions(names):
+    """
+    Current version (a write timestamp in ns) of every name. Versions lost to
+    eviction restart at the current time, which only costs a cache miss.
+    """
+    cache = _cache()
+    keys = {VERSION_PREFIX + name: name for name in names}
+    found = cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    for key in missing:
+        cache.add(key, time.time_ns(), timeout=None)
+    if missing:
+        found.update(cache.get_many(missing))
+    return {keys[key]: version for key, version in found.items()}
+
+
+def _bump(names):
+    def bump():
+        now = time.time_ns()
+        _cache().set_many({VERSION_PREFIX + name: now for name in names}, timeout=None)
+    # readers must not see the new version before the new data is visible
+    transaction.on_commit(bump)
+
+
+def invalidate_projects(identifiers):
+    """Drops the cached responses that may include any of the owner/repo `identifiers`."""
+    if is_enabled():
+        _bump([*identifiers, ALL_PROJECTS_VERSION])
+
+
+def invalidate_all():
+    """Drops every cached response."""
+    if is_enabled():
+        _bump([GLOBAL_VERSION])
+
+
+def cached_read_view(view):
+    """
+    Serves a read-only JSON view from the Django cache. Entries are keyed on the
+    normalized query and the versions of the projects it filters on, so writes
+    invalidate them by bumping a version rather than by finding keys. Responses
+    carry ETag and Last-Modified and conditional GETs are answered with 304.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not is_enabled():
+            return view(request, *args, **kwargs)
+
+        projects = _split(request.GET.get("projects", "")) or [ALL_PROJECTS_VERSION]
+        versions = _versions([GLOBAL_VERSION, *projects])
+        digest = hashlib.sha256(
+            f"{request.path}|{normalize_query(request)}|{sorted(versions.items())}".encode()
+        ).hexdigest()
+        key = RESPONSE_PREFIX + digest
+
+        entry = _cache().get(key)
+        if entry is None:
+            response = view(request, *args, **kwargs)
+            if response.status_code != 200 or response.streaming:
+                return response
+            entry = {
+                "content": response.content,
+                "content_type": response["Content-Type"],
+                "etag": quote_etag(hashlib.sha256(response.content).hexdigest()[:32]),
+            }
+            _cache().set(key, entry, timeout=settings.METRICS_READ_CACHE_TIMEOUT)
+        else:
+            response = HttpResponse(entry["content"], content_type=entry["content_type"])
+
+        last_modified = max(versions.values()) // 1_000_000_000
+        response["ETag"] = entry["etag"]
+        response["Last-Modified"] = http_date(last_modified)
+        return get_conditional_response(
+            request, etag=entry["etag"], last_modified=last_modified, response=response
+        )
+
+    return wrapper
@@ -0,0 +1,181 @@
+import asyncio
+from bisect import bisect_left, bisect_right
+from .github_records import ReleaseRecord, parse_timestamp
+
+
+class ReleaseTimeline:
+    """
+    All releases of one repository, fetched page by page only as far back as a
+    lookup needs and never twice. Dates are parsed once at ingest and releases are
+    kept sorted by published_at and by created_at, so window and predecessor
+    lookups are binary searches. Releases are held as ReleaseRecords, not as the
+    API's JSON.
+    """
+
+    def __init__(self, github_rest, owner, repo, per_page=100):
+        self.github_rest = github_rest
+        self.owner = owner
+        self.repo = repo
+        self.per_page = per_page
+        self._next_page = 1
+        self._exhausted = False
+        self._oldest_created = None
+        self._oldest_published = None
+        self._by_created = []
+        self._created_keys = []
+        self._by_published = []
+        self._published_keys = []
+
+    @classmethod
+    def from_releases(cls, releases):
+        """
+        Builds a complete timeline from already known releases (e.g. the local
+        store) without any API access.
+        """
+        timeline = cls(None, None, None)
+        timeline._exhausted = True
+        timeline._ingest(releases)
+        return timeline
+
+    def _fetch_next_page(self):
+        releases = self.github_rest.get_github_releases(
+            self.owner, self.repo, self._next_page, self.per_page
+        )
+        self._next_page += 1
+        if not releases:
+            self._exhausted = True
+            return
+
+        self._ingest(releases)
+        if len(releases) < self.per_page:
+            self._exhausted = True
+
+    def _ingest(self, releases):
+        for r in releases:
+            entry = ReleaseRecord.from_api(r)
+            created, published = entry.created_at, entry.published_at
+            self._by_created.append(entry)
+            if published is not None:
+                self._by_published.append(entry)
+
+            if self._oldest_created is None or created < self._oldest_created:
+                self._oldest_created = created
+            if published is not None and (
+                self._oldest_published is None or published < self._oldest_published
+            ):
+                self._oldest_published = published
+
+        # stable sorts keep the API order for equal timestamps
+        self._by_created.sort(key=lambda e: e.created_at)
+        self._created_keys = [e.created_at for e in self._by_created]
+        self._by_published.sort(key=lambda e: e.published_at)
+        self._published_keys = [e.published_at for e in self._by_published]
+
+    def _load_back_to(self, dt):
+        """
+        GitHub lists releases newest first, so once a page reaches back past `dt`
+        every release on either side of `dt` is known.
+        """
+        while not self._exhausted and (
+            self._oldest_created is None or self._oldest_created >= dt
+            or self._oldest_published is None or self._oldest_published >= dt
+        ):
+            self._fetch_next_page()
+
+    def _find_published_between(self, since, until):
+        lo = bisect_right(self._published_keys, since)
+        hi = bisect_left(self._published_keys, until)
+        return [r for r in self._by_published[lo:hi] if not r.prerelease]
+
+    def _find_created_between(self, since, until):
+        lo = bisect_right(self._created_keys, since)
+        hi = bisect_left(self._created_keys, until)
+        return [r for r in self._by_created[lo:hi] if not r.prerelease]
+
+    def _find_latest_created_before(self, dt):
+        idx = bisect_left(self._created_keys, dt)
+        for entry in reversed(self._by_created[:idx]):
+            if not entry.prerelease:
+                return entry
+        return None
+
+    def published_between(self, since, until):
+        """
+        Non-prerelease releases with since < published_at < until, oldest first.
+        """
+        since, until = parse_timestamp(since), parse_timestamp(until)
+        self._load_back_to(since)
+        return self._find_published_between(since, until)
+
+    def created_between(self, since, until):
+        """
+        Non-prerelease releases with since < created_at < until, oldest first.
+        """
+        since, until = parse_timestamp(since), parse_timestamp(until)
+        self._load_back_to(since)
+        return self._find_created_between(since, until)
+
+    def latest_created_before(self, dt):
+        """
+        The newest non-prerelease release created strictly before `dt`, or None.
+        """
+        dt = parse_timestamp(dt)
+        self._load_back_to(dt)
+        while True:
+            entry = self._find_latest_created_before(dt)
+            if entry is not None or self._exhausted:
+                return entry
+            self._fetch_next_page()
+
+
+class AsyncReleaseTimeline(ReleaseTimeline):
+    """
+    ReleaseTimeline over an async GitHub client: the lookups are coroutines.
+    Pages are loaded under a lock, so lookups running concurrently on the same
+    timeline never fetch a page twice.
+    """
+
+    def __init__(self, github_rest, owner, repo, per_page=100):
+        super().__init__(github_rest, owner, repo, per_page)
+        self._lock = asyncio.Lock()
+
+    async def _fetch_next_page(self):
+        releases = await self.github_rest.get_github_releases(
+            self.owner, self.repo, self._next_page, self.per_page
+        )
+        self._next_page += 1
+        if not releases:
+            self._exhausted = True
+            return
+
+        self._ingest(releases)
+        if len(releases) < self.per_page:
+            self._exhausted = True
+
+    async def _load_back_to(self, dt):
+        async with self._lock:
+            while not self._exhausted and (
+                self._oldest_created is None or self._oldest_created >= dt
+                or self._oldest_published is None or self._oldest_published >= dt
+            ):
+                await self._fetch_next_page()
+
+    async def published_between(self, since, until):
+        since, until = parse_timestamp(since), parse_timestamp(until)
+        await self._load_back_to(since)
+        return self._find_published_between(since, until)
+
+    async def created_between(self, since, until):
+        since, until = parse_timestamp(since), parse_timestamp(until)
+        await self._load_back_to(since)
+        return self._find_created_between(since, until)
+
+    async def latest_created_before(self, dt):
+        dt = parse_timestamp(dt)
+        await self._load_back_to(dt)
+        while True:
+            async with self._lock:
+                entry = self._find_latest_created_before(dt)
+                if entry is not None or self._exhausted:
+                    return entry
+                await self._fetch_next_page()
@@ -0,0 +1,46 @@
+import hashlib
+from django.conf import settings
+from django.core.cache import caches
+
+KEY_PREFIX = "github-search-count:"
+
+
+def _cache():
+    return caches[settings.GITHUB_SEARCH_COUNT_CACHE_ALIAS]
+
+
+def is_enabled():
+    return settings.GITHUB_SEARCH_COUNT_TTL > 0
+
+
+def normalize_query(query):
+    """
+    The search `query` with its terms sorted and `sort:` dropped, so queries
+    matching the same issues share one entry.
+    """
+    return " ".join(sorted(term for term in query.split() if not term.startswith("sort:")))
+
+
+def _key(query):
+    # counts of different GitHub hosts (or test servers) must not mix
+    raw = f"{settings.GITHUB_API_URL}|{normalize_query(query)}"
+    return KEY_PREFIX + hashlib.sha256(raw.encode()).hexdigest()
+
+
+def get(query):
+    """The cached total_count of the issue search `query`, or None."""
+    if not is_enabled():
+        return None
+    return _cache().get(_key(query))
+
+
+def remember(query, result):
+    """
+    Caches the total_count of a search API `result` for GITHUB_SEARCH_COUNT_TTL
+    seconds. Results GitHub flags as incomplete (the search timed out) are not
+    cached. Returns the count.
+    """
+    count = int(result.get("total_count", 0))
+    if is_enabled() and not result.get("incomplete_results"):
+        _cache().set(_key(query), count, timeout=settings.GITHUB_SEARCH_COUNT_TTL)
+    return count
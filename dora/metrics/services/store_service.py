@@ -0,0 +1,223 @@
+import asyncio
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from .github_async_service import AsyncGitHubService
+from .github_service import GitHubService
+from .github_sync_service import GitHubSyncService
+from .local_github_service import LocalGitHubService
+from . import instrumentation, read_cache
+from .metric_service import PERCENTILES, calculate_statistics
+from ..models import Project, Metric
+
+METRIC_UNIQUE_FIELDS = ["project", "metric_type", "since", "until"]
+METRIC_UPDATE_FIELDS = [
+    "value", "variance", "sample_count", "min_value", "max_value",
+    "p50", "p75", "p90", "p95", "p99", "histogram",
+]
+
+
+def _metric_fields(stats):
+    """
+    Maps calculate_statistics() output onto Metric columns. `variance` keeps holding
+    the standard deviation, as it always has.
+    """
+    fields = {
+        "value": stats["mean"],
+        "variance": stats["std_dev"],
+        "sample_count": stats["count"],
+        "min_value": stats["min"],
+        "max_value": stats["max"],
+        "histogram": stats["histogram"],
+    }
+    fields.update({f"p{p}": stats[f"p{p}"] for p in PERCENTILES})
+    return fields
+
+
+def _summary(stats):
+    summary = {"mean_days": stats["mean"], "std_dev_days": stats["std_dev"], "count": stats["count"],
+               "min_days": stats["min"], "max_days": stats["max"]}
+    summary.update({f"p{p}_days": stats[f"p{p}"] for p in PERCENTILES})
+    return summary
+
+
+def upsert_metrics(metrics):
+    """
+    Writes unsaved Metric instances, of any number of projects and windows, with one
+    INSERT ... ON CONFLICT per batch inside a single transaction. Rows that already
+    exist for the same (project, metric_type, since, until) are updated in place.
+    Cached read responses of the affected projects are invalidated on commit.
+    """
+    with transaction.atomic():
+        Metric.objects.bulk_create(
+            metrics,
+            batch_size=500,
+            update_conflicts=True,
+            unique_fields=METRIC_UNIQUE_FIELDS,
+            update_fields=METRIC_UPDATE_FIELDS,
+        )
+        read_cache.invalidate_projects({str(m.project) for m in metrics})
+
+
+def get_metrics_service(project, progress=None, scheduler=None):
+    """
+    Returns the GitHubService computing metrics for `project`. With
+    GITHUB_DATA_SOURCE = "store" the project's local raw-event store is first synced
+    incrementally and the metrics are computed from it; otherwise they are computed
+    straight from the GitHub API. `scheduler` (a FairScheduler ProjectQueue) gates
+    the GitHub requests of batch computations.
+    """
+    if settings.GITHUB_DATA_SOURCE == "store":
+        svc = LocalGitHubService(project, progress=progress)
+        GitHubSyncService(progress=svc.progress, scheduler=scheduler).sync(project)
+        return svc
+    return GitHubService(progress=progress, scheduler=scheduler)
+
+
+def compute_metrics(svc, project, since_day, until_day, bug_label):
+    """
+    Computes the four DORA metrics of `project` in [since_day, until_day].
+    Returns (unsaved Metric instances, summary served by the store endpoint).
+    """
+    owner, repo = project.owner, project.repository
+
+    svc.progress.set_phase("release_frequency")
+    with instrumentation.phase("release_frequency"):
+        df_list = svc.get_github_deployment_frequency(owner, repo, since_day, until_day)
+
+    svc.progress.set_phase("lead_time_for_released_changes")
+    with instrumentation.phase("lead_time_for_released_changes"):
+        lt_list = svc.get_github_lead_time_for_changes(owner, repo, since_day, until_day, bug_label)
+
+    svc.progress.set_phase("time_to_repair_code")
+    with instrumentation.phase("time_to_repair_code"):
+        tr_list = svc.get_github_time_to_restore_service(owner, repo, since_day, until_day, bug_label)
+
+    svc.progress.set_phase("bug_issues_rate")
+    with instrumentation.phase("bug_issues_rate"):
+        cf_ratio = svc.get_github_change_failure_rate(owner, repo, since_day, until_day, bug_label)
+
+    return _build_metrics(
+        project, svc._parse_date(since_day), svc._parse_date(until_day), df_list, lt_list, tr_list, cf_ratio
+    )
+
+
+async def compute_metrics_async(svc, project, since_day, until_day, bug_label):
+    """
+    compute_metrics over an AsyncGitHubService: the four metrics are fetched
+    concurrently, so the computation takes as long as the slowest of them.
+    """
+    owner, repo = project.owner, project.repository
+
+    svc.progress.set_phase("computing")
+    timed = instrumentation.timed_phase
+    df_list, lt_list, tr_list, cf_ratio = await asyncio.gather(
+        timed("release_frequency", svc.get_github_deployment_frequency(owner, repo, since_day, until_day)),
+        timed("lead_time_for_released_changes",
+              svc.get_github_lead_time_for_changes(owner, repo, since_day, until_day, bug_label)),
+        timed("time_to_repair_code",
+              svc.get_github_time_to_restore_service(owner, repo, since_day, until_day, bug_label)),
+        timed("bug_issues_rate", svc.get_github_change_failure_rate(owner, repo, since_day, until_day, bug_label)),
+    )
+
+    return _build_metrics(
+        project, svc._parse_date(since_day), svc._parse_date(until_day), df_list, lt_list, tr_list, cf_ratio
+    )
+
+
+def _build_metrics(project, since_dt, until_dt, df_list, lt_list, tr_list, cf_ratio):
+    df_stats = calculate_statistics(df_list)
+    lt_stats = calculate_statistics(lt_list)
+    tr_stats = calculate_statistics(tr_list)
+    cf_pct = cf_ratio * 100
+
+    metrics = [
+        Metric(
+            project=project,
+            metric_type="release_frequency",
+            since=since_dt,
+            until=until_dt,
+            **_metric_fields(df_stats)
+        ),
+        Metric(
+            project=project,
+            metric_type="lead_time_for_released_changes",
+            since=since_dt,
+            until=until_dt,
+            **_metric_fields(lt_stats)
+        ),
+        Metric(
+            project=project,
+            metric_type="time_to_repair_code",
+            since=since_dt,
+            until=until_dt,
+            **_metric_fields(tr_stats)
+        ),
+        Metric(
+            project=project,
+            metric_type="bug_issues_rate",
+            value=cf_pct,
+            variance=None,
+            since=since_dt,
+            until=until_dt
+        ),
+    ]
+
+    summary = {
+        "release_frecuency": _summary(df_stats),
+        "lead_time_for_released_changes": _summary(lt_stats),
+        "time_to_repair_code": _summary(tr_stats),
+        "bug_issues_rate": cf_pct,
+    }
+    return metrics, summary
+
+
+def compute_and_store_metrics(owner, repo, since_day, until_day, bug_label, progress=None, scheduler=None):
+    """
+    Computes the four DORA metrics for owner/repo in [since_day, until_day], stores
+    them as Metric rows of the (created on demand) Project and returns the summary
+    served by the store endpoint. `bug_label` is remembered on the Project for
+    refresh_metrics.
+    """
+    project, created = Project.objects.get_or_create(
+        owner=owner,
+        repository=repo,
+        defaults={"name": f"{owner}/{repo}", "bug_label": bug_label}
+    )
+    if project.bug_label != bug_label:
+        Project.objects.filter(pk=project.pk).update(bug_label=bug_label)
+
+    svc = get_metrics_service(project, progress=progress, scheduler=scheduler)
+    metrics, summary = compute_metrics(svc, project, since_day, until_day, bug_label)
+
+    svc.progress.set_phase("storing")
+    upsert_metrics(metrics)
+    return summary
+
+
+async def compute_and_store_metrics_async(owner, repo, since_day, until_day, bug_label, progress=None):
+    """
+    compute_and_store_metrics for async views. With the REST backend and live API
+    data the metrics are computed on the event loop by AsyncGitHubService; the
+    GraphQL backend and the local store have no async client and run the
+    synchronous computation in a worker thread instead.
+    """
+    if settings.GITHUB_BACKEND != "rest" or settings.GITHUB_DATA_SOURCE == "store":
+        return await sync_to_async(compute_and_store_metrics, thread_sensitive=False)(
+            owner, repo, since_day, until_day, bug_label, progress
+        )
+
+    project, created = await Project.objects.aget_or_create(
+        owner=owner,
+        repository=repo,
+        defaults={"name": f"{owner}/{repo}", "bug_label": bug_label}
+    )
+    if project.bug_label != bug_label:
+        await Project.objects.filter(pk=project.pk).aupdate(bug_label=bug_label)
+
+    async with AsyncGitHubService(progress=progress) as svc:
+        metrics, summary = await compute_metrics_async(svc, project, since_day, until_day, bug_label)
+
+    svc.progress.set_phase("storing")
+    await sync_to_async(upsert_metrics)(metrics)
+    return summary
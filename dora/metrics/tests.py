@@ -1,3 +1,1463 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+from urllib.parse import urlencode
+import requests
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models import F
+from django.db.models.signals import pre_delete
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils import timezone as dj_timezone
 
-# Create your tests here.
+from .fake_github import FakeGitHubServer, FakeRepository
+from .models import (
+    GitHubIssue, GitHubIssueEvent, GitHubIssueLabel, GitHubRelease, GitHubSyncState, Metric, MetricJob, Project,
+)
+from .services import github_async_service, instrumentation, search_counts
+from .services.batch_service import compute_and_store_batch
+from .services.github_cache import FileSystemCacheBackend
+from .services.fair_scheduler import FairScheduler
+from .services.github_async_service import AsyncGitHubRestService, AsyncGitHubService
+from .services.github_graphql_service import GitHubGraphQLService
+from .services.github_rate_limit import Credential, RateLimitCoordinator
+from .services.github_records import ReleaseRecord, last_reference_at, parse_timestamp
+from .services.github_rest_service import GitHubRestService, parallel_map
+from .services.github_service import GitHubService
+from .services.github_sync_service import GitHubSyncService
+from .services.job_service import JobProgress, claim_next_job, recover_stale_jobs, run_job
+from .services.local_github_service import LocalGitHubService
+from .services.metric_service import MILLISECONDS_IN_DAY, RunningStatistics, calculate_statistics
+from .services.release_timeline import AsyncReleaseTimeline, ReleaseTimeline
+from .services.store_service import upsert_metrics
+
+BASE = datetime(2023, 1, 1, tzinfo=timezone.utc)
+# the fake GitHub server has no secondary limits to stay below
+NO_RATE_LIMITS = {"GITHUB_RATE_LIMITS": {}, "GITHUB_RATE_LIMIT_FILE": ""}
+
+
+def _iso(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def make_fake_repository():
+    releases = [
+        {
+            "id": i,
+            "tag_name": f"v{i}",
+            "created_at": _iso(BASE + timedelta(days=i)),
+            "published_at": _iso(BASE + timedelta(days=i, hours=2)),
+            "prerelease": i % 10 == 0,
+        }
+        for i in range(1, 251)
+    ]
+    issues = []
+    for n in range(1, 151):
+        created = BASE + timedelta(hours=n)
+        events = [
+            {"event": "labeled", "created_at": _iso(created + timedelta(minutes=5))},
+            {"event": "referenced", "created_at": _iso(created + timedelta(hours=1))},
+        ]
+        if n == 7:
+            # more referenced events than fit in one timeline page
+            events += [
+                {"event": "referenced", "created_at": _iso(created + timedelta(hours=2, minutes=k))}
+                for k in range(130)
+            ]
+        labels = [{"name": "bug"}] if n % 3 == 0 else []
+        issues.append({"number": n, "created_at": _iso(created), "labels": labels, "events": events})
+    return FakeRepository("acme", "widgets", releases, issues)
+
+
+class FakeGitHubServerTests(SimpleTestCase):
+    def test_synthetic_repository_is_reproducible_and_searchable(self):
+        repository = FakeRepository.synthetic(releases=50, issues=500, days=100, seed=3)
+        again = FakeRepository.synthetic(releases=50, issues=500, days=100, seed=3)
+
+        self.assertEqual(repository.releases, again.releases)
+        self.assertEqual(len(repository.issues), 500)
+        found = repository.search_issues(
+            "repo:bench/synthetic is:issue label:bug created:2022-02-01T00:00:00Z..2022-03-01T00:00:00Z"
+        )
+        self.assertTrue(found)
+        self.assertTrue(all("2022-02-01" <= i["created_at"] < "2022-03-01" for i in found))
+        self.assertTrue(all(i["labels"] == [{"name": "bug"}] for i in found))
+
+    def test_rate_limit_returns_403_once_exhausted(self):
+        with FakeGitHubServer(make_fake_repository(), rate_limits={"core": (2, 60)}) as server:
+            path = f"{server.url}repos/acme/widgets/releases"
+            statuses = []
+            for _ in range(3):
+                try:
+                    with urllib.request.urlopen(path) as response:
+                        statuses.append((response.status, response.headers["X-RateLimit-Remaining"]))
+                except urllib.error.HTTPError as e:
+                    statuses.append((e.code, e.headers["X-RateLimit-Remaining"]))
+
+        self.assertEqual(statuses, [(200, "1"), (200, "0"), (403, "0")])
+        self.assertEqual(server.calls["rate_limited"], 1)
+
+
+@override_settings(GITHUB_CACHE_BACKEND="none", GITHUB_MAX_RETRIES=0, **NO_RATE_LIMITS)
+class GitHubGraphQLServiceTests(SimpleTestCase):
+    def setUp(self):
+        self.repository = make_fake_repository()
+        self.server = FakeGitHubServer(self.repository).start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(
+            GITHUB_API_URL=self.server.url, GITHUB_GRAPHQL_URL=self.server.graphql_url
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_releases_are_paged_in_rest_shape(self):
+        svc = GitHubGraphQLService()
+
+        pages = [svc.get_github_releases("acme", "widgets", page, 100) for page in (1, 2, 3, 4)]
+
+        self.assertEqual([len(p) for p in pages], [100, 100, 50, 0])
+        self.assertEqual([r["id"] for r in pages[0][:3]], [250, 249, 248])
+        self.assertEqual(set(pages[0][0]), {"id", "tag_name", "created_at", "published_at", "prerelease", "draft"})
+        # sequential pages reuse the remembered cursors: one query each
+        self.assertEqual(self.server.calls["graphql"], 3)
+
+    def test_issue_events_are_batched_and_kept_in_order(self):
+        svc = GitHubGraphQLService()
+        numbers = list(range(150, 0, -1))
+
+        events = svc.get_github_issues_events("acme", "widgets", numbers)
+
+        expected = [
+            [e for e in self.repository.issues[n]["events"] if e["event"] == "referenced"]
+            for n in numbers
+        ]
+        self.assertEqual(events, expected)
+        self.assertEqual(len(events[numbers.index(7)]), 131)
+        # two batches of <= 100 issues plus one follow-up page for issue 7
+        self.assertEqual(self.server.calls["graphql"], 3)
+
+    @override_settings(GITHUB_BACKEND="graphql")
+    def test_backend_is_selected_through_settings(self):
+        svc = GitHubService()
+
+        self.assertIsInstance(svc.github_rest, GitHubGraphQLService)
+        releases = svc.get_github_releases(
+            "acme", "widgets", _iso(BASE + timedelta(days=200)), _iso(BASE + timedelta(days=221))
+        )
+        self.assertEqual([r["id"] for r in releases], [i for i in range(201, 220) if i != 210])
+
+
+def _releases(ids, days_offset=0):
+    return [
+        {"id": i, "tag_name": f"v{i}", "created_at": _iso(BASE + timedelta(hours=i + days_offset * 24)),
+         "published_at": _iso(BASE + timedelta(hours=i + days_offset * 24, minutes=30)), "prerelease": False}
+        for i in ids
+    ]
+
+
+@override_settings(GITHUB_CACHE_BACKEND="none", GITHUB_MAX_RETRIES=0, GITHUB_BACKEND="rest", **NO_RATE_LIMITS)
+class GitHubSyncServiceTests(TestCase):
+    def setUp(self):
+        self.repository = make_fake_repository()
+        self.server = FakeGitHubServer(self.repository).start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(GITHUB_API_URL=self.server.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.project = Project.objects.create(name="acme/widgets", owner="acme", repository="widgets")
+
+    def test_interrupted_release_backfill_is_completed_by_the_next_sync(self):
+        self.repository.releases = []
+        self.repository.add_releases(_releases(range(1, 351)))
+        self.server.respond_with("releases", [200, 200, 500])
+
+        with self.assertRaises(requests.HTTPError):
+            GitHubSyncService().sync(self.project)
+        self.assertEqual(GitHubRelease.objects.filter(project=self.project).count(), 200)
+        self.assertIsNone(GitHubSyncState.objects.get(project=self.project).releases_backfilled_at)
+
+        GitHubSyncService().sync(self.project)
+        self.assertEqual(GitHubRelease.objects.filter(project=self.project).count(), 350)
+        self.assertIsNotNone(GitHubSyncState.objects.get(project=self.project).releases_backfilled_at)
+
+        # once backfilled, a sync stops at the first page holding a stored release
+        self.repository.add_releases(_releases([351, 352]))
+        calls = self.server.calls["releases"]
+        GitHubSyncService().sync(self.project)
+        self.assertEqual(self.server.calls["releases"] - calls, 1)
+        self.assertEqual(GitHubRelease.objects.filter(project=self.project).count(), 352)
+
+    def test_issues_are_synced_incrementally(self):
+        GitHubSyncService().sync(self.project)
+        self.assertEqual(GitHubIssue.objects.filter(project=self.project).count(), 150)
+        events = self.server.calls["events"]
+
+        later = _iso(BASE + timedelta(days=60))
+        issue = self.repository.issues[1]
+        self.repository.put_issues([
+            {**issue, "updated_at": later, "labels": [{"name": "bug"}],
+             "events": issue["events"] + [{"event": "referenced", "created_at": later}]},
+            {"number": 151, "created_at": later, "labels": [], "events": []},
+        ])
+        GitHubSyncService().sync(self.project)
+
+        # the first issue is fetched again: the search watermark is inclusive
+        self.assertEqual(self.server.calls["events"] - events, 3)
+        self.assertEqual(GitHubIssue.objects.filter(project=self.project).count(), 151)
+        stored = GitHubIssue.objects.get(project=self.project, number=1)
+        self.assertEqual(list(stored.labels.values_list("name", flat=True)), ["bug"])
+        self.assertEqual(stored.events.filter(event="referenced").count(), 2)
+        self.assertEqual(
+            GitHubSyncState.objects.get(project=self.project).issues_updated_at, BASE + timedelta(days=60)
+        )
+
+    def test_capped_search_is_reissued_from_the_last_update(self):
+        self.repository.put_issues([
+            {"number": n, "created_at": _iso(BASE + timedelta(minutes=n)), "labels": [], "events": []}
+            for n in range(151, 451)
+        ])
+        svc = GitHubSyncService()
+        svc.SEARCH_PAGE_LIMIT = 2
+
+        svc.sync(self.project)
+
+        self.assertEqual(GitHubIssue.objects.filter(project=self.project).count(), 450)
+        # three queries of up to two pages, each resuming at the newest update seen
+        self.assertEqual(self.server.calls["search"], 6)
+
+    def test_issues_sharing_one_update_past_the_cap_are_reported(self):
+        updated = _iso(BASE)
+        self.repository.issues = {}
+        self.repository.put_issues([
+            {"number": n, "created_at": updated, "updated_at": updated, "labels": [], "events": []}
+            for n in range(1, 251)
+        ])
+        svc = GitHubSyncService()
+        svc.SEARCH_PAGE_LIMIT = 2
+
+        with self.assertLogs("metrics.services.github_sync_service", "WARNING"):
+            svc.sync(self.project)
+        self.assertEqual(GitHubIssue.objects.filter(project=self.project).count(), 200)
+
+    def test_local_store_matches_the_api(self):
+        since, until = _iso(BASE + timedelta(days=2)), _iso(BASE + timedelta(days=40))
+        GitHubSyncService().sync(self.project)
+
+        results = []
+        for svc in (GitHubService(), LocalGitHubService(self.project)):
+            results.append([
+                svc.get_github_deployment_frequency("acme", "widgets", since, until),
+                svc.get_github_lead_time_for_changes("acme", "widgets", since, until, "bug"),
+                svc.get_github_time_to_restore_service("acme", "widgets", since, until, "bug"),
+                svc.get_github_change_failure_rate("acme", "widgets", BASE, until, "bug"),
+            ])
+
+        self.assertTrue(all(results[0][:3]))
+        self.assertEqual(results[1], results[0])
+
+
+@override_settings(GITHUB_CACHE_BACKEND="none", GITHUB_MAX_RETRIES=0, GITHUB_BACKEND="rest",
+                   GITHUB_DATA_SOURCE="api", SECURE_SSL_REDIRECT=False, METRICS_READ_CACHE_TIMEOUT=0,
+                   **NO_RATE_LIMITS)
+class AsyncGitHubServiceTests(TestCase):
+    SINCE = _iso(BASE + timedelta(days=2))
+    UNTIL = _iso(BASE + timedelta(days=40))
+
+    def setUp(self):
+        self.server = FakeGitHubServer(make_fake_repository()).start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(GITHUB_API_URL=self.server.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _sync_metrics(self):
+        svc = GitHubService()
+        return [
+            svc.get_github_deployment_frequency("acme", "widgets", self.SINCE, self.UNTIL),
+            svc.get_github_lead_time_for_changes("acme", "widgets", self.SINCE, self.UNTIL, "bug"),
+            svc.get_github_time_to_restore_service("acme", "widgets", self.SINCE, self.UNTIL, "bug"),
+            svc.get_github_change_failure_rate("acme", "widgets", BASE, self.UNTIL, "bug"),
+        ]
+
+    def test_async_service_matches_sync_service(self):
+        async def compute():
+            async with AsyncGitHubService() as svc:
+                return list(await asyncio.gather(
+                    svc.get_github_deployment_frequency("acme", "widgets", self.SINCE, self.UNTIL),
+                    svc.get_github_lead_time_for_changes("acme", "widgets", self.SINCE, self.UNTIL, "bug"),
+                    svc.get_github_time_to_restore_service("acme", "widgets", self.SINCE, self.UNTIL, "bug"),
+                    svc.get_github_change_failure_rate("acme", "widgets", BASE, self.UNTIL, "bug"),
+                ))
+
+        expected = self._sync_metrics()
+        sync_calls = dict(self.server.calls)
+        result = asyncio.run(compute())
+
+        self.assertEqual(result, expected)
+        self.assertTrue(all(result[:3]))
+        self.assertAlmostEqual(result[3], 50 / 150)
+        # concurrent metrics share one release timeline: no page is fetched twice
+        self.assertEqual(self.server.calls["releases"] - sync_calls["releases"], sync_calls["releases"])
+
+    def test_store_view_computes_metrics_concurrently_and_stores_them(self):
+        response = self.client.post(
+            reverse("metrics‐store"),
+            {"owner": "acme", "repository": "widgets", "since_day": self.SINCE,
+             "until_day": self.UNTIL, "bug_label": "bug"},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()), {"release_frecuency", "lead_time_for_released_changes",
+                                                "time_to_repair_code", "bug_issues_rate"})
+        stored = dict(Metric.objects.filter(project__repository="widgets").values_list("metric_type", "sample_count"))
+        self.assertEqual(stored["release_frequency"], len(self._sync_metrics()[0]))
+        self.assertEqual(len(stored), 4)
+        self.assertEqual(Project.objects.get(repository="widgets").bug_label, "bug")
+
+    def test_rerunning_a_window_updates_its_rows(self):
+        payload = {"owner": "acme", "repository": "widgets", "since_day": self.SINCE,
+                   "until_day": self.UNTIL, "bug_label": "bug"}
+        self.client.post(reverse("metrics‐store"), payload, content_type="application/json")
+        first = {m.metric_type: m for m in Metric.objects.all()}
+        self.server.repository.add_releases([
+            {"id": 1000 + i, "tag_name": f"hotfix{i}", "created_at": _iso(BASE + timedelta(days=10, hours=i)),
+             "published_at": _iso(BASE + timedelta(days=10, hours=i + 1)), "prerelease": False}
+            for i in range(3)
+        ])
+
+        response = self.client.post(reverse("metrics‐store"), payload, content_type="application/json")
+
+        self.assertEqual(response.status_code, 200)
+        second = {m.metric_type: m for m in Metric.objects.all()}
+        self.assertEqual(len(second), 4)
+        self.assertEqual({t: m.pk for t, m in second.items()}, {t: m.pk for t, m in first.items()})
+        self.assertEqual(second["release_frequency"].sample_count, first["release_frequency"].sample_count + 3)
+        self.assertNotEqual(second["release_frequency"].value, first["release_frequency"].value)
+
+    def test_rate_limit_state_is_updated_off_the_event_loop(self):
+        threads = []
+
+        async def compute():
+            async with AsyncGitHubService() as svc:
+                coordinator = svc.github_rest.rate_limits
+                acquire = coordinator.acquire
+
+                def recording_acquire(resource):
+                    threads.append(threading.get_ident())
+                    return acquire(resource)
+
+                with mock.patch.object(coordinator, "acquire", recording_acquire):
+                    await svc.get_github_change_failure_rate("acme", "widgets", BASE, self.UNTIL, "bug")
+            return threading.get_ident()
+
+        loop_thread = asyncio.run(compute())
+
+        self.assertEqual(len(threads), self.server.calls["search"])
+        self.assertTrue(threads)
+        self.assertNotIn(loop_thread, threads)
+
+    def test_store_view_closes_its_client(self):
+        clients = []
+        original = github_async_service.new_async_client
+
+        def new_async_client():
+            clients.append(original())
+            return clients[-1]
+
+        payload = {"owner": "acme", "repository": "widgets", "since_day": self.SINCE,
+                   "until_day": self.UNTIL, "bug_label": "bug"}
+        with mock.patch.object(github_async_service, "new_async_client", new_async_client):
+            for _ in range(2):
+                self.client.post(reverse("metrics‐store"), payload, content_type="application/json")
+
+        self.assertEqual(len(clients), 2)
+        self.assertTrue(all(client.is_closed for client in clients))
+
+    def test_store_view_rejects_get(self):
+        self.assertEqual(self.client.get(reverse("metrics‐store")).status_code, 405)
+
+
+@override_settings(GITHUB_CACHE_BACKEND="none", GITHUB_MAX_RETRIES=0, GITHUB_BACKEND="rest",
+                   GITHUB_DATA_SOURCE="api", SECURE_SSL_REDIRECT=False, GITHUB_MAX_WORKERS=4, **NO_RATE_LIMITS)
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        self.server = FakeGitHubServer(make_fake_repository()).start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(GITHUB_API_URL=self.server.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        instrumentation.registry.clear()
+
+    def test_store_view_reports_server_timing_and_prometheus_counters(self):
+        response = self.client.post(
+            reverse("metrics‐store"),
+            {"owner": "acme", "repository": "widgets", "since_day": _iso(BASE + timedelta(days=2)),
+             "until_day": _iso(BASE + timedelta(days=40)), "bug_label": "bug"},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        timing = response["Server-Timing"]
+        for phase in ("release_frequency", "lead_time_for_released_changes", "time_to_repair_code",
+                      "bug_issues_rate", "total"):
+            self.assertIn(f"{phase};dur=", timing)
+        self.assertIn(f'desc="{sum(self.server.calls.values())} requests', timing)
+
+        text = self.client.get(reverse("metrics-prometheus")).content.decode()
+        self.assertIn(
+            f'dora_github_requests_total{{resource="core",endpoint="issue_events",status="200"}} '
+            f'{self.server.calls["events"]}', text
+        )
+        self.assertIn('dora_metric_phase_duration_seconds_count{phase="bug_issues_rate"} 1', text)
+
+    def test_requests_made_on_worker_threads_count_towards_the_request(self):
+        @instrumentation.server_timing
+        def view(request):
+            GitHubService().get_github_issues_committed_in_period(
+                "acme", "widgets", BASE, BASE + timedelta(days=40), "bug"
+            )
+            return JsonResponse({})
+
+        timing = view(None)["Server-Timing"]
+
+        self.assertGreater(self.server.calls["events"], 1)
+        self.assertIn(f'desc="{sum(self.server.calls.values())} requests', timing)
+        self.assertEqual(
+            instrumentation.GITHUB_REQUESTS.value(resource="search", endpoint="search_issues", status=200),
+            self.server.calls["search"],
+        )
+
+
+@override_settings(GITHUB_CACHE_BACKEND="none", GITHUB_MAX_RETRIES=0, GITHUB_BACKEND="rest",
+                   GITHUB_SEARCH_COUNT_TTL=60, **NO_RATE_LIMITS)
+class SearchCountCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.repository = make_fake_repository()
+        self.server = FakeGitHubServer(self.repository).start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(GITHUB_API_URL=self.server.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_counts_are_shared_across_services_and_requests(self):
+        until = BASE + timedelta(days=40)
+
+        rate = GitHubService().get_github_change_failure_rate("acme", "widgets", BASE, until, "bug")
+        again = GitHubService().get_github_change_failure_rate("acme", "widgets", BASE, until, "bug")
+
+        async def compute():
+            async with AsyncGitHubService() as svc:
+                return await svc.get_github_change_failure_rate("acme", "widgets", BASE, until, "bug")
+
+        async_rate = asyncio.run(compute())
+
+        self.assertAlmostEqual(rate, 50 / 150)
+        self.assertEqual(rate, again)
+        self.assertEqual(rate, async_rate)
+        self.assertEqual(self.server.calls["search"], 2)
+
+    def test_issues_added_after_a_count_was_cached_are_still_searched(self):
+        until = BASE + timedelta(days=40)
+
+        def new_issue(number, labels):
+            created = BASE + timedelta(days=20, minutes=number)
+            return {"number": number, "created_at": _iso(created), "labels": labels,
+                    "events": [{"event": "referenced", "created_at": _iso(created + timedelta(hours=1))}]}
+
+        for label in (None, "incident"):
+            self.assertEqual(GitHubService()._count_issues("acme", "widgets", BASE, until, label),
+                             0 if label else 150)
+        self.repository.put_issues([new_issue(n, []) for n in range(151, 211)]
+                                   + [new_issue(211, [{"name": "incident"}])])
+
+        svc = GitHubService()
+        issues = svc.get_github_issues_committed_in_period("acme", "widgets", BASE, until, "bug")
+        incidents = svc.get_github_incidents_committed_in_period("acme", "widgets", BASE, until, "incident")
+
+        self.assertEqual(len(issues), 211)
+        self.assertEqual(len({issue.number for issue in issues}), 211)
+        self.assertEqual([issue.number for issue in incidents], [211])
+
+    @override_settings(GITHUB_SEARCH_COUNT_TTL=0)
+    def test_cache_can_be_disabled(self):
+        for _ in range(2):
+            GitHubService().get_github_change_failure_rate("acme", "widgets", BASE, BASE + timedelta(days=40), "bug")
+
+        self.assertEqual(self.server.calls["search"], 4)
+
+    def test_queries_are_normalized_and_incomplete_counts_skipped(self):
+        query = "repo:acme/widgets is:issue created:2023-01-01..2023-02-01"
+        search_counts.remember(f"{query} sort:created-asc", {"total_count": 7})
+        search_counts.remember("label:bug " + query, {"total_count": 3, "incomplete_results": True})
+
+        self.assertEqual(search_counts.get(" ".join(reversed(query.split()))), 7)
+        self.assertIsNone(search_counts.get("label:bug " + query))
+
+
+@override_settings(GITHUB_CACHE_BACKEND="none", GITHUB_MAX_RETRIES=0, GITHUB_BACKEND="rest", **NO_RATE_LIMITS)
+class IssueSearchSplitTests(SimpleTestCase):
+    def search(self, repository, since, until):
+        with FakeGitHubServer(repository) as server, override_settings(GITHUB_API_URL=server.url):
+            issues = GitHubService()._search_issues(repository.owner, repository.repo, since, until)
+        return issues, server.calls["search"]
+
+    def test_windows_past_the_result_cap_return_every_issue_once(self):
+        repository = FakeRepository.synthetic(releases=0, issues=2500, days=30, seed=1)
+        start = datetime(2022, 1, 1, tzinfo=timezone.utc)
+
+        issues, searches = self.search(repository, start, start + timedelta(days=30))
+
+        self.assertEqual(sorted(issue.number for issue in issues), list(range(1, 2501)))
+        self.assertEqual(issues, sorted(issues, key=lambda issue: issue.created_at))
+        # counts to split the window, then one request per result page
+        self.assertLess(searches, 2 * 2500 / 100)
+
+    def test_issues_of_one_second_past_the_cap_are_reported(self):
+        created = _iso(BASE)
+        repository = FakeRepository("acme", "widgets", [], [
+            {"number": n, "created_at": created, "labels": [], "events": []} for n in range(1, 1201)
+        ])
+
+        with self.assertLogs("metrics.services.github_service", "WARNING") as logs:
+            issues, _ = self.search(repository, BASE - timedelta(days=1), BASE + timedelta(days=1))
+
+        self.assertIn("1200 issues of acme/widgets created within", logs.output[0])
+        self.assertEqual(len(issues), 1000)
+
+
+class MetricStatisticsTests(SimpleTestCase):
+    def test_statistics_are_in_days(self):
+        stats = calculate_statistics([d * MILLISECONDS_IN_DAY for d in range(10, 0, -1)])
+
+        self.assertEqual((stats["count"], stats["min"], stats["max"]), (10, 1.0, 10.0))
+        self.assertAlmostEqual(stats["mean"], 5.5)
+        self.assertAlmostEqual(stats["std_dev"], 8.25 ** 0.5)
+        # linear interpolation between the closest ranks
+        for p, expected in {50: 5.5, 75: 7.75, 90: 9.1, 95: 9.55, 99: 9.91}.items():
+            self.assertAlmostEqual(stats[f"p{p}"], expected)
+        self.assertEqual(stats["histogram"]["counts"], [1] * 10)
+        self.assertEqual(len(stats["histogram"]["edges"]), 11)
+        self.assertAlmostEqual(stats["histogram"]["edges"][1], 1.9)
+
+    def test_histogram_bins_split_the_range(self):
+        stats = calculate_statistics([0, 0, MILLISECONDS_IN_DAY, 4 * MILLISECONDS_IN_DAY], bins=4)
+
+        self.assertEqual(stats["histogram"], {"edges": [0.0, 1.0, 2.0, 3.0, 4.0], "counts": [2, 1, 0, 1]})
+
+    def test_empty_input_has_no_distribution(self):
+        stats = calculate_statistics([])
+
+        self.assertEqual((stats["count"], stats["mean"], stats["std_dev"]), (0, 0.0, 0.0))
+        self.assertIsNone(stats["min"])
+        self.assertIsNone(stats["p95"])
+        self.assertEqual(stats["histogram"], {"edges": [], "counts": []})
+
+    def test_running_statistics_match_the_array_mode(self):
+        values = [(n * 7919 % 1000) * 3600000.0 for n in range(1, 501)]
+        expected = calculate_statistics(values)
+
+        streamed = RunningStatistics()
+        for v in values:
+            streamed.add(v)
+        halves = RunningStatistics(), RunningStatistics()
+        for i, v in enumerate(values):
+            halves[i % 2].add(v)
+        merged = halves[0].merge(halves[1])
+
+        for stats in (streamed.as_dict(), merged.as_dict()):
+            self.assertEqual(stats["count"], expected["count"])
+            self.assertAlmostEqual(stats["mean"], expected["mean"])
+            self.assertAlmostEqual(stats["std_dev"], expected["std_dev"])
+            self.assertEqual((stats["min"], stats["max"]), (expected["min"], expected["max"]))
+            # only the array mode has the whole sample
+            self.assertIsNone(stats["p50"])
+            self.assertEqual(stats["histogram"], {"edges": [], "counts": []})
+        self.assertEqual(RunningStatistics().merge(streamed).as_dict(), streamed.as_dict())
+
+
+@override_settings(GITHUB_MAX_WORKERS=4)
+class ParallelMapTests(SimpleTestCase):
+    def test_results_keep_the_order_of_the_items(self):
+        def slow_square(n):
+            # later items finish first
+            time.sleep((10 - n) * 0.002)
+            return threading.get_ident(), n * n
+
+        results = parallel_map(slow_square, range(10))
+
+        self.assertEqual([square for _, square in results], [n * n for n in range(10)])
+        self.assertGreater(len({thread for thread, _ in results}), 1)
+
+    @override_settings(GITHUB_CACHE_BACKEND="none", GITHUB_MAX_RETRIES=0, GITHUB_BACKEND="rest", **NO_RATE_LIMITS)
+    def test_issue_events_are_returned_in_issue_order(self):
+        repository = make_fake_repository()
+        numbers = list(range(40, 0, -1))
+
+        with FakeGitHubServer(repository) as server, override_settings(GITHUB_API_URL=server.url):
+            events = GitHubRestService().get_github_issues_events("acme", "widgets", numbers)
+
+        self.assertEqual(events, [repository.issues[n]["events"] for n in numbers])
+        self.assertEqual(server.calls["events"], 40)
+
+
+@override_settings(GITHUB_CACHE_BACKEND="none", GITHUB_MAX_RETRIES=0, GITHUB_BACKEND="rest", **NO_RATE_LIMITS)
+class ReleaseTimelineTests(SimpleTestCase):
+    def _serve(self, repository):
+        server = FakeGitHubServer(repository).start()
+        self.addCleanup(server.stop)
+        settings_override = override_settings(GITHUB_API_URL=server.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        return server
+
+    def test_each_page_is_fetched_once(self):
+        server = self._serve(make_fake_repository())
+        timeline = ReleaseTimeline(GitHubRestService(), "acme", "widgets")
+
+        for _ in range(2):
+            recent = timeline.published_between(BASE + timedelta(days=200), BASE + timedelta(days=240))
+            older = timeline.created_between(BASE + timedelta(days=10), BASE + timedelta(days=20))
+            previous = timeline.latest_created_before(BASE + timedelta(days=120))
+
+        # 250 releases newest first: pages of 100, 100 and 50
+        self.assertEqual(server.calls["releases"], 3)
+        self.assertEqual([r.tag_name for r in recent], [f"v{i}" for i in range(200, 240) if i % 10])
+        self.assertEqual([r.tag_name for r in older], [f"v{i}" for i in range(11, 20)])
+        self.assertEqual(previous.tag_name, "v119")
+
+    def test_latest_created_before_reads_back_across_pages(self):
+        releases = _releases(range(1, 7))
+        for r in releases:
+            r["prerelease"] = r["id"] in (3, 4)
+        server = self._serve(FakeRepository("acme", "widgets", releases=releases))
+        timeline = ReleaseTimeline(GitHubRestService(), "acme", "widgets", per_page=2)
+
+        # pages [v6, v5], [v4, v3], [v2, v1]: v4 and v3 are prereleases
+        previous = timeline.latest_created_before(BASE + timedelta(hours=5))
+
+        self.assertEqual(previous.tag_name, "v2")
+        self.assertEqual(server.calls["releases"], 3)
+        self.assertIsNone(timeline.latest_created_before(BASE))
+
+    def test_drafts_are_never_published(self):
+        releases = _releases(range(1, 5))
+        releases[1]["published_at"] = None
+        timeline = ReleaseTimeline.from_releases(releases)
+
+        published = timeline.published_between(BASE, BASE + timedelta(days=1))
+
+        self.assertEqual([r.tag_name for r in published], ["v1", "v3", "v4"])
+
+    def test_concurrent_async_lookups_fetch_each_page_once(self):
+        server = self._serve(make_fake_repository())
+
+        async def lookups():
+            rest = AsyncGitHubRestService()
+            try:
+                timeline = AsyncReleaseTimeline(rest, "acme", "widgets")
+                return await asyncio.gather(*(
+                    timeline.latest_created_before(BASE + timedelta(days=day)) for day in (30, 120, 200, 30)
+                ))
+            finally:
+                await rest.aclose()
+
+        found = asyncio.run(lookups())
+
+        self.assertEqual([r.tag_name for r in found], ["v29", "v119", "v199", "v29"])
+        self.assertEqual(server.calls["releases"], 3)
+
+
+@override_settings(GITHUB_CACHE_BACKEND="none", GITHUB_MAX_RETRIES=2, GITHUB_BACKOFF_FACTOR=0,
+                   GITHUB_BACKEND="rest", **NO_RATE_LIMITS)
+class GitHubRestRetryTests(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeGitHubServer(make_fake_repository()).start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(GITHUB_API_URL=self.server.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        instrumentation.registry.clear()
+
+    def test_server_errors_are_retried(self):
+        self.server.respond_with("releases", [502, 503])
+
+        releases = GitHubRestService().get_github_releases("acme", "widgets")
+
+        self.assertEqual(len(releases), 100)
+        self.assertEqual(self.server.calls["releases"], 3)
+        self.assertEqual(instrumentation.GITHUB_RETRIES.value(resource="core", reason="server_error"), 2)
+
+    def test_rate_limited_responses_are_retried(self):
+        self.server.respond_with("search", [403, 429])
+
+        result = GitHubRestService().get_github_issues("repo:acme/widgets is:issue", 1, 10)
+
+        self.assertEqual(len(result["items"]), 10)
+        self.assertEqual(self.server.calls["search"], 3)
+        self.assertEqual(instrumentation.GITHUB_RETRIES.value(resource="search", reason="rate_limited"), 2)
+
+    def test_retries_are_bounded(self):
+        self.server.respond_with("releases", [500] * 3)
+        self.server.respond_with("search", [429] * 3)
+
+        with self.assertRaises(requests.HTTPError):
+            GitHubRestService().get_github_releases("acme", "widgets")
+        with self.assertRaises(requests.HTTPError):
+            GitHubRestService().get_github_issues("repo:acme/widgets is:issue")
+        self.assertEqual((self.server.calls["releases"], self.server.calls["search"]), (3, 3))
+
+    def test_async_client_retries_server_errors_and_rate_limits(self):
+        self.server.respond_with("releases", [502, 429])
+
+        async def fetch():
+            async with AsyncGitHubService() as svc:
+                return await svc.github_rest.get_github_releases("acme", "widgets")
+
+        self.assertEqual(len(asyncio.run(fetch())), 100)
+        self.assertEqual(self.server.calls["releases"], 3)
+        self.assertEqual(instrumentation.GITHUB_RETRIES.value(resource="core", reason="server_error"), 1)
+        self.assertEqual(instrumentation.GITHUB_RETRIES.value(resource="core", reason="rate_limited"), 1)
+
+
+@override_settings(GITHUB_MAX_RETRIES=0, GITHUB_BACKEND="rest", **NO_RATE_LIMITS)
+class GitHubResponseCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.repository = make_fake_repository()
+        self.server = FakeGitHubServer(self.repository).start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(GITHUB_API_URL=self.server.url,
+                                              GITHUB_CACHE_DIR=tempfile.mkdtemp())
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        instrumentation.registry.clear()
+
+    def assert_revalidated(self):
+        first = GitHubRestService().get_github_releases("acme", "widgets")
+        second = GitHubRestService().get_github_releases("acme", "widgets")
+
+        self.assertEqual(second, first)
+        self.assertEqual(self.server.calls["releases"], 2)
+        self.assertEqual(self.server.calls["not_modified"], 1)
+        self.assertEqual(instrumentation.GITHUB_CACHE.value(result="not_modified"), 1)
+
+        self.repository.add_releases(_releases([300], days_offset=300))
+        third = GitHubRestService().get_github_releases("acme", "widgets")
+        self.assertEqual(third[0]["id"], 300)
+        self.assertEqual(self.server.calls["not_modified"], 1)
+        self.assertEqual(instrumentation.GITHUB_CACHE.value(result="modified"), 1)
+
+    @override_settings(GITHUB_CACHE_BACKEND="filesystem")
+    def test_unchanged_responses_are_served_from_the_filesystem_cache(self):
+        self.assert_revalidated()
+
+    @override_settings(GITHUB_CACHE_BACKEND="django", GITHUB_CACHE_ALIAS="default")
+    def test_unchanged_responses_are_served_from_the_django_cache(self):
+        caches["default"].clear()
+        self.assert_revalidated()
+
+    @override_settings(GITHUB_CACHE_BACKEND="none")
+    def test_cache_can_be_disabled(self):
+        for _ in range(2):
+            GitHubRestService().get_github_releases("acme", "widgets")
+
+        self.assertNotIn("not_modified", self.server.calls)
+        self.assertEqual(os.listdir(settings.GITHUB_CACHE_DIR), [])
+
+    def test_filesystem_backend_evicts_the_least_recently_used_entries(self):
+        backend = FileSystemCacheBackend(tempfile.mkdtemp(), max_entries=10)
+        for n in range(10):
+            backend.set(f"k{n}", {"n": n})
+            os.utime(os.path.join(backend.directory, f"k{n}.json"), (1000 + n, 1000 + n))
+        self.assertEqual(backend.get("k0"), {"n": 0})
+
+        backend.set("k10", {"n": 10})
+
+        # pruned to 90%: the two least recently used entries go, k0 was just read
+        remaining = sorted(name[:-5] for name in os.listdir(backend.directory))
+        self.assertEqual(remaining, sorted(["k0"] + [f"k{n}" for n in range(3, 11)]))
+        self.assertIsNone(backend.get("k1"))
+
+
+class GitHubRecordsTests(SimpleTestCase):
+    def test_timestamps_are_parsed_to_utc(self):
+        expected = datetime(2023, 1, 1, 10, tzinfo=timezone.utc)
+
+        self.assertEqual(parse_timestamp("2023-01-01T10:00:00Z"), expected)
+        self.assertEqual(parse_timestamp("2023-01-01T12:00:00+02:00"), expected)
+        self.assertEqual(parse_timestamp(expected), expected)
+
+    def test_release_record_keeps_only_the_metric_fields(self):
+        record = ReleaseRecord.from_api({
+            "id": 7, "tag_name": "v7", "created_at": "2023-01-01T10:00:00Z", "published_at": None,
+            "prerelease": False, "body": "notes", "assets": [{"id": 1}],
+        })
+
+        self.assertIsNone(record.published_at)
+        self.assertFalse(hasattr(record, "__dict__"))
+        self.assertEqual(record.as_dict(), {
+            "id": 7, "tag_name": "v7", "created_at": "2023-01-01T10:00:00Z", "published_at": None,
+            "prerelease": False,
+        })
+
+    def test_last_reference_is_the_latest_commit_inside_the_window(self):
+        events = [
+            {"event": "referenced", "created_at": _iso(BASE + timedelta(days=3))},
+            {"event": "referenced", "created_at": _iso(BASE + timedelta(days=5))},
+            {"event": "closed", "created_at": _iso(BASE + timedelta(days=6))},
+            {"event": "referenced", "created_at": _iso(BASE + timedelta(days=9))},
+        ]
+
+        self.assertEqual(last_reference_at(events, BASE, BASE + timedelta(days=8)), BASE + timedelta(days=5))
+        self.assertIsNone(last_reference_at(events, BASE + timedelta(days=5), BASE + timedelta(days=9)))
+
+
+class _Response:
+    def __init__(self, status_code=200, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = ""
+
+
+class RateLimitCoordinatorTests(SimpleTestCase):
+    CREDENTIALS = [Credential("alice", "Basic a"), Credential("bob", "Basic b")]
+
+    def test_requests_rotate_to_the_least_used_credential(self):
+        coordinator = RateLimitCoordinator(self.CREDENTIALS, {"core": (2, 60), "search": (1, 60)})
+
+        users = [coordinator.acquire("core")[0].username for _ in range(4)]
+        credential, wait = coordinator.acquire("core")
+
+        self.assertEqual(users, ["alice", "bob", "alice", "bob"])
+        self.assertIsNone(credential)
+        self.assertAlmostEqual(wait, 30, delta=1)
+        # the search bucket is independent of the exhausted core one
+        self.assertEqual(coordinator.acquire("search")[0].username, "alice")
+
+    def test_budget_is_shared_through_the_state_file(self):
+        path = os.path.join(tempfile.mkdtemp(), "rate_limit.json")
+        first = RateLimitCoordinator(self.CREDENTIALS[:1], {"search": (3, 60)}, path)
+        second = RateLimitCoordinator(self.CREDENTIALS[:1], {"search": (3, 60)}, path)
+
+        taken = [first.acquire("search")[0], second.acquire("search")[0], first.acquire("search")[0]]
+
+        self.assertTrue(all(taken))
+        self.assertIsNone(second.acquire("search")[0])
+
+    def test_exhausted_quota_pauses_only_that_credential(self):
+        coordinator = RateLimitCoordinator(self.CREDENTIALS, {})
+        alice = coordinator.acquire("core")[0]
+        reset = int(time.time()) + 600
+
+        paced = coordinator.update(alice, "core", _Response(403, {
+            "X-RateLimit-Remaining": "0", "X-RateLimit-Reset": str(reset),
+        }))
+
+        self.assertTrue(paced)
+        bob = coordinator.acquire("core")[0]
+        self.assertEqual(bob.username, "bob")
+        coordinator.update(bob, "core", _Response(200, {
+            "X-RateLimit-Remaining": "10", "X-RateLimit-Reset": str(reset),
+        }))
+        self.assertEqual([coordinator.acquire("core")[0].username for _ in range(10)], ["bob"] * 10)
+        self.assertIsNone(coordinator.acquire("core")[0])
+
+        coordinator.update(alice, "core", _Response(200, {
+            "X-RateLimit-Remaining": "4999", "X-RateLimit-Reset": str(reset + 3600),
+        }))
+        self.assertEqual(coordinator.acquire("core")[0].username, "alice")
+
+    def test_only_long_waits_are_logged_at_info(self):
+        # 600 requests a minute: one token every 0.1s
+        coordinator = RateLimitCoordinator(self.CREDENTIALS[:1], {"core": (600, 60)})
+        for _ in range(600):
+            coordinator.acquire("core")
+
+        with self.assertLogs("metrics.services.github_rate_limit", "DEBUG") as logs:
+            coordinator.take("core")
+
+        self.assertTrue(logs.records)
+        self.assertEqual({r.levelname for r in logs.records}, {"DEBUG"})
+
+
+class FairSchedulerTests(SimpleTestCase):
+    def test_slots_are_granted_round_robin_across_projects(self):
+        scheduler = FairScheduler(capacity=1)
+        order = []
+
+        def request(key):
+            with scheduler.slot(key):
+                order.append(key)
+
+        scheduler.acquire("hog")
+        threads = []
+        for key in ["a"] * 5 + ["b"] * 2 + ["c"]:
+            queued = len(scheduler._queues.get(key, ()))
+            thread = threading.Thread(target=request, args=(key,))
+            thread.start()
+            threads.append(thread)
+            while len(scheduler._queues.get(key, ())) == queued:
+                time.sleep(0.001)
+        scheduler.release()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(order, ["a", "b", "c", "a", "b", "a", "a", "a"])
+        self.assertEqual(scheduler.granted, {"hog": 1, "a": 5, "b": 2, "c": 1})
+
+
+@override_settings(GITHUB_CACHE_BACKEND="none", GITHUB_MAX_RETRIES=0, GITHUB_BACKEND="rest",
+                   GITHUB_DATA_SOURCE="api", SECURE_SSL_REDIRECT=False,
+                   METRICS_BATCH_WORKERS=2, METRICS_BATCH_CONCURRENCY=3, **NO_RATE_LIMITS)
+class MetricsBatchTests(TransactionTestCase):
+    def test_batch_returns_per_project_results_and_errors(self):
+        with FakeGitHubServer(make_fake_repository()) as server, override_settings(GITHUB_API_URL=server.url):
+            window = {"since_day": _iso(BASE + timedelta(days=2)), "until_day": _iso(BASE + timedelta(days=40)),
+                      "bug_label": "bug"}
+            result = compute_and_store_batch([
+                {"owner": "acme", "repository": "widgets", **window},
+                {"owner": "acme", "repository": "missing", **window},
+            ])
+
+        self.assertEqual((result["succeeded"], result["failed"]), (1, 1))
+        ok, failed = result["projects"]
+        self.assertEqual((ok["repository"], ok["status"]), ("widgets", "succeeded"))
+        self.assertIn("release_frecuency", ok["result"])
+        self.assertEqual((failed["repository"], failed["status"]), ("missing", "failed"))
+        self.assertIn("404", failed["error"])
+        self.assertEqual(Metric.objects.filter(project__repository="widgets").count(), 4)
+
+
+@override_settings(GITHUB_CACHE_BACKEND="none", GITHUB_MAX_RETRIES=0, GITHUB_BACKEND="rest",
+                   GITHUB_DATA_SOURCE="api", METRICS_BATCH_CONCURRENCY=3, **NO_RATE_LIMITS)
+class RefreshMetricsCommandTests(TransactionTestCase):
+    def setUp(self):
+        self.server = FakeGitHubServer(make_fake_repository()).start()
+        self.addCleanup(self.server.stop)
+        settings_override = override_settings(GITHUB_API_URL=self.server.url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.checkpoint = os.path.join(tempfile.mkdtemp(), "refresh.json")
+        Project.objects.create(name="acme/widgets", owner="acme", repository="widgets", bug_label="bug")
+
+    def refresh(self, *args, out=None):
+        out = out or io.StringIO()
+        call_command("refresh_metrics", "--until", "2023-02-10", "--windows", "7,30",
+                     "--checkpoint", self.checkpoint, "--workers", "2", *args, stdout=out, stderr=io.StringIO())
+        return out.getvalue()
+
+    def test_stored_windows_are_skipped_on_rerun(self):
+        out = self.refresh()
+
+        self.assertIn("2 window(s) to compute", out)
+        windows = set(Metric.objects.values_list("since", "until").distinct())
+        until = datetime(2023, 2, 10, tzinfo=timezone.utc)
+        self.assertEqual(windows, {(until - timedelta(days=7), until), (until - timedelta(days=30), until)})
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+        searches = self.server.calls["search"]
+        self.assertIn("0 window(s) to compute, 2 already up to date", self.refresh())
+        self.assertEqual(self.server.calls["search"], searches)
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        Project.objects.create(name="acme/missing", owner="acme", repository="missing", bug_label="bug")
+
+        with self.assertRaises(CommandError):
+            self.refresh("--force")
+        with open(self.checkpoint) as fh:
+            self.assertEqual(len(json.load(fh)["done"]), 2)
+
+        # --force ignores stored windows, but the checkpoint still skips finished ones
+        out = io.StringIO()
+        with self.assertRaises(CommandError):
+            self.refresh("--force", out=out)
+        self.assertIn("2 window(s) to compute, 2 already up to date", out.getvalue())
+        self.assertEqual(Metric.objects.filter(project__repository="widgets").count(), 8)
+
+
+    def test_each_project_is_refreshed_with_its_own_bug_label(self):
+        Project.objects.create(name="acme/gears", owner="acme", repository="gears", bug_label="type/bug")
+        specs = []
+
+        def compute_and_store_batch(batch, workers, on_result):
+            specs.extend(batch)
+            return {"succeeded": len(batch), "failed": 0, "projects": []}
+
+        with mock.patch("metrics.management.commands.refresh_metrics.compute_and_store_batch",
+                        compute_and_store_batch):
+            self.refresh()
+            self.refresh("--bug-label", "incident")
+
+        labels = [(spec["repository"], spec["bug_label"]) for spec in specs]
+        self.assertEqual(labels[:4], [("widgets", "bug")] * 2 + [("gears", "type/bug")] * 2)
+        self.assertEqual({label for _, label in labels[4:]}, {"incident"})
+
+    def test_projects_without_a_known_bug_label_need_the_option(self):
+        Project.objects.create(name="acme/gears", owner="acme", repository="gears")
+
+        with self.assertRaisesMessage(CommandError, "No bug label is known for acme/gears"):
+            self.refresh()
+
+
+@override_settings(GITHUB_MAX_WORKERS=4, METRICS_JOB_PROGRESS_INTERVAL=0)
+class JobProgressThreadTests(TransactionTestCase):
+    def test_flushes_from_pool_threads_close_their_connections(self):
+        job = MetricJob.objects.create(kind="store_metrics", params={}, status=MetricJob.STATUS_RUNNING)
+        progress = JobProgress(job.pk)
+        wrappers = []
+
+        def fetch(n):
+            progress.incr("pages_fetched")
+            wrappers.append(connections["default"])
+
+        parallel_map(fetch, range(8))
+
+        job.refresh_from_db()
+        self.assertEqual(job.progress["pages_fetched"], 8)
+        self.assertNotIn(connections["default"], wrappers)
+        self.assertTrue(all(wrapper.connection is None for wrapper in wrappers))
+
+
+@override_settings(GITHUB_CACHE_BACKEND="none", GITHUB_MAX_RETRIES=0, GITHUB_BACKEND="rest",
+                   GITHUB_DATA_SOURCE="api", SECURE_SSL_REDIRECT=False, **NO_RATE_LIMITS)
+class MetricJobTests(TestCase):
+    PAYLOAD = {"owner": "acme", "repository": "widgets", "since_day": _iso(BASE + timedelta(days=2)),
+               "until_day": _iso(BASE + timedelta(days=40)), "bug_label": "bug"}
+
+    def submit(self, payload=None):
+        return self.client.post(reverse("metric-job-submit"), payload or self.PAYLOAD,
+                                content_type="application/json")
+
+    def test_identical_requests_share_one_job(self):
+        first = self.submit()
+        second = self.submit()
+        other = self.submit({**self.PAYLOAD, "bug_label": "type/bug"})
+
+        self.assertEqual(first.status_code, 202)
+        self.assertTrue(first.json()["created"])
+        self.assertEqual(second.json()["job_id"], first.json()["job_id"])
+        self.assertFalse(second.json()["created"])
+        self.assertNotEqual(other.json()["job_id"], first.json()["job_id"])
+        self.assertEqual(self.submit({"owner": "acme"}).status_code, 400)
+
+    def test_status_reports_the_result_of_a_store_metrics_job(self):
+        job = MetricJob.objects.get(pk=self.submit().json()["job_id"])
+        status_url = reverse("metric-job-status", args=[job.pk])
+        self.assertEqual(self.client.get(status_url).json()["status"], MetricJob.STATUS_PENDING)
+
+        with FakeGitHubServer(make_fake_repository()) as server, override_settings(GITHUB_API_URL=server.url):
+            run_job(claim_next_job())
+        body = self.client.get(status_url).json()
+
+        self.assertEqual(body["status"], MetricJob.STATUS_SUCCEEDED)
+        self.assertEqual(body["kind"], "store_metrics")
+        self.assertEqual(body["progress"]["phase"], "storing")
+        self.assertEqual(body["progress"]["pages_fetched"], sum(server.calls.values()))
+        self.assertIn("lead_time_for_released_changes", body["result"])
+        self.assertIsNone(body["error"])
+        self.assertEqual(Metric.objects.filter(project__repository="widgets").count(), 4)
+
+    @override_settings(METRICS_JOB_STALE_AFTER=60, METRICS_JOB_MAX_ATTEMPTS=2)
+    def test_jobs_of_dead_workers_are_queued_again_then_failed(self):
+        job_id = self.submit().json()["job_id"]
+        stale = dj_timezone.now() - timedelta(seconds=120)
+
+        for attempt in (1, 2):
+            job = claim_next_job()
+            self.assertEqual((job.pk, job.attempts), (job_id, attempt))
+            self.assertEqual(recover_stale_jobs(), 0)
+            # the worker dies: its heartbeat stops
+            MetricJob.objects.filter(pk=job_id).update(heartbeat_at=stale)
+            # an identical request meanwhile is still deduplicated onto the job
+            self.assertEqual(self.submit().json()["job_id"], job_id)
+            self.assertEqual(recover_stale_jobs(), 1)
+
+        job = MetricJob.objects.get(pk=job_id)
+        self.assertEqual(job.status, MetricJob.STATUS_FAILED)
+        self.assertIn("stopped responding", job.error)
+        self.assertTrue(self.submit().json()["created"])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class MetricsBatchEndpointTests(TestCase):
+    def test_batch_endpoint_queues_one_job(self):
+        spec = {"owner": "acme", "repository": "widgets", "since_day": "2023-01-01T00:00:00Z",
+                "until_day": "2023-02-01T00:00:00Z", "bug_label": "bug"}
+
+        response = self.client.post(reverse("metric-batch-submit"), {"projects": [spec, {**spec, "repository": "gears"}]},
+                                    content_type="application/json")
+
+        self.assertEqual(response.status_code, 202)
+        job = MetricJob.objects.get(pk=response.json()["job_id"])
+        self.assertEqual(job.kind, "store_metrics_batch")
+        self.assertEqual([p["repository"] for p in job.params["projects"]], ["widgets", "gears"])
+
+        for body in ({"projects": []}, {"projects": [{"owner": "acme"}]}, [spec]):
+            response = self.client.post(reverse("metric-batch-submit"), body, content_type="application/json")
+            self.assertEqual(response.status_code, 400, body)
+
+
+def create_projects_with_metrics(count, windows=3, start=0):
+    metric_types = [t for t, _ in Metric.METRIC_TYPES]
+    for i in range(start, start + count):
+        project = Project.objects.create(name=f"org/repo{i}", owner="org", repository=f"repo{i}")
+        Metric.objects.bulk_create([
+            Metric(
+                project=project,
+                metric_type=metric_type,
+                value=float(w),
+                variance=0.5,
+                since=BASE + timedelta(days=30 * w),
+                until=BASE + timedelta(days=30 * (w + 1)),
+            )
+            for w in range(windows)
+            for metric_type in metric_types
+        ])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, METRICS_READ_CACHE_TIMEOUT=0)
+class MetricsReadQueryCountTests(TestCase):
+    def test_list_query_count_does_not_grow_with_projects(self):
+        create_projects_with_metrics(2)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("metrics‐list"))
+        self.assertEqual(len(response.json()["projects"]), 2)
+
+        create_projects_with_metrics(30, start=2)
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("metrics‐list"))
+        self.assertEqual(len(response.json()["projects"]), 32)
+
+    def test_list_response_shape_and_order(self):
+        create_projects_with_metrics(2)
+        Project.objects.create(name="empty/repo", owner="empty", repository="repo")
+
+        body = self.client.get(
+            reverse("metrics‐list"), {"projects": "org/repo1,empty/repo", "metric_types": "bug_issues_rate"}
+        ).json()
+
+        self.assertEqual([(p["owner"], p["repository"]) for p in body["projects"]],
+                         [("org", "repo1"), ("empty", "repo")])
+        metrics = body["projects"][0]["metrics"]
+        self.assertEqual([m["since"] for m in metrics],
+                         [(BASE + timedelta(days=30 * w)).isoformat() for w in (2, 1, 0)])
+        self.assertEqual({m["metric_type"] for m in metrics}, {"bug_issues_rate"})
+        self.assertEqual(body["projects"][1]["metrics"], [])
+
+    def test_keyset_pages_cover_every_metric_once_in_order(self):
+        create_projects_with_metrics(3)
+        windowless = Metric.objects.create(
+            project=Project.objects.get(repository="repo1"), metric_type="release_frequency", value=9.0
+        )
+        expected = list(
+            Metric.objects.order_by(F("since").asc(nulls_first=True), "metric_type", "id")
+            .values_list("id", flat=True)
+        )
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            params = {"limit": 5, "fields": "id,repository,value"}
+            if cursor:
+                params["cursor"] = cursor
+            with self.assertNumQueries(1):
+                body = self.client.get(reverse("metrics‐list"), params).json()
+            pages += 1
+            self.assertTrue(all(set(m) == {"id", "repository", "value"} for m in body["metrics"]))
+            seen += [m["id"] for m in body["metrics"]]
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+
+        self.assertEqual(seen, expected)
+        self.assertEqual(seen[0], windowless.id)
+        self.assertEqual(pages, 8)  # 37 metrics, 5 per page
+
+    def test_keyset_pages_apply_filters(self):
+        create_projects_with_metrics(3)
+
+        body = self.client.get(
+            reverse("metrics‐list"),
+            {"projects": "org/repo2", "metric_types": "bug_issues_rate", "limit": 2},
+        ).json()
+        self.assertEqual([(m["repository"], m["since"]) for m in body["metrics"]],
+                         [("repo2", BASE.isoformat()), ("repo2", (BASE + timedelta(days=30)).isoformat())])
+
+        body = self.client.get(
+            reverse("metrics‐list"),
+            {"projects": "org/repo2", "metric_types": "bug_issues_rate", "limit": 2,
+             "cursor": body["next_cursor"]},
+        ).json()
+        self.assertEqual([m["since"] for m in body["metrics"]], [(BASE + timedelta(days=60)).isoformat()])
+        self.assertIsNone(body["next_cursor"])
+
+    def test_invalid_page_parameters_are_400(self):
+        for params in ({"limit": 0}, {"limit": "many"}, {"cursor": "not-a-cursor"}, {"fields": "id,secret"}):
+            response = self.client.get(reverse("metrics‐list"), params)
+            self.assertEqual(response.status_code, 400, params)
+
+    def test_compare_query_count_does_not_grow_with_projects(self):
+        create_projects_with_metrics(25)
+        projects = ",".join(f"org/repo{i}" for i in range(25))
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("compare-metrics"), {"projects": projects})
+
+        body = response.json()["projects"]
+        self.assertEqual(len(body), 25)
+        self.assertEqual(len(body[0]["metrics"]["release_frequency"]), 3)
+        self.assertEqual(set(body[0]["metrics"]["release_frequency"][0]), {"since", "until", "value", "variance"})
+
+    def test_compare_unknown_projects_is_404(self):
+        response = self.client.get(reverse("compare-metrics"), {"projects": "nobody/nothing"})
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, METRICS_READ_CACHE_TIMEOUT=0)
+class MetricsRollupTests(TestCase):
+    def test_monthly_rollup_is_aggregated_in_one_grouped_query(self):
+        create_projects_with_metrics(2, windows=4)  # windows start Jan 1, Jan 31, Mar 2, Apr 1
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse("metrics-rollup"), {"bucket": "month"})
+
+        body = response.json()
+        self.assertEqual(body["bucket"], "month")
+        self.assertEqual(len(body["projects"]), 2)
+        rollup = body["projects"][0]["metrics"]["release_frequency"]
+        self.assertEqual(rollup, [
+            {"bucket": "2023-01-01T00:00:00+00:00", "avg": 0.5, "min": 0.0, "max": 1.0, "count": 2},
+            {"bucket": "2023-03-01T00:00:00+00:00", "avg": 2.0, "min": 2.0, "max": 2.0, "count": 1},
+            {"bucket": "2023-04-01T00:00:00+00:00", "avg": 3.0, "min": 3.0, "max": 3.0, "count": 1},
+        ])
+
+    def test_quarterly_rollup_applies_filters(self):
+        create_projects_with_metrics(2, windows=4)
+
+        body = self.client.get(reverse("metrics-rollup"), {
+            "bucket": "quarter", "projects": "org/repo1", "metric_types": "bug_issues_rate",
+        }).json()
+
+        self.assertEqual(len(body["projects"]), 1)
+        self.assertEqual(body["projects"][0]["metrics"], {"bug_issues_rate": [
+            {"bucket": "2023-01-01T00:00:00+00:00", "avg": 1.0, "min": 0.0, "max": 2.0, "count": 3},
+            {"bucket": "2023-04-01T00:00:00+00:00", "avg": 3.0, "min": 3.0, "max": 3.0, "count": 1},
+        ]})
+
+    def test_invalid_bucket_is_400(self):
+        response = self.client.get(reverse("metrics-rollup"), {"bucket": "fortnight"})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, METRICS_READ_CACHE_TIMEOUT=60)
+class MetricsReadCacheTests(TestCase):
+    def setUp(self):
+        caches["default"].clear()
+        create_projects_with_metrics(2)
+
+    def test_equivalent_queries_are_served_from_cache(self):
+        with self.assertNumQueries(1):
+            first = self.client.get(reverse("metrics‐list"), {"projects": "org/repo1,org/repo0", "limit": "5"})
+        with self.assertNumQueries(0):
+            second = self.client.get(reverse("metrics‐list"), {"limit": "5", "projects": "org/repo0, org/repo1"})
+
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(first["ETag"], second["ETag"])
+        self.assertIn("Last-Modified", second)
+
+    def test_conditional_get_is_answered_with_304(self):
+        etag = self.client.get(reverse("compare-metrics"), {"projects": "org/repo0"})["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("compare-metrics"), {"projects": "org/repo0"},
+                                       HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_writes_invalidate_only_affected_responses(self):
+        url = reverse("compare-metrics")
+        self.client.get(url, {"projects": "org/repo0"})
+        self.client.get(url, {"projects": "org/repo1"})
+        self.client.get(reverse("metrics‐list"))
+
+        project = Project.objects.get(repository="repo0")
+        with self.captureOnCommitCallbacks(execute=True):
+            upsert_metrics([Metric(project=project, metric_type="release_frequency", value=42.0,
+                                   since=BASE, until=BASE + timedelta(days=30))])
+
+        with self.assertNumQueries(2):
+            body = self.client.get(url, {"projects": "org/repo0"}).json()
+        self.assertEqual(body["projects"][0]["metrics"]["release_frequency"][0]["value"], 42.0)
+        with self.assertNumQueries(0):
+            self.client.get(url, {"projects": "org/repo1"})
+        with self.assertNumQueries(2):
+            self.client.get(reverse("metrics‐list"))
+
+    def test_delete_without_project_filter_invalidates_everything(self):
+        url = reverse("compare-metrics")
+        self.client.get(url, {"projects": "org/repo1"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse("metrics-delete"))
+
+        body = self.client.get(url, {"projects": "org/repo1"}).json()
+        self.assertEqual(body["projects"][0]["metrics"], {})
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class MetricsExportTests(TestCase):
+    def _content(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_csv_export_streams_all_projects(self):
+        create_projects_with_metrics(3)
+
+        response = self.client.get(reverse("metrics-export"))
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "text/csv")
+        rows = list(csv.reader(io.StringIO(self._content(response).decode())))
+        self.assertEqual(rows[0][:4], ["owner", "repository", "metric_id", "metric_type"])
+        self.assertEqual(len(rows) - 1, Metric.objects.count())
+        self.assertEqual({r[1] for r in rows[1:]}, {"repo0", "repo1", "repo2"})
+
+    def test_ndjson_export_applies_filters_and_gzip(self):
+        create_projects_with_metrics(3)
+
+        response = self.client.get(reverse("metrics-export"), {
+            "projects": "org/repo0,org/repo2",
+            "metric_types": "bug_issues_rate",
+            "since": (BASE + timedelta(days=30)).isoformat(),
+            "format": "ndjson",
+            "gzip": "1",
+        })
+
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn('filename="metrics.ndjson.gz"', response["Content-Disposition"])
+        lines = gzip.decompress(self._content(response)).decode().splitlines()
+        items = [json.loads(line) for line in lines]
+        self.assertEqual([(i["repository"], i["since"]) for i in items], [
+            ("repo0", (BASE + timedelta(days=30)).isoformat()),
+            ("repo0", (BASE + timedelta(days=60)).isoformat()),
+            ("repo2", (BASE + timedelta(days=30)).isoformat()),
+            ("repo2", (BASE + timedelta(days=60)).isoformat()),
+        ])
+        self.assertEqual({i["metric_type"] for i in items}, {"bug_issues_rate"})
+
+    def test_invalid_format_is_400(self):
+        response = self.client.get(reverse("metrics-export"), {"format": "xml"})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, METRICS_DELETE_BATCH_SIZE=2)
+class BulkDeleteTests(TestCase):
+    def setUp(self):
+        create_projects_with_metrics(2)
+        self.project = Project.objects.get(repository="repo0")
+        GitHubRelease.objects.bulk_create([
+            GitHubRelease(project=self.project, github_id=n, created_at=BASE) for n in range(3)
+        ])
+        for number in range(3):
+            issue = GitHubIssue.objects.create(project=self.project, number=number, created_at=BASE, updated_at=BASE)
+            GitHubIssueLabel.objects.create(issue=issue, name="bug")
+            GitHubIssueEvent.objects.bulk_create([
+                GitHubIssueEvent(issue=issue, event="referenced", created_at=BASE) for _ in range(2)
+            ])
+        GitHubSyncState.objects.create(project=self.project)
+
+    def test_project_and_its_data_are_deleted_in_batches(self):
+        response = self.client.delete(reverse("project-delete", args=[self.project.pk]))
+
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Project.objects.filter(pk=self.project.pk).exists())
+        self.assertFalse(Metric.objects.filter(project_id=self.project.pk).exists())
+        self.assertFalse(GitHubRelease.objects.exists())
+        self.assertFalse(GitHubIssue.objects.exists())
+        self.assertFalse(GitHubIssueLabel.objects.exists())
+        self.assertFalse(GitHubIssueEvent.objects.exists())
+        self.assertFalse(GitHubSyncState.objects.exists())
+        self.assertEqual(Metric.objects.filter(project__repository="repo1").count(), 12)
+
+    def test_signal_receivers_fall_back_to_the_collector(self):
+        deleted = []
+
+        def receiver(sender, instance, **kwargs):
+            deleted.append(instance.pk)
+
+        pre_delete.connect(receiver, sender=Metric)
+        self.addCleanup(pre_delete.disconnect, receiver, sender=Metric)
+        response = self.client.delete(reverse("metrics-delete") + "?projects=org/repo1")
+
+        self.assertEqual(response.json(), {"message": "Deleted 12 metric(s)."})
+        self.assertEqual(len(deleted), 12)
+
+    def test_metric_range_is_deleted_in_a_background_job(self):
+        query = urlencode({"projects": "org/repo0", "since": (BASE + timedelta(days=30)).isoformat(), "background": 1})
+
+        response = self.client.delete(reverse("metrics-delete") + "?" + query)
+
+        self.assertEqual(response.status_code, 202)
+        job = MetricJob.objects.get(pk=response.json()["job_id"])
+        self.assertEqual(job.kind, "delete_metrics")
+        run_job(job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, MetricJob.STATUS_SUCCEEDED)
+        self.assertEqual(job.result, {"deleted": 8})
+        self.assertEqual(job.progress["rows_deleted"], 8)
+        self.assertEqual(Metric.objects.filter(project=self.project).count(), 4)
+
+
+
+class MergeDuplicateProjectsMigrationTests(TransactionTestCase):
+    BEFORE = [("metrics", "0008_metric_unique_window")]
+    AFTER = [("metrics", "0009_merge_duplicate_projects")]
+
+    def setUp(self):
+        self.executor = MigrationExecutor(connection)
+        self.latest = self.executor.loader.graph.leaf_nodes("metrics")
+        self.addCleanup(self._migrate, self.latest)
+        self._migrate(self.BEFORE)
+
+    def _migrate(self, targets):
+        self.executor.loader.build_graph()
+        self.executor.migrate(targets)
+        return self.executor.loader.project_state(targets).apps
+
+    def test_duplicate_projects_are_folded_into_the_oldest(self):
+        apps = self.executor.loader.project_state(self.BEFORE).apps
+        Project, Metric = apps.get_model("metrics", "Project"), apps.get_model("metrics", "Metric")
+        kept, *duplicates = [Project.objects.create(name="widgets", owner="acme", repository="widgets")
+                             for _ in range(3)]
+        other = Project.objects.create(name="gears", owner="acme", repository="gears")
+        window = {"since": BASE, "until": BASE + timedelta(days=30)}
+        Metric.objects.create(project=kept, metric_type="release_frequency", value=1.0, **window)
+        Metric.objects.create(project=duplicates[0], metric_type="bug_issues_rate", value=0.5, **window)
+        Metric.objects.create(project=duplicates[0], metric_type="time_to_repair_code", value=4.0)
+        Metric.objects.create(project=duplicates[1], metric_type="release_frequency", value=3.0, **window)
+        Metric.objects.create(project=other, metric_type="release_frequency", value=7.0, **window)
+
+        apps = self._migrate(self.AFTER)
+
+        Project, Metric = apps.get_model("metrics", "Project"), apps.get_model("metrics", "Metric")
+        self.assertEqual(list(Project.objects.filter(repository="widgets").values_list("id", flat=True)), [kept.id])
+        # the newest metric of a window wins
+        self.assertEqual(
+            sorted(Metric.objects.filter(project_id=kept.id).values_list("metric_type", "value")),
+            [("bug_issues_rate", 0.5), ("release_frequency", 3.0), ("time_to_repair_code", 4.0)],
+        )
+        self.assertEqual(list(Metric.objects.filter(project_id=other.id).values_list("value", flat=True)), [7.0])
@@ -5,7 +5,13 @@ urlpatterns = [
     path("", views.store_metrics_view, name="metrics‐store"),
     path("all/", views.get_metrics_view, name="metrics‐list"),
     path("compare/", views.compare_metrics_view, name="compare-metrics"),
+    path("rollup/", views.rollup_metrics_view, name="metrics-rollup"),
     path("projects/<int:project_id>/delete/", views.delete_project_view, name="project-delete"),
     path("delete/", views.delete_metrics_view, name="metrics-delete"),
     path("projects/<int:project_id>/export/", views.export_project_view, name="project-export"),
+    path("export/", views.export_metrics_view, name="metrics-export"),
+    path("jobs/", views.submit_metrics_job_view, name="metric-job-submit"),
+    path("batch/", views.submit_metrics_batch_view, name="metric-batch-submit"),
+    path("jobs/<int:job_id>/", views.metric_job_status_view, name="metric-job-status"),
+    path("prometheus/", views.prometheus_metrics_view, name="metrics-prometheus"),
 ]
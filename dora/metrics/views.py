@@ -1,177 +1,387 @@
-from django.http import JsonResponse
+from django.http import HttpResponse, HttpResponseNotAllowed, JsonResponse
 from django.views.decorators.http import require_POST, require_GET
-from .services.github_service import GitHubService
-from .services.metric_service import calculate_mean_and_variance
-from .models import Project, Metric
+from .services import delete_service, instrumentation, read_cache
+from .services.job_service import enqueue_job
+from .services.store_service import compute_and_store_metrics_async
+from .models import Project, Metric, MetricJob
 import json
 from django.views.decorators.csrf import ensure_csrf_cookie
-from django.db.models import Q
+from django.db.models import Avg, Count, F, Max, Min, Q
+from django.db.models.functions import TruncMonth, TruncQuarter, TruncWeek
 from datetime import timezone
 from dateutil import parser
 from django.views.decorators.http import require_http_methods
 from django.utils.dateparse import parse_datetime
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+import base64
+import binascii
 import csv
-from django.http import HttpResponse
+import zlib
+from django.http import StreamingHttpResponse
 
 
-@require_POST
-def store_metrics_view(request):
+STORE_FIELDS = ["owner", "repository", "since_day", "until_day", "bug_label"]
+BATCH_MAX_PROJECTS = 1000
+
+
+def _parse_store_payload(request):
+    """
+    Returns (params, None) for a valid store request body, or (None, error_response).
+    """
     try:
         payload = json.loads(request.body)
-        owner = payload["owner"]
-        repo = payload["repository"]
-        since_day = payload["since_day"]
-        until_day = payload["until_day"]
-        bug_label = payload["bug_label"]
-    except (KeyError, json.JSONDecodeError):
-        return JsonResponse({"error": "Invalid JSON or missing required fields."}, status=400)
+        params = {field: payload[field] for field in STORE_FIELDS}
+    except (KeyError, TypeError, json.JSONDecodeError):
+        return None, JsonResponse({"error": "Invalid JSON or missing required fields."}, status=400)
+    return params, None
 
-    svc = GitHubService()
 
-    df_list = svc.get_github_deployment_frequency(owner, repo, since_day, until_day)
-    df_mean, df_std = calculate_mean_and_variance(df_list)
+def _parse_batch_payload(request):
+    """
+    Returns (list of store params, None) for a valid batch body
+    {"projects": [{owner, repository, since_day, until_day, bug_label}, ...]},
+    or (None, error_response).
+    """
+    try:
+        specs = json.loads(request.body)["projects"]
+        if not isinstance(specs, list) or not 0 < len(specs) <= BATCH_MAX_PROJECTS:
+            raise TypeError
+        projects = [{field: spec[field] for field in STORE_FIELDS} for spec in specs]
+    except (KeyError, TypeError, json.JSONDecodeError):
+        return None, JsonResponse(
+            {"error": f"Expected {{\"projects\": [...]}} with 1 to {BATCH_MAX_PROJECTS} entries, "
+                      f"each with {', '.join(STORE_FIELDS)}."},
+            status=400,
+        )
+    return projects, None
+
+
+def _job_accepted_response(job, created):
+    return JsonResponse(
+        {
+            "job_id": job.id,
+            "status": job.status,
+            "created": created,
+            "status_url": reverse("metric-job-status", args=[job.id]),
+        },
+        status=202,
+    )
 
-    lt_list = svc.get_github_lead_time_for_changes(owner, repo, since_day, until_day, bug_label)
-    lt_mean, lt_std = calculate_mean_and_variance(lt_list)
 
-    tr_list = svc.get_github_time_to_restore_service(owner, repo, since_day, until_day, bug_label)
-    tr_mean, tr_std = calculate_mean_and_variance(tr_list)
+def _serialize_job(job):
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "params": job.params,
+        "progress": job.progress,
+        "result": job.result,
+        "error": job.error or None,
+        "attempts": job.attempts,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
+
+
+@instrumentation.server_timing
+async def store_metrics_view(request):
+    """
+    POST /metrics/
+    Computes and stores the metrics of one repository and window. The view is
+    async: under ASGI the GitHub calls of the four metrics run concurrently on the
+    event loop instead of holding a worker thread. The Server-Timing header breaks
+    the response time down into metric phases and GitHub API usage.
+    """
+    # require_POST does not wrap coroutines before Django 5.0
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    params, error = _parse_store_payload(request)
+    if error:
+        return error
+
+    result = await compute_and_store_metrics_async(
+        params["owner"],
+        params["repository"],
+        params["since_day"],
+        params["until_day"],
+        params["bug_label"],
+    )
+    return JsonResponse(result)
 
-    cf_ratio = svc.get_github_change_failure_rate(owner, repo, since_day, until_day, bug_label)
-    cf_pct = cf_ratio * 100
 
-    project, created = Project.objects.get_or_create(
-        owner=owner,
-        repository=repo,
-        defaults={"name": f"{owner}/{repo}"}
-    )
+@require_POST
+def submit_metrics_job_view(request):
+    """
+    POST /metrics/jobs/
+    Same body as the store endpoint, but the computation runs on the background
+    worker pool. Returns 202 with the job id; identical pending jobs are reused.
+    """
+    params, error = _parse_store_payload(request)
+    if error:
+        return error
 
-    since_dt = svc._parse_date(since_day)
-    until_dt = svc._parse_date(until_day)
+    job, created = enqueue_job("store_metrics", params)
+    return _job_accepted_response(job, created)
 
-    Metric.objects.create(
-        project=project,
-        metric_type="release_frequency",
-        value=df_mean,
-        variance=df_std,
-        since=since_dt,
-        until=until_dt
-    )
-    Metric.objects.create(
-        project=project,
-        metric_type="lead_time_for_released_changes",
-        value=lt_mean,
-        variance=lt_std,
-        since=since_dt,
-        until=until_dt
-    )
-    Metric.objects.create(
-        project=project,
-        metric_type="time_to_repair_code",
-        value=tr_mean,
-        variance=tr_std,
-        since=since_dt,
-        until=until_dt
-    )
-    Metric.objects.create(
-        project=project,
-        metric_type="bug_issues_rate",
-        value=cf_pct,
-        variance=None,
-        since=since_dt,
-        until=until_dt
-    )
 
-    return JsonResponse({
-        "release_frecuency": {"mean_days": df_mean, "std_dev_days": df_std},
-        "lead_time_for_released_changes": {"mean_days": lt_mean, "std_dev_days": lt_std},
-        "time_to_repair_code": {"mean_days": tr_mean, "std_dev_days": tr_std},
-        "bug_issues_rate": cf_pct,
-    })
+@require_POST
+def submit_metrics_batch_view(request):
+    """
+    POST /metrics/batch/
+    {"projects": [{owner, repository, since_day, until_day, bug_label}, ...]}
+    Queues one job computing every project on a worker pool that shares the GitHub
+    quota fairly between them. The job result lists each project's summary or error.
+    """
+    projects, error = _parse_batch_payload(request)
+    if error:
+        return error
+
+    job, created = enqueue_job("store_metrics_batch", {"projects": projects})
+    return _job_accepted_response(job, created)
 
 
-@ensure_csrf_cookie
 @require_GET
-def get_metrics_view(request):
-    # 1. Filter Projects by "projects" parameter if provided
-    proj_list = request.GET.get("projects", "")
-    if proj_list:
-        identifiers = [p.strip() for p in proj_list.split(",") if p.strip()]
-        queries = Q()
-        for ident in identifiers:
-            try:
-                owner, repo = ident.split("/", 1)
-            except ValueError:
-                return JsonResponse(
-                    {"error": f"Invalid format for project '{ident}'. Use owner/repo."},
-                    status=400
-                )
-            queries |= Q(owner=owner, repository=repo)
-        projects_qs = Project.objects.filter(queries)
-    else:
-        projects_qs = Project.objects.all()
-
-    # 2. Parse metric_types filter
-    metric_types_param = request.GET.get("metric_types", "")
-    metric_types = [mt.strip() for mt in metric_types_param.split(",") if mt.strip()] if metric_types_param else []
+def prometheus_metrics_view(request):
+    """
+    GET /metrics/prometheus/
+    GitHub API usage and metric computation timings of this process, in the
+    Prometheus text exposition format.
+    """
+    return HttpResponse(instrumentation.render(), content_type=instrumentation.CONTENT_TYPE)
 
-    # 3. Parse date-range filters
-    since_str = request.GET.get("since", "")
-    until_str = request.GET.get("until", "")
-    since_dt = None
-    until_dt = None
 
-    if since_str:
-        try:
-            since_dt = parser.isoparse(since_str).astimezone(timezone.utc)
-        except ValueError:
-            return JsonResponse({"error": "Invalid 'since' datetime format. Use YYYY-MM-DDThh:mm:ss+00:00 or YYYY-MM-DDThh:mm:ss.SSS+00:00."}, status=400)
+@require_GET
+def metric_job_status_view(request, job_id):
+    """
+    GET /metrics/jobs/<job_id>/
+    Reports the job status, its progress (current phase, pages fetched,
+    issues processed) and, once finished, the result or error.
+    """
+    job = get_object_or_404(MetricJob, pk=job_id)
+    return JsonResponse(_serialize_job(job))
 
-    if until_str:
+
+METRIC_LIST_FIELDS = [
+    "id", "metric_type", "value", "variance", "since", "until",
+    "sample_count", "min_value", "max_value", "p50", "p75", "p90", "p95", "p99", "histogram",
+]
+METRIC_COMPARE_FIELDS = ["since", "until", "value", "variance"]
+# extra fields of the flat, paginated listing
+METRIC_PAGE_PROJECT_FIELDS = {"owner": F("project__owner"), "repository": F("project__repository")}
+METRIC_PAGE_DEFAULT_LIMIT = 100
+METRIC_PAGE_MAX_LIMIT = 1000
+
+
+def _parse_projects_param(proj_list):
+    """
+    Returns (Q over Project matching the comma-separated owner/repo identifiers, None),
+    or (None, error_response) for a malformed identifier.
+    """
+    identifiers = [p.strip() for p in proj_list.split(",") if p.strip()]
+    queries = Q()
+    for ident in identifiers:
         try:
-            until_dt = parser.isoparse(until_str).astimezone(timezone.utc)
+            owner, repo = ident.split("/", 1)
         except ValueError:
-            return JsonResponse({"error": "Invalid 'until' datetime format. Use YYYY-MM-DDThh:mm:ss+00:00 or YYYY-MM-DDThh:mm:ss.SSS+00:00."}, status=400)
+            return None, JsonResponse(
+                {"error": f"Invalid format for project '{ident}'. Use owner/repo."},
+                status=400
+            )
+        queries |= Q(owner=owner, repository=repo)
+    return queries, None
 
-    response_projects = []
 
-    for project in projects_qs:
-        qs = Metric.objects.filter(project=project)
+def _parse_datetime_param(request, name):
+    """
+    Returns (UTC datetime or None, None), or (None, error_response).
+    """
+    value = request.GET.get(name, "")
+    if not value:
+        return None, None
+    try:
+        return parser.isoparse(value).astimezone(timezone.utc), None
+    except ValueError:
+        return None, JsonResponse({"error": f"Invalid '{name}' datetime format. Use YYYY-MM-DDThh:mm:ss+00:00 or YYYY-MM-DDThh:mm:ss.SSS+00:00."}, status=400)
 
-        if metric_types:
-            qs = qs.filter(metric_type__in=metric_types)
 
-        if since_dt:
-            qs = qs.filter(since__gte=since_dt)
+def _parse_fields_param(request, allowed):
+    """
+    Returns (the requested subset of `allowed`, in request order, None), all of
+    `allowed` when no fields= is given, or (None, error_response).
+    """
+    value = request.GET.get("fields", "")
+    fields = [f.strip() for f in value.split(",") if f.strip()]
+    if not fields:
+        return list(allowed), None
+    unknown = [f for f in fields if f not in allowed]
+    if unknown:
+        return None, JsonResponse(
+            {"error": f"Unknown field(s): {', '.join(unknown)}. Use any of: {', '.join(allowed)}."},
+            status=400,
+        )
+    return fields, None
 
-        if until_dt:
-            qs = qs.filter(until__lte=until_dt)
 
-        qs = qs.order_by("-since", "-metric_type")
+def _encode_cursor(row):
+    key = [row["since"].isoformat() if row["since"] else None, row["metric_type"], row["id"]]
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
 
-        metrics_list = []
-        for m in qs:
-            metrics_list.append({
-                "id": m.id,
-                "metric_type": m.metric_type,
-                "value": m.value,
-                "variance": m.variance,
-                "since": m.since.isoformat() if m.since else None,
-                "until": m.until.isoformat() if m.until else None,
-            })
 
-        response_projects.append({
-            "id": project.id,
-            "owner": project.owner,
-            "repository": project.repository,
-            "metrics": metrics_list,
-        })
+def _decode_cursor(cursor):
+    """
+    Returns the Q selecting rows after the (since, metric_type, id) key in `cursor`,
+    or None if the cursor is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        since, metric_type, metric_id = json.loads(raw)
+        since = parser.isoparse(since) if since is not None else None
+        metric_type, metric_id = str(metric_type), int(metric_id)
+    except (binascii.Error, ValueError, TypeError):
+        return None
+    after_in_since = Q(metric_type__gt=metric_type) | Q(metric_type=metric_type, id__gt=metric_id)
+    if since is None:
+        # windowless rows sort first
+        return Q(since__isnull=True) & after_in_since | Q(since__isnull=False)
+    return Q(since__gt=since) | Q(since=since) & after_in_since
+
+
+def _serialize_metric_row(row, fields):
+    item = {}
+    for field in fields:
+        value = row[field]
+        if field in ("since", "until"):
+            value = value.isoformat() if value else None
+        item[field] = value
+    return item
+
+
+def _parse_metric_filters(request):
+    """
+    Parses the projects/metric_types/since/until query parameters shared by the
+    listing and export endpoints. Returns (filters, None) or (None, error_response).
+    """
+    filters = {"projects": None, "metric_types": [], "since": None, "until": None}
+
+    proj_list = request.GET.get("projects", "")
+    if proj_list:
+        queries, error = _parse_projects_param(proj_list)
+        if error:
+            return None, error
+        filters["projects"] = Project.objects.filter(queries)
+
+    metric_types_param = request.GET.get("metric_types", "")
+    filters["metric_types"] = [mt.strip() for mt in metric_types_param.split(",") if mt.strip()]
+
+    for name in ("since", "until"):
+        filters[name], error = _parse_datetime_param(request, name)
+        if error:
+            return None, error
+    return filters, None
+
+
+def _filter_metrics(filters):
+    qs = Metric.objects.all()
+    if filters["projects"] is not None:
+        qs = qs.filter(project__in=filters["projects"].values("id"))
+    if filters["metric_types"]:
+        qs = qs.filter(metric_type__in=filters["metric_types"])
+    if filters["since"]:
+        qs = qs.filter(since__gte=filters["since"])
+    if filters["until"]:
+        qs = qs.filter(until__lte=filters["until"])
+    return qs
+
+
+@ensure_csrf_cookie
+@require_GET
+@read_cache.cached_read_view
+def get_metrics_view(request):
+    filters, error = _parse_metric_filters(request)
+    if error:
+        return error
+    if "limit" in request.GET or "cursor" in request.GET:
+        return _get_metrics_page(request, filters)
+
+    fields, error = _parse_fields_param(request, METRIC_LIST_FIELDS)
+    if error:
+        return error
+
+    # One query for the projects and one for all of their metrics
+    projects_qs = filters["projects"] if filters["projects"] is not None else Project.objects.all()
+    projects = list(projects_qs.order_by("id").values("id", "owner", "repository"))
+
+    qs = _filter_metrics(filters).order_by("project_id", "-since", "-metric_type").values(
+        "project_id", *fields
+    )
+
+    metrics_by_project = {}
+    for row in qs:
+        metrics_by_project.setdefault(row["project_id"], []).append(
+            _serialize_metric_row(row, fields)
+        )
+
+    response_projects = [
+        {
+            "id": project["id"],
+            "owner": project["owner"],
+            "repository": project["repository"],
+            "metrics": metrics_by_project.get(project["id"], []),
+        }
+        for project in projects
+    ]
 
     return JsonResponse({"projects": response_projects})
 
 
+def _get_metrics_page(request, filters):
+    """
+    Flat listing of the filtered metrics in (since, metric_type, id) order, one page
+    at a time. Pages are found by keyset (WHERE key > cursor) rather than OFFSET, so
+    every page costs one indexed query however deep into the history it is.
+    """
+    try:
+        limit = int(request.GET.get("limit", METRIC_PAGE_DEFAULT_LIMIT))
+    except ValueError:
+        limit = 0
+    if not 1 <= limit <= METRIC_PAGE_MAX_LIMIT:
+        return JsonResponse(
+            {"error": f"'limit' must be an integer between 1 and {METRIC_PAGE_MAX_LIMIT}."}, status=400
+        )
+
+    allowed = ["project_id", *METRIC_PAGE_PROJECT_FIELDS, *METRIC_LIST_FIELDS]
+    fields, error = _parse_fields_param(request, allowed)
+    if error:
+        return error
+
+    qs = _filter_metrics(filters)
+    cursor = request.GET.get("cursor", "")
+    if cursor:
+        after = _decode_cursor(cursor)
+        if after is None:
+            return JsonResponse({"error": "Invalid 'cursor'."}, status=400)
+        qs = qs.filter(after)
+
+    # the key columns are always read to build the next cursor
+    columns = {"id", "since", "metric_type"} | {f for f in fields if f not in METRIC_PAGE_PROJECT_FIELDS}
+    projections = {f: METRIC_PAGE_PROJECT_FIELDS[f] for f in fields if f in METRIC_PAGE_PROJECT_FIELDS}
+    rows = list(
+        qs.order_by(F("since").asc(nulls_first=True), "metric_type", "id")
+        .values(*columns, **projections)[:limit + 1]
+    )
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return JsonResponse({
+        "metrics": [_serialize_metric_row(row, fields) for row in rows],
+        "next_cursor": _encode_cursor(rows[-1]) if has_more else None,
+    })
+
+
 @require_GET
+@read_cache.cached_read_view
 def compare_metrics_view(request):
     proj_list = request.GET.get("projects", "")
     if not proj_list:
@@ -181,73 +391,130 @@ def compare_metrics_view(request):
     if not identifiers:
         return JsonResponse({"error": "No valid project identifiers found."}, status=400)
 
-    queries = Q()
-    for ident in identifiers:
-        try:
-            owner, repo = ident.split("/", 1)
-        except ValueError:
-            return JsonResponse({"error": f"Invalid format for project '{ident}'. Use owner/repo."}, status=400)
-        queries |= Q(owner=owner, repository=repo)
+    queries, error = _parse_projects_param(proj_list)
+    if error:
+        return error
 
-    projects = Project.objects.filter(queries)
-    if not projects.exists():
+    projects_qs = Project.objects.filter(queries)
+    projects = list(projects_qs.order_by("id").values("id", "owner", "repository"))
+    if not projects:
         return JsonResponse({"error": "No matching projects in database."}, status=404)
 
-    response = []
-    
-    since_str = request.GET.get("since", "")
-    until_str = request.GET.get("until", "")
-    since_dt = None
-    until_dt = None
+    since_dt, error = _parse_datetime_param(request, "since")
+    if error:
+        return error
+    until_dt, error = _parse_datetime_param(request, "until")
+    if error:
+        return error
+
+    qs = Metric.objects.filter(project_id__in=[p["id"] for p in projects])
+    if since_dt:
+        qs = qs.filter(since__gte=since_dt)
+    if until_dt:
+        qs = qs.filter(until__lte=until_dt)
+    qs = qs.order_by("project_id", "since", "metric_type").values(
+        "project_id", "metric_type", *METRIC_COMPARE_FIELDS
+    )
 
-    if since_str:
-        try:
-            since_dt = parser.isoparse(since_str).astimezone(timezone.utc)
-        except ValueError:
-            return JsonResponse({"error": "Invalid 'since' datetime format. Use YYYY-MM-DDThh:mm:ss+00:00 or YYYY-MM-DDThh:mm:ss.SSS+00:00."}, status=400)
+    metrics_by_project = {}
+    for row in qs:
+        metrics_by_type = metrics_by_project.setdefault(row["project_id"], {})
+        metrics_by_type.setdefault(row["metric_type"], []).append(
+            _serialize_metric_row(row, METRIC_COMPARE_FIELDS)
+        )
+
+    response = [
+        {
+            "owner": project["owner"],
+            "repository": project["repository"],
+            "metrics": metrics_by_project.get(project["id"], {}),
+        }
+        for project in projects
+    ]
 
-    if until_str:
-        try:
-            until_dt = parser.isoparse(until_str).astimezone(timezone.utc)
-        except ValueError:
-            return JsonResponse({"error": "Invalid 'until' datetime format. Use YYYY-MM-DDThh:mm:ss+00:00 or YYYY-MM-DDThh:mm:ss.SSS+00:00."}, status=400)
-
-    for project in projects:
-        qs = Metric.objects.filter(project=project)
-        
-        if since_dt:
-            qs = qs.filter(since__gte=since_dt)
-        
-        if until_dt:
-            qs = qs.filter(until__lte=until_dt)
-            
-        qs = qs.order_by("since", "metric_type")
-        metrics_by_type = {}
-        for m in qs:
-            metrics_by_type.setdefault(m.metric_type, []).append({
-                "since": m.since.isoformat() if m.since else None,
-                "until": m.until.isoformat() if m.until else None,
-                "value": m.value,
-                "variance": m.variance,
-            })
-        response.append({
-            "owner": project.owner,
-            "repository": project.repository,
-            "metrics": metrics_by_type
+    return JsonResponse({"projects": response})
+
+
+ROLLUP_BUCKETS = {
+    "week": TruncWeek,
+    "month": TruncMonth,
+    "quarter": TruncQuarter,
+}
+
+
+@require_GET
+@read_cache.cached_read_view
+def rollup_metrics_view(request):
+    """
+    GET /metrics/rollup/?bucket=week|month|quarter
+                         &projects=...&metric_types=...&since=...&until=...
+
+    Per project, metric type and calendar bucket of the window start: the average,
+    minimum and maximum value and the number of windows, aggregated in SQL.
+    """
+    bucket = request.GET.get("bucket", "month")
+    if bucket not in ROLLUP_BUCKETS:
+        return JsonResponse(
+            {"error": f"Invalid 'bucket'. Use one of: {', '.join(ROLLUP_BUCKETS)}."}, status=400
+        )
+
+    filters, error = _parse_metric_filters(request)
+    if error:
+        return error
+
+    projects_qs = filters["projects"] if filters["projects"] is not None else Project.objects.all()
+    projects = list(projects_qs.order_by("id").values("id", "owner", "repository"))
+
+    qs = (
+        _filter_metrics(filters)
+        .filter(since__isnull=False)
+        .annotate(bucket=ROLLUP_BUCKETS[bucket]("since", tzinfo=timezone.utc))
+        .values("project_id", "metric_type", "bucket")
+        .annotate(avg=Avg("value"), min=Min("value"), max=Max("value"), count=Count("id"))
+        .order_by("project_id", "metric_type", "bucket")
+    )
+
+    rollups_by_project = {}
+    for row in qs:
+        rollups_by_type = rollups_by_project.setdefault(row["project_id"], {})
+        rollups_by_type.setdefault(row["metric_type"], []).append({
+            "bucket": row["bucket"].isoformat(),
+            "avg": row["avg"],
+            "min": row["min"],
+            "max": row["max"],
+            "count": row["count"],
         })
 
-    return JsonResponse({"projects": response})
+    response = [
+        {
+            "owner": project["owner"],
+            "repository": project["repository"],
+            "metrics": rollups_by_project.get(project["id"], {}),
+        }
+        for project in projects
+    ]
+
+    return JsonResponse({"bucket": bucket, "projects": response})
+
+
+def _wants_background(request):
+    return request.GET.get("background") in ("1", "true")
 
 
 @ensure_csrf_cookie
 @require_http_methods(["DELETE"])
 def delete_project_view(request, project_id):
     """
-    DELETE /projects/<project_id>/delete/
-    Removes the project and all its metrics.
+    DELETE /projects/<project_id>/delete/[?background=1]
+    Removes the project, its metrics and its raw GitHub data, in bounded batches.
+    With background=1 the deletion runs as a job and 202 points to its status.
     """
     project = get_object_or_404(Project, pk=project_id)
-    project.delete()
+    if _wants_background(request):
+        job, created = enqueue_job("delete_project", {"project_id": project.pk})
+        return _job_accepted_response(job, created)
+
+    delete_service.delete_project(project)
     return JsonResponse(
         {"message": f"Project {project.owner}/{project.repository} deleted."},
         status=204
@@ -261,28 +528,23 @@ def delete_metrics_view(request):
     DELETE /metrics/delete/?projects=owner1/repo1,owner2/repo2
                              &since=YYYY-MM-DDThh:mm:ssZ
                              &until=YYYY-MM-DDThh:mm:ssZ
+                             [&background=1]
 
-    Deletes Metric rows matching the filters.
+    Deletes Metric rows matching the filters, in bounded batches. With
+    background=1 the deletion runs as a job and 202 points to its status.
     """
     proj_list = request.GET.get("projects", "")
-    if proj_list:
-        identifiers = [p.strip() for p in proj_list.split(",") if p.strip()]
-        queries = Q()
-        for ident in identifiers:
-            try:
-                owner, repo = ident.split("/", 1)
-            except ValueError:
-                return JsonResponse(
-                    {"error": f"Invalid project format '{ident}'. Use owner/repo."},
-                    status=400,
-                )
-            queries |= Q(project__owner=owner, project__repository=repo)
-        metrics_qs = Metric.objects.filter(queries)
-    else:
-        metrics_qs = Metric.objects.all()
+    identifiers = [p.strip() for p in proj_list.split(",") if p.strip()]
+    for ident in identifiers:
+        if "/" not in ident:
+            return JsonResponse(
+                {"error": f"Invalid project format '{ident}'. Use owner/repo."},
+                status=400,
+            )
 
     since_str = request.GET.get("since")
     until_str = request.GET.get("until")
+    since_dt = until_dt = None
 
     if since_str:
         since_dt = parse_datetime(since_str)
@@ -291,7 +553,6 @@ def delete_metrics_view(request):
                 {"error": "Invalid 'since' format. Use ISO 8601 datetime."},
                 status=400,
             )
-        metrics_qs = metrics_qs.filter(since__gte=since_dt)
 
     if until_str:
         until_dt = parse_datetime(until_str)
@@ -300,46 +561,146 @@ def delete_metrics_view(request):
                 {"error": "Invalid 'until' format. Use ISO 8601 datetime."},
                 status=400,
             )
-        metrics_qs = metrics_qs.filter(until__lte=until_dt)
 
-    deleted_count, _ = metrics_qs.delete()
+    if _wants_background(request):
+        job, created = enqueue_job(
+            "delete_metrics", {"projects": identifiers, "since": since_str, "until": until_str}
+        )
+        return _job_accepted_response(job, created)
 
+    deleted_count = delete_service.delete_metrics(identifiers, since_dt, until_dt)
     return JsonResponse(
         {"message": f"Deleted {deleted_count} metric(s)."},
         status=200
     )
 
 
-@require_GET
-def export_project_view(request, project_id):
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+EXPORT_FIELDS = [
+    "metric_type", "value", "variance", "since", "until",
+    "sample_count", "min_value", "max_value", "p50", "p75", "p90", "p95", "p99",
+]
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to the csv writer's caller."""
+
+    def write(self, value):
+        return value
+
+
+def _export_rows(qs, columns):
     """
-    GET /projects/<project_id>/export/
-    Returns a CSV of all metrics for that project.
+    Streams `columns` of every row of `qs` as tuples, fetching EXPORT_CHUNK_SIZE rows
+    per round trip so memory stays constant however many metrics there are.
     """
-    project = get_object_or_404(Project, pk=project_id)
-    metrics = Metric.objects.filter(project=project).order_by("since", "metric_type")
+    return qs.values_list(*columns).iterator(chunk_size=EXPORT_CHUNK_SIZE)
 
-    filename = f"{project.owner}-{project.repository}-metrics.csv"
-    response = HttpResponse(content_type="text/csv")
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
 
-    writer = csv.writer(response)
-    writer.writerow([
-        "metric_id",
-        "metric_type",
-        "value",
-        "variance",
-        "since",
-        "until",
-    ])
-    for m in metrics:
-        writer.writerow([
-            m.id,
-            m.metric_type,
-            m.value,
-            m.variance if m.variance is not None else "",
-            m.since.isoformat() if m.since else "",
-            m.until.isoformat() if m.until else "",
+def _csv_lines(rows, header):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([
+            "" if v is None else v.isoformat() if hasattr(v, "isoformat") else v
+            for v in row
         ])
 
+
+def _ndjson_lines(rows, header):
+    for row in rows:
+        item = dict(zip(header, row))
+        for field in ("since", "until"):
+            if item.get(field):
+                item[field] = item[field].isoformat()
+        yield json.dumps(item, separators=(",", ":")) + "\n"
+
+
+def _buffered(lines, size=64 * 1024):
+    """Joins lines into ~`size` byte chunks so the response is not written line by line."""
+    buffer, length = [], 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(buffer).encode()
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer).encode()
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def _streaming_export(rows, header, fmt, filename, gzip_output=False):
+    lines = _csv_lines(rows, header) if fmt == "csv" else _ndjson_lines(rows, header)
+    chunks = _buffered(lines)
+    filename = f"{filename}.{fmt}"
+    content_type = EXPORT_FORMATS[fmt]
+    if gzip_output:
+        chunks = _gzipped(chunks)
+        filename += ".gz"
+        content_type = "application/gzip"
+
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
     return response
+
+
+@require_GET
+def export_metrics_view(request):
+    """
+    GET /metrics/export/?projects=owner1/repo1,owner2/repo2
+                         &metric_types=...&since=...&until=...
+                         &format=csv|ndjson&gzip=1
+
+    Streams the metrics of every matching project (all projects by default) as
+    CSV or newline-delimited JSON, optionally gzip-compressed on the fly.
+    """
+    fmt = request.GET.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return JsonResponse(
+            {"error": f"Invalid 'format'. Use one of: {', '.join(EXPORT_FORMATS)}."}, status=400
+        )
+    gzip_output = request.GET.get("gzip", "").lower() in ("1", "true", "yes")
+
+    filters, error = _parse_metric_filters(request)
+    if error:
+        return error
+
+    qs = _filter_metrics(filters).order_by("project_id", "since", "metric_type", "id")
+    header = ["owner", "repository", "metric_id", *EXPORT_FIELDS]
+    columns = ["project__owner", "project__repository", "id", *EXPORT_FIELDS]
+    if fmt == "ndjson":
+        header.append("histogram")
+        columns.append("histogram")
+
+    return _streaming_export(_export_rows(qs, columns), header, fmt, "metrics", gzip_output)
+
+
+@require_GET
+def export_project_view(request, project_id):
+    """
+    GET /projects/<project_id>/export/
+    Returns a CSV of all metrics for that project.
+    """
+    project = get_object_or_404(Project, pk=project_id)
+    qs = Metric.objects.filter(project=project).order_by("since", "metric_type")
+    columns = ["id", *EXPORT_FIELDS]
+
+    return _streaming_export(
+        _export_rows(qs, columns),
+        ["metric_id", *EXPORT_FIELDS],
+        "csv",
+        f"{project.owner}-{project.repository}-metrics",
+    )